@@ -0,0 +1,53 @@
+"""
+Microbenchmark del coste de autenticación por petición
+
+Compara la verificación completa del JWT (HMAC + parseo de claims) con la
+ruta rápida cacheada de `decode_token` + `get_current_user_claims`.
+
+Uso:
+    python benchmarks/bench_auth.py [iteraciones]
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt  # noqa: E402
+from src.utils import security  # noqa: E402
+
+def bench(label, func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed / iterations * 1e6:8.2f} µs/petición")
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    user = {"id": 42, "is_active": True, "fitness_level": "intermediate"}
+    token = security.create_user_token(user, expires_delta=timedelta(minutes=30))
+    # El estado de revocación vive en memoria (sin refresco en segundo plano aquí)
+
+    def full_decode():
+        jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+
+    def cached_decode():
+        security.decode_token(token)
+
+    def cached_claims_user():
+        # La corrutina no hace E/S: se completa en el primer send()
+        payload = security.decode_token(token)
+        try:
+            security.get_current_user_claims(payload).send(None)
+        except StopIteration:
+            pass
+
+    print(f"Iteraciones: {iterations}")
+    bench("jwt.decode (sin caché)", full_decode, iterations)
+    bench("decode_token (caché LRU)", cached_decode, iterations)
+    bench("decode_token + get_current_user_claims", cached_claims_user, iterations)
+
+if __name__ == "__main__":
+    main()
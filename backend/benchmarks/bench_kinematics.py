@@ -0,0 +1,82 @@
+"""
+Benchmark de la cinemática 3D sobre sesiones largas
+
+Genera sentadillas sintéticas a 30 fps (12 puntos 3D con ruido) y mide
+`compute_kinematics` completo (conversión desde JSON + todas las
+métricas) frente a un bucle en Python puro que solo calcula las
+velocidades por frame.
+
+Uso:
+    python benchmarks/bench_kinematics.py [--minutes 1 10 60] [--fps 30]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.kinematics import KINEMATIC_LANDMARKS, compute_kinematics, to_arrays  # noqa: E402
+
+def synthetic_session(minutes: float, fps: float):
+    """Frames {t, points} de sentadillas de 2 s con ruido de 5 mm"""
+    frames = []
+    for i in range(int(minutes * 60 * fps)):
+        t = i / fps
+        depth = 0.25 * (1 - math.cos(2 * math.pi * t / 2.0)) / 2
+        base = {
+            "Shoulder": (0.0, -0.5 + depth, 0.0), "Elbow": (0.0, -0.3 + depth, 0.15),
+            "Wrist": (0.0, -0.45 + depth, 0.25), "Hip": (0.0, depth, 0.0),
+            "Knee": (0.0, 0.45 - depth * 0.2, 0.3 * depth / 0.25), "Ankle": (0.0, 0.9, 0.0),
+        }
+        points = []
+        for name in KINEMATIC_LANDMARKS:
+            side = -0.15 if name.startswith("left") else 0.15
+            x, y, z = base[name.replace("left", "").replace("right", "")]
+            points.append([x + side + random.gauss(0, 0.005), y + random.gauss(0, 0.005), z + random.gauss(0, 0.005)])
+        frames.append({"t": round(t * 1000), "points": points})
+    return frames
+
+def python_velocities(frames):
+    """Referencia: diferencias finitas por frame y punto en Python puro"""
+    speeds = []
+    for prev, cur in zip(frames, frames[1:]):
+        dt = (cur["t"] - prev["t"]) / 1000
+        speeds.append([
+            math.dist(a, b) / dt for a, b in zip(prev["points"], cur["points"])
+        ])
+    return speeds
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de cinemática 3D")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 60])
+    parser.add_argument("--fps", type=float, default=30.0)
+    args = parser.parse_args()
+
+    print(f"{'Minutos':>8} {'Frames':>8} {'conversión':>11} {'total numpy':>12} {'vel. Python':>12} {'Reps':>6}")
+    for minutes in args.minutes:
+        frames = synthetic_session(minutes, args.fps)
+
+        start = time.perf_counter()
+        to_arrays(frames)
+        conversion = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        metrics = compute_kinematics(frames, "squat")
+        vectorized = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        python_velocities(frames)
+        reference = (time.perf_counter() - start) * 1000
+
+        print(f"{minutes:>8g} {len(frames):>8} {conversion:>9.1f}ms {vectorized:>10.1f}ms "
+              f"{reference:>10.1f}ms {metrics['reps']:>6}")
+
+    print(f"\nÚltima sesión: velocidad media {metrics['movement_speed']} m/s, "
+          f"excéntrica {metrics['eccentric_seconds']} s, concéntrica {metrics['concentric_seconds']} s, "
+          f"simetría {metrics['symmetry_score']}, desviación muñecas {metrics['wrist_path_deviation_cm']} cm")
+
+if __name__ == "__main__":
+    main()
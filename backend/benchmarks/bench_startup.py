@@ -0,0 +1,47 @@
+"""
+Benchmark de arranque en frío
+
+Mide, en procesos nuevos, el tiempo de `import main` y el tiempo hasta
+completar los eventos de startup (worker listo para aceptar tráfico).
+
+Uso:
+    python benchmarks/bench_startup.py [ejecuciones]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+asyncio.run(main.app.router.startup())
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "ready": t2 - t0}))
+"""
+
+def run_once(env):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ, RUN_DIR=tempfile.mkdtemp(prefix="gymform-bench-"))
+
+    results = [run_once(env) for _ in range(runs)]
+    for key in ("import", "ready"):
+        values = [r[key] * 1000 for r in results]
+        print(f"{key:<8} mediana {statistics.median(values):7.1f} ms   "
+              f"min {min(values):7.1f} ms   max {max(values):7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Benchmark del pipeline de vídeo: segundos de vídeo procesados por núcleo
+
+Ejecuta decodificación + pose + ángulos en un único proceso (un núcleo),
+sin base de datos.
+
+Uso:
+    python benchmarks/bench_video.py video.mp4 [--exercise squat] [--fps 10] [--batch 16]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.video_pipeline import analyze_video  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de vídeo")
+    parser.add_argument("video")
+    parser.add_argument("--exercise", default="squat")
+    parser.add_argument("--fps", type=float, default=10.0, help="Frames analizados por segundo de vídeo")
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    session = analyze_video(args.video, args.exercise, target_fps=args.fps, batch_size=args.batch)
+    elapsed = time.perf_counter() - start
+
+    print(f"Vídeo:               {session.duration_seconds} s")
+    print(f"Frames analizados:   {session.total_frames}")
+    print(f"Tiempo de proceso:   {elapsed:.2f} s")
+    print(f"Rendimiento:         {session.duration_seconds / elapsed:.2f} s de vídeo por segundo y núcleo")
+    print(f"Puntuación técnica:  {session.technique_score:.1f}")
+
+if __name__ == "__main__":
+    main()
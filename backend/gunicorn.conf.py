@@ -0,0 +1,52 @@
+"""
+Configuración de gunicorn para el modo producción
+
+    gunicorn -c gunicorn.conf.py main:app
+
+La app se importa una vez en el master (preload) y se comparte con los
+workers por fork. Cada worker calienta su pool de BD y sus cachés en el
+arranque del lifespan, antes de aceptar conexiones.
+"""
+import multiprocessing
+import os
+import shutil
+
+from src.utils import lifecycle
+from src.utils.logging_config import route_server_loggers
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WORKERS", "0")) or multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Drenado en SIGTERM: los workers dejan de aceptar y terminan las peticiones en curso.
+# Cada worker se marca como drenando al recibir la señal (lifecycle.install_drain_handler,
+# instalado en el arranque del lifespan porque uvicorn pone sus manejadores al servir)
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+# Log de acceso y formato: los escribe la app (RequestContextMiddleware, JSON por la cola de logs)
+accesslog = None
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+def on_starting(server):
+    # Limpiar estados de una ejecución anterior
+    shutil.rmtree(lifecycle.RUN_DIR, ignore_errors=True)
+
+def when_ready(server):
+    server.log.info(f"Master listo, arrancando {workers} workers")
+
+def post_worker_init(worker):
+    route_server_loggers()
+    worker.log.info(f"Worker {worker.pid} inicializado, calentando antes de aceptar tráfico")
+
+def worker_int(worker):
+    # SIGINT/SIGQUIT (Ctrl+C); el SIGTERM lo atiende install_drain_handler
+    lifecycle.mark_draining()
+
+def worker_exit(server, worker):
+    try:
+        os.remove(os.path.join(lifecycle.RUN_DIR, f"worker-{worker.pid}.json"))
+    except OSError:
+        pass
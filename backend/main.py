@@ -1,19 +1,35 @@
 """
 GymForm Analyzer - Backend Principal con Autenticación
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-import uvicorn
+import logging
 import os
-from dotenv import load_dotenv
+import mysql.connector
 
 # Importar rutas
 from src.api.workout_routes import router as workout_router
 from src.api.auth_routes import router as auth_router  # NUEVO
+from src.api.coach_routes import router as coach_router
+from src.utils.security import (
+    init_connection_pool, get_mysql_connection as get_pooled_connection, db_router, require_admin,
+    start_auth_refresher
+)
+from src.services import leaderboards
+from src.utils import response_cache
+from src.utils.admission import AdmissionControlMiddleware, admission_stats
+from src.utils import lifecycle
+from src.utils.env import load_environment
+from src.utils.logging_config import (
+    setup_logging, logging_stats, RequestContextMiddleware, REQUEST_ID_HEADER
+)
 
 # Cargar variables de entorno
-load_dotenv()
+load_environment()
+setup_logging()
+
+logger = logging.getLogger(__name__)
 
 # Crear instancia de FastAPI
 app = FastAPI(
@@ -33,20 +49,28 @@ origins = [
     "http://127.0.0.1:5173",
 ]
 
+# Control de admisión (se añade antes que CORS para que las respuestas 429/503 lleven cabeceras CORS)
+app.add_middleware(AdmissionControlMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER],
 )
 
+# Request id y log de acceso (el más externo: cubre también las respuestas 429/503)
+app.add_middleware(RequestContextMiddleware)
+
 # =====================================
 # INCLUIR ROUTERS
 # =====================================
 
 app.include_router(workout_router)
 app.include_router(auth_router)
+app.include_router(coach_router)
 
 # =====================================
 # FUNCIONES DE BASE DE DATOS
@@ -68,7 +92,7 @@ def get_mysql_connection():
         connection = mysql.connector.connect(**config)
         return connection
     except mysql.connector.Error as e:
-        print(f"❌ Error conectando a MySQL: {e}")
+        logger.error("Error conectando a MySQL: %s", e)
         return None
 
 def test_mysql_connection():
@@ -84,52 +108,40 @@ def test_mysql_connection():
             return True
         return False
     except Exception as e:
-        print(f"❌ Error en test de conexión: {e}")
-        return False
-
-def create_database_if_not_exists():
-    """Crear base de datos si no existe"""
-    try:
-        config = {
-            'host': os.getenv("DB_HOST", "localhost"),
-            'port': int(os.getenv("DB_PORT", "3306")),
-            'user': os.getenv("DB_USER", "root"),
-            'password': os.getenv("DB_PASSWORD", ""),
-            'charset': 'utf8mb4'
-        }
-        
-        connection = mysql.connector.connect(**config)
-        cursor = connection.cursor()
-        
-        db_name = os.getenv("DB_NAME", "gymform_analyzer")
-        
-        cursor.execute(f"SHOW DATABASES LIKE '{db_name}'")
-        if not cursor.fetchone():
-            cursor.execute(f"CREATE DATABASE {db_name} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
-            print(f"✅ Base de datos '{db_name}' creada!")
-        else:
-            print(f"✅ Base de datos '{db_name}' ya existe!")
-            
-        cursor.close()
-        connection.close()
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error creando base de datos: {e}")
+        logger.error("Error en test de conexión: %s", e)
         return False
 
 # =====================================
 # EVENTOS DE APLICACIÓN
 # =====================================
 
+@lifecycle.register_warmup
+def warm_db_pool():
+    """Abrir las conexiones del pool antes de recibir tráfico"""
+    init_connection_pool()
+
+@lifecycle.register_warmup
+def warm_auth_state():
+    """Cargar los tokens revocados y sincronizarlos en segundo plano"""
+    start_auth_refresher(get_pooled_connection)
+
+@lifecycle.register_warmup
+def warm_leaderboards():
+    """Cargar en memoria los rankings de los periodos actuales"""
+    leaderboards.warm_leaderboards(get_pooled_connection)
+
 @app.on_event("startup")
-async def startup_event():
-    """Evento que se ejecuta al iniciar la aplicación"""
-    print("🔧 Configurando base de datos...")
-    if create_database_if_not_exists():
-        print("✅ Base de datos configurada!")
-    else:
-        print("❌ Error configurando base de datos!")
+async def warmup_event():
+    """Calentar pool y cachés; el worker no acepta conexiones hasta terminar"""
+    state = lifecycle.warm_up()
+    lifecycle.install_drain_handler()
+    logger.info("Worker %s listo", state['pid'], extra={"warmup": state['warmup']})
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drenado: dejar de reportarse listo y limpiar el estado publicado"""
+    lifecycle.mark_draining()
+    lifecycle.shutdown()
 
 # =====================================
 # RUTAS BÁSICAS
@@ -166,6 +178,36 @@ async def health_check():
         }
     }
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness de este worker y estado de todos los workers de la máquina"""
+    content = {
+        "ready": lifecycle.is_ready(),
+        "worker": lifecycle.worker_state(),
+        "workers": lifecycle.all_worker_states()
+    }
+    return JSONResponse(status_code=200 if content["ready"] else 503, content=content)
+
+@app.get("/api/cache/stats", dependencies=[Depends(require_admin)])
+async def get_cache_stats():
+    """Ratio de aciertos de la caché de respuestas de este worker"""
+    return {"pid": os.getpid(), **response_cache.cache_stats()}
+
+@app.get("/api/db/stats", dependencies=[Depends(require_admin)])
+async def get_db_routing_stats():
+    """Conexiones por clase de consulta y estado de las réplicas de este worker"""
+    return {"pid": os.getpid(), **db_router.stats()}
+
+@app.get("/api/logging/stats", dependencies=[Depends(require_admin)])
+async def get_logging_stats():
+    """Cola de logs de este worker (registros pendientes y descartados)"""
+    return {"pid": os.getpid(), **logging_stats()}
+
+@app.get("/api/admission/stats", dependencies=[Depends(require_admin)])
+async def get_admission_stats():
+    """Contadores de limitación y descarte de carga de este worker"""
+    return {"pid": os.getpid(), **admission_stats()}
+
 @app.get("/api/test")
 async def test_endpoint():
     """Endpoint de prueba para el frontend"""
@@ -295,21 +337,29 @@ async def internal_error_handler(request, exc):
 if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 8000))
-    debug = os.getenv("DEBUG", "True").lower() == "true"
+    environment = os.getenv("ENVIRONMENT", "development")
+    debug = os.getenv("DEBUG", "True" if environment == "development" else "False").lower() == "true"
+    
+    if environment == "production" and not debug:
+        # Modo producción: gunicorn con N workers uvicorn, app precargada y drenado en SIGTERM
+        logger.info("Iniciando GymForm Analyzer Backend (producción)...")
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        os.execvp("gunicorn", [
+            "gunicorn", "--chdir", base_dir,
+            "-c", os.path.join(base_dir, "gunicorn.conf.py"), "main:app"
+        ])
     
-    print(f"🚀 Iniciando GymForm Analyzer Backend...")
-    print(f"📍 Servidor: http://{host}:{port}")
-    print(f"📚 Documentación: http://{host}:{port}/docs")
-    print(f"🔧 Modo debug: {debug}")
-    print(f"🏋️ Funciones habilitadas:")
-    print(f"   ✅ Análisis de pose en tiempo real")
-    print(f"   ✅ Tracking de entrenamientos")
-    print(f"   ✅ Estadísticas de progreso")
+    logger.info("Iniciando GymForm Analyzer Backend en http://%s:%s (docs en /docs)", host, port,
+                extra={"debug": debug})
+    logger.info("La base de datos se aprovisiona con: python manage.py init-db")
     
+    import uvicorn
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
         reload=debug,
-        log_level="info"
+        log_level="info",
+        log_config=None,   # logging propio (setup_logging)
+        access_log=False
     )
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""
+GymForm Analyzer - Comandos de administración
+
+Uso:
+    python manage.py init-db     # crear base de datos y tablas auxiliares
+    python manage.py check-db    # comprobar conexión
+    python manage.py prune-leaderboards [--keep-days 14]
+    python manage.py retention [--downsample-days 90] [--archive-days 365] [--fps 5]
+    python manage.py check-progress [--user-id ID] [--fix]
+    python manage.py coach-member COACH MEMBER [--remove]
+    python manage.py compact-keyframes [--tolerance 2.0] [--batch 200]
+    python manage.py check-replicas   # retraso de las réplicas de lectura
+"""
+import argparse
+import sys
+
+def prune_leaderboards(keep_days: int) -> bool:
+    """Borrar filas de rankings diarios/semanales antiguos"""
+    from src.utils.security import get_mysql_connection
+    from src.services.leaderboards import prune_periods
+
+    connection = get_mysql_connection()
+    if not connection:
+        return False
+    try:
+        cursor = connection.cursor()
+        deleted = prune_periods(cursor, keep_days)
+        connection.commit()
+        cursor.close()
+        print(f"✅ {deleted} filas de rankings eliminadas")
+        return True
+    finally:
+        connection.close()
+
+def apply_retention(downsample_days: int, archive_days: int, fps: float) -> bool:
+    """Reducir y archivar datos de pose antiguos"""
+    from src.utils.security import get_mysql_connection
+    from src.services.retention import run_retention
+
+    connection = get_mysql_connection()
+    if not connection:
+        return False
+    try:
+        report = run_retention(connection, downsample_days, archive_days, fps)
+        print(f"✅ {report['archived']} performances archivadas, "
+              f"{report['downsampled']} reducidas ({report['samples_removed']} muestras eliminadas)")
+        return report["errors"] == 0
+    finally:
+        connection.close()
+
+def check_progress(user_id, fix: bool) -> bool:
+    """Comparar las estadísticas de progreso con un recálculo desde las sesiones"""
+    from src.utils.security import get_mysql_connection
+    from src.services.progress_stats import check_consistency
+
+    connection = get_mysql_connection()
+    if not connection:
+        return False
+    try:
+        cursor = connection.cursor(dictionary=True)
+        report = check_consistency(cursor, user_id, fix)
+        connection.commit()
+        cursor.close()
+        for entry in report:
+            print(f"⚠️ Usuario {entry['user_id']}, ejercicio {entry['exercise_type_id']}: "
+                  f"{entry.get('issue') or entry['drift']}")
+        if not report:
+            print("✅ Estadísticas de progreso consistentes")
+        elif fix:
+            print(f"✅ {len(report)} filas corregidas")
+        return fix or not report
+    finally:
+        connection.close()
+
+def coach_member(coach: str, member: str, remove: bool) -> bool:
+    """Asignar (o quitar) un miembro al grupo de un entrenador"""
+    from src.utils.security import get_mysql_connection
+    from src.services.group_stats import add_coach_member, remove_coach_member
+
+    connection = get_mysql_connection()
+    if not connection:
+        return False
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT id, username FROM users WHERE username IN (%s, %s)", (coach, member))
+        ids = {row["username"]: row["id"] for row in cursor.fetchall()}
+        missing = [name for name in (coach, member) if name not in ids]
+        if missing:
+            print(f"❌ Usuarios no encontrados: {', '.join(missing)}")
+            return False
+        if remove:
+            remove_coach_member(cursor, ids[coach], ids[member])
+        else:
+            add_coach_member(cursor, ids[coach], ids[member])
+        connection.commit()
+        cursor.close()
+        print(f"✅ {member} {'quitado de' if remove else 'asignado a'} {coach}")
+        return True
+    finally:
+        connection.close()
+
+def deactivate_user(username: str) -> bool:
+    """Desactivar una cuenta y revocar todos sus tokens"""
+    from src.utils.security import get_mysql_connection, revoke_user_tokens
+
+    connection = get_mysql_connection()
+    if not connection:
+        return False
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
+        user = cursor.fetchone()
+        if not user:
+            print(f"❌ Usuario no encontrado: {username}")
+            return False
+        cursor.execute("UPDATE users SET is_active = FALSE WHERE id = %s", (user["id"],))
+        revoke_user_tokens(cursor, user["id"])
+        connection.commit()
+        cursor.close()
+        print(f"✅ {username} desactivado y sus tokens revocados")
+        return True
+    finally:
+        connection.close()
+
+def compact_keyframes(tolerance: float, batch_size: int) -> bool:
+    """Reducir a keyframes las series de ángulos ya guardadas"""
+    from src.utils.security import get_mysql_connection
+    from src.services.keyframes import compact_stored
+
+    connection = get_mysql_connection()
+    if not connection:
+        return False
+    try:
+        report = compact_stored(connection, tolerance, batch_size)
+        print(f"✅ {report['performances']} performances reducidas "
+              f"({report['samples_removed']} muestras eliminadas)")
+        return report["errors"] == 0
+    finally:
+        connection.close()
+
+def check_replicas() -> bool:
+    """Conectar a cada réplica configurada y mostrar su retraso"""
+    from src.utils.security import db_router, replica_lag
+
+    endpoints = {endpoint.name: endpoint for group in db_router.groups.values() for endpoint in group}
+    if not endpoints:
+        print("ℹ️ Sin réplicas configuradas (DB_REPLICA_HOSTS): todo va al primario")
+        return True
+
+    ok = True
+    for name, endpoint in endpoints.items():
+        try:
+            connection = endpoint.connect()
+            try:
+                lag = replica_lag(connection)
+            finally:
+                connection.close()
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            ok = False
+            continue
+        if lag is None:
+            print(f"⚠️ {name}: no replica (o la replicación está parada)")
+            ok = False
+        elif lag > db_router.max_lag:
+            print(f"⚠️ {name}: {lag:.0f}s de retraso (máximo {db_router.max_lag:.0f}s)")
+            ok = False
+        else:
+            print(f"✅ {name}: {lag:.0f}s de retraso")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos de administración de GymForm Analyzer")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("init-db", help="Crear base de datos y tablas auxiliares")
+    subparsers.add_parser("check-db", help="Comprobar la conexión a la base de datos")
+    prune = subparsers.add_parser("prune-leaderboards", help="Borrar periodos antiguos de los rankings")
+    prune.add_argument("--keep-days", type=int, default=14)
+    retention = subparsers.add_parser("retention", help="Reducir y archivar datos de pose antiguos")
+    retention.add_argument("--downsample-days", type=int, default=None)
+    retention.add_argument("--archive-days", type=int, default=None)
+    retention.add_argument("--fps", type=float, default=None)
+    progress = subparsers.add_parser("check-progress", help="Detectar desviaciones en las estadísticas de progreso")
+    progress.add_argument("--user-id", type=int, default=None)
+    progress.add_argument("--fix", action="store_true")
+    coach = subparsers.add_parser("coach-member", help="Asignar un miembro a un entrenador")
+    coach.add_argument("coach")
+    coach.add_argument("member")
+    coach.add_argument("--remove", action="store_true")
+    deactivate = subparsers.add_parser("deactivate-user", help="Desactivar una cuenta y revocar sus tokens")
+    deactivate.add_argument("username")
+    compact = subparsers.add_parser("compact-keyframes", help="Reducir a keyframes las series guardadas")
+    compact.add_argument("--tolerance", type=float, default=None)
+    compact.add_argument("--batch", type=int, default=200)
+    subparsers.add_parser("check-replicas", help="Comprobar el retraso de las réplicas de lectura")
+    args = parser.parse_args()
+
+    # Los mensajes de los módulos salen por logging en formato legible; los resúmenes, por stdout
+    from src.utils.logging_config import setup_logging
+    setup_logging(fmt="text")
+
+    from src.database import provision
+
+    if args.command == "init-db":
+        ok = provision.provision_database()
+    elif args.command == "check-db":
+        ok = provision.check_database()
+    elif args.command == "prune-leaderboards":
+        ok = prune_leaderboards(args.keep_days)
+    elif args.command == "check-progress":
+        ok = check_progress(args.user_id, args.fix)
+    elif args.command == "coach-member":
+        ok = coach_member(args.coach, args.member, args.remove)
+    elif args.command == "deactivate-user":
+        ok = deactivate_user(args.username)
+    elif args.command == "check-replicas":
+        ok = check_replicas()
+    elif args.command == "compact-keyframes":
+        from src.services.keyframes import ANGLE_TOLERANCE
+        ok = compact_keyframes(args.tolerance if args.tolerance is not None else ANGLE_TOLERANCE, args.batch)
+    else:
+        from src.services import retention as tiers
+        ok = apply_retention(
+            args.downsample_days if args.downsample_days is not None else tiers.DOWNSAMPLE_DAYS,
+            args.archive_days if args.archive_days is not None else tiers.ARCHIVE_DAYS,
+            args.fps if args.fps is not None else tiers.TARGET_FPS
+        )
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,9 @@ from datetime import timedelta
 import mysql.connector
 from ..models.user_models import UserCreate, UserLogin, UserResponse, Token
 from ..utils.security import (
-    hash_password, authenticate_user, create_access_token, 
-    get_current_user, get_mysql_connection, ACCESS_TOKEN_EXPIRE_MINUTES
+    hash_password, authenticate_user, create_user_token, 
+    get_current_user, get_mysql_connection, get_token_payload, revoke_token,
+    revoke_user_tokens, apply_user_revocation, ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
@@ -66,8 +67,8 @@ async def register_user(user_data: UserCreate):
         
         # Crear token
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": str(new_user["id"])}, 
+        access_token = create_user_token(
+            new_user, 
             expires_delta=access_token_expires
         )
         
@@ -101,8 +102,8 @@ async def login_user(login_data: UserLogin):
         )
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user["id"])}, 
+    access_token = create_user_token(
+        user, 
         expires_delta=access_token_expires
     )
     
@@ -114,17 +115,27 @@ async def login_user(login_data: UserLogin):
         user=user_response
     )
 
+@router.post("/logout")
+async def logout_user(payload: dict = Depends(get_token_payload)):
+    """Revocar el token actual"""
+    revoke_token(payload)
+    return {"success": True, "message": "Sesión cerrada"}
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """Obtener información del usuario actual"""
     return UserResponse(**current_user)
 
-@router.put("/me", response_model=UserResponse)
+@router.put("/me", response_model=Token)
 async def update_current_user(
     update_data: dict,
     current_user: dict = Depends(get_current_user)
 ):
-    """Actualizar información del usuario actual"""
+    """Actualizar información del usuario actual
+
+    Los tokens anteriores llevan el perfil viejo en sus claims: se revocan
+    y se devuelve uno nuevo.
+    """
     connection = get_mysql_connection()
     if not connection:
         raise HTTPException(
@@ -155,13 +166,25 @@ async def update_current_user(
         
         update_query = f"UPDATE users SET {', '.join(updates)} WHERE id = %s"
         cursor.execute(update_query, values)
+        auth_version = revoke_user_tokens(cursor, current_user['id'])
         connection.commit()
+        apply_user_revocation(current_user['id'], auth_version)
         
         # Obtener usuario actualizado
         cursor.execute("SELECT * FROM users WHERE id = %s", (current_user['id'],))
         updated_user = cursor.fetchone()
+        updated_user["auth_version"] = auth_version
+        
+        access_token = create_user_token(
+            updated_user,
+            expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
         
-        return UserResponse(**updated_user)
+        return Token(
+            access_token=access_token,
+            token_type="bearer",
+            user=UserResponse(**updated_user)
+        )
         
     except mysql.connector.Error as e:
         connection.rollback()
@@ -171,4 +194,33 @@ async def update_current_user(
         )
     finally:
         cursor.close()
-        connection.close()
\ No newline at end of file
+        connection.close()
+
+@router.delete("/me")
+async def deactivate_current_user(current_user: dict = Depends(get_current_user)):
+    """Desactivar la cuenta del usuario actual y revocar todos sus tokens"""
+    connection = get_mysql_connection()
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error de conexión a base de datos"
+        )
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("UPDATE users SET is_active = FALSE WHERE id = %s", (current_user['id'],))
+        auth_version = revoke_user_tokens(cursor, current_user['id'])
+        connection.commit()
+        apply_user_revocation(current_user['id'], auth_version)
+        
+        return {"success": True, "message": "Cuenta desactivada"}
+        
+    except mysql.connector.Error as e:
+        connection.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+    finally:
+        cursor.close()
+        connection.close()
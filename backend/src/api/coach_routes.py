@@ -0,0 +1,82 @@
+"""
+Rutas del panel de entrenador
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import Optional, List
+import json
+import mysql.connector
+from ..utils.security import get_current_user_claims, get_mysql_connection
+from ..database.routing import READ, ANALYTICS
+from ..services.group_stats import get_coach_members, iter_member_stats
+
+router = APIRouter(prefix="/api/coach", tags=["coach"])
+
+@router.get("/members")
+async def list_coach_members(current_user: dict = Depends(get_current_user_claims)):
+    """Miembros asignados al entrenador"""
+
+    connection = get_mysql_connection(READ, current_user['id'])
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo conectar a la base de datos"
+        )
+
+    try:
+        cursor = connection.cursor(dictionary=True)
+        return get_coach_members(cursor, current_user['id'])
+    except mysql.connector.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+    finally:
+        cursor.close()
+        connection.close()
+
+@router.get("/members/stats")
+async def get_members_stats(
+    days: int = 30,
+    member_ids: Optional[List[int]] = Query(None),
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """Estadísticas avanzadas de todos los miembros del entrenador
+
+    Respuesta NDJSON: una línea por miembro, emitida según se resuelve
+    cada bloque de miembros. `member_ids` limita la lista.
+    """
+
+    connection = get_mysql_connection(ANALYTICS, current_user['id'])
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo conectar a la base de datos"
+        )
+
+    try:
+        cursor = connection.cursor(dictionary=True)
+        members = get_coach_members(cursor, current_user['id'])
+    except mysql.connector.Error as e:
+        cursor.close()
+        connection.close()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+
+    if member_ids:
+        requested = set(member_ids)
+        members = [member for member in members if member['id'] in requested]
+
+    def generate():
+        # Generador síncrono: Starlette lo recorre en el threadpool
+        try:
+            for member_stats in iter_member_stats(cursor, members, days):
+                yield json.dumps(jsonable_encoder(member_stats), ensure_ascii=False) + "\n"
+        finally:
+            cursor.close()
+            connection.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -1,30 +1,92 @@
 """
 Rutas de workout con autenticación
 """
-from fastapi import APIRouter, HTTPException, Depends, status
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect, status
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, Dict, List, Any
-from datetime import datetime, date
+from datetime import date
+import asyncio
 import json
+import os
+import uuid
 import mysql.connector
-from ..utils.security import get_current_user
+from ..utils.security import (
+    get_current_user, get_current_user_claims, get_mysql_connection, mark_user_write, decode_token
+)
+from ..database.routing import READ, ANALYTICS
+from ..models.workout_models import WorkoutSessionCreateWithPose
+from ..services.angle_store import query_angle_range, query_user_trend
+from ..services.job_queue import enqueue_job, get_job, get_session_job, STATUS_DONE, STATUS_FAILED
+from ..services.session_store import save_workout_session, delete_workout_session
+from ..services import leaderboards
+from ..services.user_versions import get_user_version, get_session_changes
+from ..services.retention import restore_performance, remove_archives
+from ..services.progress_stats import get_progress
+from ..services.fatigue import FatigueDetector
+from ..utils import response_cache
 
 router = APIRouter(prefix="/api/workouts", tags=["workouts"])
 
-# ... (mantener modelos existentes y agregar nuevos)
-
-class WorkoutSessionCreateWithPose(BaseModel):
-    exercise_type: str = Field(..., description="Tipo de ejercicio")
-    duration_seconds: int = Field(..., gt=0, description="Duración en segundos")
-    technique_score: float = Field(..., ge=0, le=100, description="Puntuación de técnica")
-    accuracy_percentage: float = Field(..., ge=0, le=100, description="Porcentaje de precisión")
-    total_frames: int = Field(..., ge=0, description="Total de frames procesados")
-    good_frames: int = Field(..., ge=0, description="Frames con buena técnica")
-    avg_angles: Dict[str, float] = Field(default_factory=dict, description="Ángulos promedio")
-    pose_data: Optional[str] = Field(None, description="Datos de pose en JSON")
-    angle_history: Optional[List[Dict]] = Field(None, description="Historial de ángulos")
-    feedback: Optional[List[str]] = Field(None, description="Feedback generado")
-    session_notes: Optional[str] = Field(None, description="Notas de la sesión")
+# Subida de vídeos
+VIDEO_UPLOAD_DIR = os.getenv("VIDEO_UPLOAD_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "uploads", "videos"
+))
+MAX_VIDEO_BYTES = int(os.getenv("MAX_VIDEO_MB", "200")) * 1024 * 1024
+MAX_CONCURRENT_UPLOADS = int(os.getenv("MAX_CONCURRENT_UPLOADS", "4"))
+_active_uploads = 0
+
+# Sesiones en vivo (detección de fatiga) por worker
+MAX_LIVE_SESSIONS = int(os.getenv("MAX_LIVE_SESSIONS", "500"))
+LIVE_AUTH_TIMEOUT = float(os.getenv("LIVE_AUTH_TIMEOUT", "10"))
+_live_sessions = 0
+
+# Sincronización incremental: con más cambios el cliente recarga el listado completo
+SYNC_MAX_CHANGES = int(os.getenv("SYNC_MAX_CHANGES", "200"))
+
+# Listado de sesiones (resumen por sesión), compartido por /sessions y /sync
+SESSION_SUMMARY_QUERY = """
+SELECT 
+    ws.id,
+    ws.session_name,
+    ws.start_time,
+    ws.end_time,
+    ws.duration_minutes,
+    ws.average_score,
+    ws.notes,
+    ws.created_at,
+    et.name as exercise_name,
+    ep.technique_score,
+    ep.avg_knee_angle,
+    ep.avg_hip_angle,
+    ep.avg_shoulder_angle,
+    ep.avg_elbow_angle,
+    ep.stability_score,
+    ep.pose_data,
+    ep.angle_history,
+    ep.feedback
+FROM workout_sessions ws
+LEFT JOIN exercise_performances ep ON ws.id = ep.session_id
+LEFT JOIN exercise_types et ON ep.exercise_type_id = et.id
+WHERE ws.user_id = %s
+"""
+
+def _session_summary(session: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": session['id'],
+        "exercise_type": session['exercise_name'] or 'general',
+        "duration_seconds": int(session['duration_minutes'] * 60),
+        "technique_score": session['technique_score'] or session['average_score'],
+        "created_at": session['created_at'],
+        "has_pose_data": bool(session['pose_data']),
+        "angles": {
+            "knee": session['avg_knee_angle'],
+            "hip": session['avg_hip_angle'],
+            "shoulder": session['avg_shoulder_angle'],
+            "elbow": session['avg_elbow_angle']
+        },
+        "stability_score": session['stability_score'],
+        "feedback": json.loads(session['feedback']) if session['feedback'] else []
+    }
 
 @router.post("/sessions", response_model=Dict[str, Any])
 async def create_workout_session_authenticated(
@@ -43,72 +105,19 @@ async def create_workout_session_authenticated(
     try:
         cursor = connection.cursor(dictionary=True)
         
-        # 1. Crear sesión principal
-        session_query = """
-        INSERT INTO workout_sessions (
-            user_id, session_name, start_time, end_time, 
-            duration_minutes, average_score, notes
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        start_time = datetime.now()
-        end_time = start_time
-        duration_minutes = session_data.duration_seconds / 60
-        
-        cursor.execute(session_query, (
-            current_user['id'],  # Usar ID del usuario autenticado
-            f"Sesión {session_data.exercise_type}",
-            start_time,
-            end_time,
-            duration_minutes,
-            session_data.technique_score,
-            session_data.session_notes or ""
-        ))
-        
-        session_id = cursor.lastrowid
-        
-        # 2. Buscar o crear tipo de ejercicio
-        exercise_type_id = await get_or_create_exercise_type(
-            cursor, session_data.exercise_type
-        )
-        
-        # 3. Crear registro de performance con datos de pose
-        performance_query = """
-        INSERT INTO exercise_performances (
-            session_id, exercise_type_id, user_id, set_number,
-            repetitions, technique_score, avg_knee_angle, avg_hip_angle,
-            avg_shoulder_angle, avg_elbow_angle, movement_speed,
-            stability_score, symmetry_score, pose_data,
-            angle_history, feedback
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        angles = session_data.avg_angles
-        
-        cursor.execute(performance_query, (
-            session_id,
-            exercise_type_id,
-            current_user['id'],
-            1,  # set_number
-            session_data.total_frames,
-            session_data.technique_score,
-            angles.get('leftKnee'),
-            angles.get('leftHip'),
-            angles.get('leftShoulder'),
-            angles.get('leftElbow'),
-            None,  # movement_speed
-            session_data.accuracy_percentage,
-            100.0,  # symmetry_score default
-            session_data.pose_data,
-            json.dumps(session_data.angle_history or []),
-            json.dumps(session_data.feedback or [])
-        ))
+        saved = save_workout_session(cursor, current_user['id'], session_data)
+        session_id = saved['session_id']
         
         connection.commit()
+        mark_user_write(current_user['id'])
+        leaderboards.apply_updates(saved['leaderboard_updates'])
+        response_cache.invalidate_user(current_user['id'])
         
         return {
             "success": True,
             "session_id": session_id,
+            "performance_id": saved['performance_id'],
+            "analysis_job_id": saved['analysis_job_id'],
             "message": "Sesión guardada correctamente",
             "user_id": current_user['id'],
             "data": {
@@ -133,19 +142,173 @@ async def create_workout_session_authenticated(
 
 @router.get("/sessions", response_model=List[Dict[str, Any]])
 async def get_user_sessions_authenticated(
+    request: Request,
     limit: int = 10,
     offset: int = 0,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user_claims)
 ):
     """Obtener sesiones del usuario autenticado"""
     
-    connection = get_mysql_connection()
+    connection = get_mysql_connection(READ, current_user['id'])
     if not connection:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="No se pudo conectar a la base de datos"
         )
             
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # Respuesta cacheada / 304 si los datos del usuario no cambiaron
+        params = {"limit": limit, "offset": offset}
+        version = get_user_version(cursor, current_user['id'])
+        cached = response_cache.lookup(request, current_user['id'], "sessions", params, version)
+        if cached is not None:
+            return cached
+        
+        query = SESSION_SUMMARY_QUERY + """
+        ORDER BY ws.created_at DESC
+        LIMIT %s OFFSET %s
+        """
+        
+        cursor.execute(query, (current_user['id'], limit, offset))
+        sessions = cursor.fetchall()
+        
+        # Procesar y enriquecer resultados
+        result = [_session_summary(session) for session in sessions]
+        
+        return response_cache.store(current_user['id'], "sessions", params, version, result)
+        
+    except mysql.connector.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+    finally:
+        cursor.close()
+        connection.close()
+
+@router.get("/sync")
+async def sync_sessions(
+    since: int = 0,
+    include_sessions: bool = True,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """Cambios en las sesiones del usuario desde la versión `since`
+
+    `version` es el token para la próxima llamada. Sin cambios la respuesta
+    sale de una consulta por clave primaria. `reset` pide al cliente
+    recargar el listado completo (primera sincronización, token de otra
+    base de datos o demasiados cambios). `changed` y `deleted` son los ids
+    creados/modificados y borrados; `sessions` trae el resumen de los primeros.
+    """
+
+    connection = get_mysql_connection(READ, current_user['id'])
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo conectar a la base de datos"
+        )
+
+    try:
+        cursor = connection.cursor(dictionary=True)
+
+        # La versión se lee antes que los cambios: lo que se confirme entre
+        # ambas lecturas llega ahora y otra vez en la siguiente llamada, nunca se pierde
+        version = get_user_version(cursor, current_user['id'])
+        response = {"version": version, "since": since, "reset": False,
+                    "changed": [], "sessions": [], "deleted": []}
+        if since == version:
+            return response
+        if since <= 0 or since > version:
+            return dict(response, reset=True)
+
+        changes = get_session_changes(cursor, current_user['id'], since, SYNC_MAX_CHANGES + 1)
+        if len(changes) > SYNC_MAX_CHANGES:
+            return dict(response, reset=True)
+
+        changed_ids = [change['session_id'] for change in changes if not change['deleted']]
+        response["changed"] = changed_ids
+        response["deleted"] = [change['session_id'] for change in changes if change['deleted']]
+        if not include_sessions:
+            return response
+
+        if changed_ids:
+            placeholders = ", ".join(["%s"] * len(changed_ids))
+            cursor.execute(
+                SESSION_SUMMARY_QUERY + f" AND ws.id IN ({placeholders}) ORDER BY ws.created_at DESC",
+                (current_user['id'], *changed_ids)
+            )
+            response["sessions"] = [_session_summary(session) for session in cursor.fetchall()]
+        return response
+
+    except mysql.connector.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+    finally:
+        cursor.close()
+        connection.close()
+
+@router.delete("/sessions/{session_id}")
+async def delete_workout_session_authenticated(
+    session_id: int,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """Borrar una sesión del usuario (queda como tombstone para /sync)"""
+
+    connection = get_mysql_connection()
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo conectar a la base de datos"
+        )
+
+    try:
+        cursor = connection.cursor(dictionary=True)
+        deleted = delete_workout_session(cursor, current_user['id'], session_id)
+        if deleted is None:
+            connection.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sesión no encontrada"
+            )
+        connection.commit()
+        mark_user_write(current_user['id'])
+        response_cache.invalidate_user(current_user['id'])
+        for exercise_type in deleted['exercise_types']:
+            leaderboards.forget_boards(exercise_type)
+        remove_archives(deleted['archive_paths'])
+        return {"success": True, "session_id": session_id, "message": "Sesión eliminada"}
+
+    except mysql.connector.Error as e:
+        connection.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+    finally:
+        cursor.close()
+        connection.close()
+
+@router.get("/sessions/{session_id}")
+async def get_workout_session_detail(
+    session_id: int,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """Detalle de una sesión con su historial de ángulos
+
+    Si los datos de pose están archivados se restauran antes de responder.
+    """
+    
+    connection = get_mysql_connection()
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo conectar a la base de datos"
+        )
+    
     try:
         cursor = connection.cursor(dictionary=True)
         
@@ -159,6 +322,7 @@ async def get_user_sessions_authenticated(
             ws.average_score,
             ws.notes,
             ws.created_at,
+            ep.id as performance_id,
             et.name as exercise_name,
             ep.technique_score,
             ep.avg_knee_angle,
@@ -166,42 +330,296 @@ async def get_user_sessions_authenticated(
             ep.avg_shoulder_angle,
             ep.avg_elbow_angle,
             ep.stability_score,
-            ep.pose_data,
-            ep.angle_history,
-            ep.feedback
+            ep.feedback,
+            pr.tier as retention_tier
         FROM workout_sessions ws
         LEFT JOIN exercise_performances ep ON ws.id = ep.session_id
         LEFT JOIN exercise_types et ON ep.exercise_type_id = et.id
-        WHERE ws.user_id = %s
-        ORDER BY ws.created_at DESC
-        LIMIT %s OFFSET %s
+        LEFT JOIN pose_retention pr ON pr.performance_id = ep.id
+        WHERE ws.id = %s AND ws.user_id = %s
         """
         
-        cursor.execute(query, (current_user['id'], limit, offset))
-        sessions = cursor.fetchall()
+        cursor.execute(query, (session_id, current_user['id']))
+        session = cursor.fetchone()
+        if not session:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sesión no encontrada"
+            )
         
-        # Procesar y enriquecer resultados
-        result = []
-        for session in sessions:
-            session_data = {
-                "id": session['id'],
-                "exercise_type": session['exercise_name'] or 'general',
-                "duration_seconds": int(session['duration_minutes'] * 60),
-                "technique_score": session['technique_score'] or session['average_score'],
-                "created_at": session['created_at'],
-                "has_pose_data": bool(session['pose_data']),
-                "angles": {
-                    "knee": session['avg_knee_angle'],
-                    "hip": session['avg_hip_angle'],
-                    "shoulder": session['avg_shoulder_angle'],
-                    "elbow": session['avg_elbow_angle']
-                },
-                "stability_score": session['stability_score'],
-                "feedback": json.loads(session['feedback']) if session['feedback'] else []
+        if session['retention_tier'] == 'archived':
+            restore_performance(cursor, session['performance_id'])
+            connection.commit()
+            session['retention_tier'] = 'restored'
+        
+        cursor.execute(
+            "SELECT pose_data, angle_history FROM exercise_performances WHERE id = %s",
+            (session['performance_id'],)
+        )
+        pose = cursor.fetchone() or {}
+        
+        cursor.execute(
+            "SELECT metrics FROM performance_kinematics WHERE performance_id = %s",
+            (session['performance_id'],)
+        )
+        kinematics = cursor.fetchone()
+        
+        return {
+            "id": session['id'],
+            "session_name": session['session_name'],
+            "exercise_type": session['exercise_name'] or 'general',
+            "duration_seconds": int(session['duration_minutes'] * 60),
+            "technique_score": session['technique_score'] or session['average_score'],
+            "start_time": session['start_time'],
+            "end_time": session['end_time'],
+            "created_at": session['created_at'],
+            "notes": session['notes'],
+            "performance_id": session['performance_id'],
+            "angles": {
+                "knee": session['avg_knee_angle'],
+                "hip": session['avg_hip_angle'],
+                "shoulder": session['avg_shoulder_angle'],
+                "elbow": session['avg_elbow_angle']
+            },
+            "stability_score": session['stability_score'],
+            "feedback": json.loads(session['feedback']) if session['feedback'] else [],
+            "pose_data": json.loads(pose['pose_data']) if pose.get('pose_data') else None,
+            "angle_history": json.loads(pose['angle_history']) if pose.get('angle_history') else [],
+            "kinematics": json.loads(kinematics['metrics']) if kinematics and kinematics['metrics'] else None,
+            "retention_tier": session['retention_tier'] or 'full'
+        }
+        
+    except (OSError, ValueError) as e:
+        connection.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"No se pudieron restaurar los datos archivados: {str(e)}"
+        )
+    except mysql.connector.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+    finally:
+        cursor.close()
+        connection.close()
+
+@router.websocket("/live")
+async def live_session(websocket: WebSocket, exercise_type: str = "squat"):
+    """Detección de fatiga en vivo sobre los frames de ángulos del navegador
+
+    El primer mensaje autentica: {"token": "<JWT>"} (en la URL acabaría en
+    los logs del servidor). Cada mensaje siguiente es un frame (o lista de
+    frames) con el formato de `angle_history` y tiempo `t` en ms. Solo se
+    responde cuando hay eventos: repetición completada o aviso de degradación.
+    """
+    global _live_sessions
+    
+    if _live_sessions >= MAX_LIVE_SESSIONS:
+        await websocket.close(code=1013)
+        return
+    
+    await websocket.accept()
+    _live_sessions += 1
+    try:
+        try:
+            hello = await asyncio.wait_for(websocket.receive_json(), LIVE_AUTH_TIMEOUT)
+            decode_token(str(hello["token"]))
+        except (asyncio.TimeoutError, HTTPException, ValueError, KeyError, TypeError):
+            await websocket.close(code=1008)
+            return
+        
+        detector = FatigueDetector(exercise_type)
+        while True:
+            message = await websocket.receive_json()
+            frames = message if isinstance(message, list) else [message]
+            events = []
+            for frame in frames:
+                if isinstance(frame, dict) and isinstance(frame.get("t"), (int, float)):
+                    events.extend(detector.push(frame["t"], frame))
+            if events:
+                await websocket.send_json(events)
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        _live_sessions -= 1
+
+@router.get("/sessions/{session_id}/analysis")
+async def get_session_analysis(
+    session_id: int,
+    wait: int = 0,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """Estado y resultado del análisis asíncrono de una sesión
+
+    Con `wait` > 0 la petición espera (hasta 30 s) a que el trabajo termine.
+    """
+    
+    deadline = asyncio.get_running_loop().time() + min(max(wait, 0), 30)
+    
+    while True:
+        connection = get_mysql_connection(READ, current_user['id'])
+        if not connection:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="No se pudo conectar a la base de datos"
+            )
+        
+        try:
+            cursor = connection.cursor(dictionary=True)
+            job = get_session_job(cursor, session_id, current_user['id'])
+        except mysql.connector.Error as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error de base de datos: {str(e)}"
+            )
+        finally:
+            cursor.close()
+            connection.close()
+        
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No hay análisis para esta sesión"
+            )
+        
+        finished = job['status'] in (STATUS_DONE, STATUS_FAILED)
+        if finished or asyncio.get_running_loop().time() >= deadline:
+            return {
+                "session_id": session_id,
+                "job_id": job['id'],
+                "status": job['status'],
+                "attempts": job['attempts'],
+                "result": job['result'],
+                "error": job['error'] if job['status'] == STATUS_FAILED else None,
+                "updated_at": job['updated_at']
             }
-            result.append(session_data)
         
-        return result
+        await asyncio.sleep(1)
+
+@router.post("/videos", status_code=status.HTTP_202_ACCEPTED)
+async def upload_workout_video(
+    request: Request,
+    exercise_type: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Subir un vídeo de una serie para analizarlo en los workers
+
+    El cuerpo de la petición es el vídeo en crudo; se escribe a disco por
+    bloques sin cargarlo entero en memoria.
+    """
+    global _active_uploads
+    if _active_uploads >= MAX_CONCURRENT_UPLOADS:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas subidas simultáneas, inténtalo más tarde",
+            headers={"Retry-After": "10"}
+        )
+    
+    _active_uploads += 1
+    os.makedirs(VIDEO_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(VIDEO_UPLOAD_DIR, f"{current_user['id']}-{uuid.uuid4().hex}.video")
+    size = 0
+    
+    try:
+        with open(path, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > MAX_VIDEO_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="El vídeo supera el tamaño máximo permitido"
+                    )
+                await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    finally:
+        _active_uploads -= 1
+    
+    if size == 0:
+        os.remove(path)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El vídeo está vacío"
+        )
+    
+    connection = get_mysql_connection()
+    if not connection:
+        os.remove(path)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo conectar a la base de datos"
+        )
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        job_id = enqueue_job(
+            cursor,
+            "video_analysis",
+            current_user['id'],
+            {"path": path, "exercise_type": exercise_type, "size_bytes": size},
+            max_attempts=2
+        )
+        connection.commit()
+        
+        return {
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "size_bytes": size,
+            "message": "Vídeo recibido, análisis en cola"
+        }
+        
+    except mysql.connector.Error as e:
+        connection.rollback()
+        os.remove(path)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+    finally:
+        cursor.close()
+        connection.close()
+
+@router.get("/videos/{job_id}")
+async def get_video_analysis_status(
+    job_id: int,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """Progreso y resultado del análisis de un vídeo subido"""
+    
+    connection = get_mysql_connection()
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo conectar a la base de datos"
+        )
+            
+    try:
+        cursor = connection.cursor(dictionary=True)
+        job = get_job(cursor, job_id, current_user['id'])
+        
+        if not job or job['job_type'] != "video_analysis":
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Análisis de vídeo no encontrado"
+            )
+        
+        if job['status'] == STATUS_DONE:
+            # La sesión la guardó worker.py, fuera de la ventana read-your-writes
+            # de este proceso: anclar al usuario para que el listado la vea ya
+            mark_user_write(current_user['id'])
+        
+        return {
+            "job_id": job['id'],
+            "status": job['status'],
+            "progress": job['progress'],
+            "session_id": job['session_id'],
+            "result": job['result'],
+            "error": job['error'] if job['status'] == STATUS_FAILED else None,
+            "updated_at": job['updated_at']
+        }
         
     except mysql.connector.Error as e:
         raise HTTPException(
@@ -212,14 +630,46 @@ async def get_user_sessions_authenticated(
         cursor.close()
         connection.close()
 
+@router.get("/leaderboards/{exercise_type}")
+async def get_exercise_leaderboard(
+    exercise_type: str,
+    board: str = "best_score",
+    window: str = "all",
+    limit: int = 10,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """Ranking de un ejercicio (best_score, sessions, streak) por ventana (all, daily, weekly)"""
+    
+    try:
+        return leaderboards.get_leaderboard(
+            lambda: get_mysql_connection(ANALYTICS), board, exercise_type, window,
+            min(max(limit, 1), leaderboards.LEADERBOARD_SIZE)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except ConnectionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    except mysql.connector.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+
 @router.get("/stats/advanced")
 async def get_advanced_stats(
+    request: Request,
     days: int = 30,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user_claims)
 ):
     """Estadísticas avanzadas del usuario"""
     
-    connection = get_mysql_connection()
+    connection = get_mysql_connection(ANALYTICS, current_user['id'])
     if not connection:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -229,6 +679,13 @@ async def get_advanced_stats(
     try:
         cursor = connection.cursor(dictionary=True)
         
+        # Las estadísticas dependen de NOW(): la clave incluye el día
+        params = {"days": days, "date": date.today().isoformat()}
+        version = get_user_version(cursor, current_user['id'])
+        cached = response_cache.lookup(request, current_user['id'], "stats_advanced", params, version)
+        if cached is not None:
+            return cached
+        
         # Estadísticas generales
         general_stats_query = """
         SELECT 
@@ -283,14 +740,14 @@ async def get_advanced_stats(
         cursor.execute(weekly_trend_query, (current_user['id'], days))
         weekly_trend = cursor.fetchall()
         
-        return {
+        return response_cache.store(current_user['id'], "stats_advanced", params, version, {
             "user_id": current_user['id'],
             "period_days": days,
             "general_stats": general_stats,
             "exercise_progress": exercise_progress,
             "weekly_trend": weekly_trend,
             "pose_analysis_available": general_stats['sessions_with_pose'] > 0
-        }
+        })
         
     except mysql.connector.Error as e:
         raise HTTPException(
@@ -301,25 +758,125 @@ async def get_advanced_stats(
         cursor.close()
         connection.close()
 
-# Función auxiliar (mantener la existente y actualizar)
-async def get_or_create_exercise_type(cursor, exercise_name: str) -> int:
-    """Obtener o crear tipo de ejercicio"""
-    cursor.execute("SELECT id FROM exercise_types WHERE name = %s", (exercise_name,))
-    result = cursor.fetchone()
-    
-    if result:
-        return result['id']
+@router.get("/progress")
+async def get_progress_stats(
+    request: Request,
+    exercise_type: Optional[str] = None,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """Progreso por ejercicio (media, desviación, tendencia, récords y mejora del mes)"""
     
-    insert_query = """
-    INSERT INTO exercise_types (name, description, category, difficulty_level)
-    VALUES (%s, %s, %s, %s)
-    """
+    connection = get_mysql_connection(READ, current_user['id'])
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo conectar a la base de datos"
+        )
+            
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # La mejora mensual depende del mes actual
+        params = {"exercise_type": exercise_type, "month": date.today().strftime("%Y-%m")}
+        version = get_user_version(cursor, current_user['id'])
+        cached = response_cache.lookup(request, current_user['id'], "progress", params, version)
+        if cached is not None:
+            return cached
+        
+        return response_cache.store(current_user['id'], "progress", params, version, {
+            "user_id": current_user['id'],
+            "exercises": get_progress(cursor, current_user['id'], exercise_type)
+        })
+        
+    except mysql.connector.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+    finally:
+        cursor.close()
+        connection.close()
+
+@router.get("/performances/{performance_id}/angles")
+async def get_performance_angles(
+    performance_id: int,
+    joint: str = "leftKnee",
+    start: float = 0,
+    end: Optional[float] = None,
+    bucket: Optional[float] = None,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """Serie de ángulos de una performance en un rango de tiempo (segundos), opcionalmente agregada por buckets"""
     
-    cursor.execute(insert_query, (
-        exercise_name,
-        f"Ejercicio {exercise_name} - análisis con IA",
-        "strength",
-        "beginner"
-    ))
+    connection = get_mysql_connection(READ, current_user['id'])
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo conectar a la base de datos"
+        )
+            
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        cursor.execute(
+            "SELECT id FROM exercise_performances WHERE id = %s AND user_id = %s",
+            (performance_id, current_user['id'])
+        )
+        if not cursor.fetchone():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Performance no encontrada"
+            )
+        
+        return query_angle_range(
+            cursor,
+            performance_id,
+            joint,
+            start_ms=int(start * 1000),
+            end_ms=int(end * 1000) if end is not None else None,
+            bucket_ms=int(bucket * 1000) if bucket else None
+        )
+        
+    except mysql.connector.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+    finally:
+        cursor.close()
+        connection.close()
+
+@router.get("/angles/trend")
+async def get_angle_trend(
+    joint: str = "leftKnee",
+    days: int = 180,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """Tendencia diaria de una articulación del usuario"""
     
-    return cursor.lastrowid
\ No newline at end of file
+    connection = get_mysql_connection(ANALYTICS, current_user['id'])
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="No se pudo conectar a la base de datos"
+        )
+            
+    try:
+        cursor = connection.cursor(dictionary=True)
+        trend = query_user_trend(cursor, current_user['id'], joint, days)
+        
+        return {
+            "user_id": current_user['id'],
+            "joint": joint,
+            "period_days": days,
+            "trend": trend
+        }
+        
+    except mysql.connector.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error de base de datos: {str(e)}"
+        )
+    finally:
+        cursor.close()
+        connection.close()
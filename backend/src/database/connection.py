@@ -1,15 +1,21 @@
 """
 Configuración de conexión a la base de datos MySQL
+
+El engine se construye en el primer uso: importar este módulo no abre
+conexiones ni escribe en stdout.
 """
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import logging
 import os
-from dotenv import load_dotenv
+from ..utils.env import load_environment
 
 # Cargar variables de entorno
-load_dotenv()
+load_environment()
+
+logger = logging.getLogger(__name__)
 
 # Configuración de la base de datos
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -21,24 +27,38 @@ DB_NAME = os.getenv("DB_NAME", "gymform_analyzer")
 # URL de conexión a MySQL
 DATABASE_URL = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-print(f"🔗 Conectando a: mysql://{DB_USER}:****@{DB_HOST}:{DB_PORT}/{DB_NAME}")
-
-# Crear engine de SQLAlchemy
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,  # Muestra las consultas SQL en desarrollo
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,  # Verifica conexiones antes de usarlas
-    pool_recycle=3600,  # Recicla conexiones cada hora
-)
+# Registrar las consultas SQL (logger sqlalchemy.engine, nivel INFO) solo si se pide
+SQL_ECHO = os.getenv("SQL_ECHO", "False").lower() == "true"
 
-# Crear sesión
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_engine = None
+_session_factory = None
 
 # Base para los modelos
 Base = declarative_base()
 
+def get_engine():
+    """Engine de SQLAlchemy, creado en el primer uso"""
+    global _engine
+    if _engine is None:
+        if SQL_ECHO:
+            # Pasa por el logging del proceso en lugar del echo de SQLAlchemy a stdout
+            logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+        _engine = create_engine(
+            DATABASE_URL,
+            pool_size=10,
+            max_overflow=20,
+            pool_pre_ping=True,  # Verifica conexiones antes de usarlas
+            pool_recycle=3600,  # Recicla conexiones cada hora
+        )
+    return _engine
+
+def SessionLocal():
+    """Crear sesión (fábrica perezosa)"""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _session_factory()
+
 # =====================================
 # FUNCIONES DE CONEXIÓN
 # =====================================
@@ -59,12 +79,12 @@ def test_connection():
     Probar conexión a la base de datos
     """
     try:
-        with engine.connect() as connection:
+        with get_engine().connect() as connection:
             result = connection.execute(text("SELECT 1"))
-            print("✅ Conexión a MySQL exitosa!")
+            logger.info("Conexión a MySQL exitosa")
             return True
     except Exception as e:
-        print(f"❌ Error conectando a MySQL: {e}")
+        logger.error("Error conectando a MySQL: %s", e)
         return False
 
 def create_database_if_not_exists():
@@ -85,22 +105,22 @@ def create_database_if_not_exists():
             if not result.fetchone():
                 # Crear la base de datos
                 connection.execute(text(f"CREATE DATABASE {DB_NAME} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci"))
-                print(f"✅ Base de datos '{DB_NAME}' creada exitosamente!")
+                logger.info("Base de datos '%s' creada", DB_NAME)
             else:
-                print(f"✅ Base de datos '{DB_NAME}' ya existe!")
+                logger.info("Base de datos '%s' ya existe", DB_NAME)
                 
         temp_engine.dispose()
         return True
         
     except Exception as e:
-        print(f"❌ Error creando base de datos: {e}")
+        logger.error("Error creando base de datos: %s", e)
         return False
 
 def initialize_database():
     """
     Inicializar la base de datos completa
     """
-    print("🚀 Inicializando base de datos...")
+    logger.info("Inicializando base de datos...")
     
     # 1. Crear base de datos si no existe
     if not create_database_if_not_exists():
@@ -112,9 +132,9 @@ def initialize_database():
     
     # 3. Crear tablas (cuando tengamos los modelos)
     try:
-        Base.metadata.create_all(bind=engine)
-        print("✅ Tablas creadas/verificadas exitosamente!")
+        Base.metadata.create_all(bind=get_engine())
+        logger.info("Tablas creadas/verificadas")
         return True
     except Exception as e:
-        print(f"❌ Error creando tablas: {e}")
+        logger.error("Error creando tablas: %s", e)
         return False
\ No newline at end of file
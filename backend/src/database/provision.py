@@ -0,0 +1,82 @@
+"""
+Aprovisionamiento de la base de datos (comando de administración, no se ejecuta al arrancar)
+"""
+import logging
+import os
+import mysql.connector
+
+from .schema import create_tables
+from ..utils.env import load_environment
+
+load_environment()
+
+logger = logging.getLogger(__name__)
+
+def _server_config(with_database: bool = False) -> dict:
+    config = {
+        'host': os.getenv("DB_HOST", "localhost"),
+        'port': int(os.getenv("DB_PORT", "3306")),
+        'user': os.getenv("DB_USER", "root"),
+        'password': os.getenv("DB_PASSWORD", ""),
+        'charset': 'utf8mb4'
+    }
+    if with_database:
+        config['database'] = os.getenv("DB_NAME", "gymform_analyzer")
+    return config
+
+def create_database_if_not_exists() -> bool:
+    """Crear base de datos si no existe"""
+    try:
+        connection = mysql.connector.connect(**_server_config())
+        cursor = connection.cursor()
+        
+        db_name = os.getenv("DB_NAME", "gymform_analyzer")
+        
+        cursor.execute("SHOW DATABASES LIKE %s", (db_name,))
+        if not cursor.fetchone():
+            cursor.execute(f"CREATE DATABASE `{db_name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+            logger.info("Base de datos '%s' creada", db_name)
+        else:
+            logger.info("Base de datos '%s' ya existe", db_name)
+            
+        cursor.close()
+        connection.close()
+        return True
+        
+    except Exception as e:
+        logger.error("Error creando base de datos: %s", e)
+        return False
+
+def provision_database() -> bool:
+    """Crear la base de datos y las tablas auxiliares"""
+    if not create_database_if_not_exists():
+        return False
+    
+    try:
+        connection = mysql.connector.connect(**_server_config(with_database=True))
+    except mysql.connector.Error as e:
+        logger.error("Error conectando a MySQL: %s", e)
+        return False
+    
+    try:
+        if not create_tables(connection):
+            return False
+        logger.info("Tablas auxiliares verificadas")
+        return True
+    finally:
+        connection.close()
+
+def check_database() -> bool:
+    """Comprobar que la base de datos responde"""
+    try:
+        connection = mysql.connector.connect(**_server_config(with_database=True))
+        cursor = connection.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+        connection.close()
+        logger.info("Conexión a MySQL exitosa")
+        return True
+    except mysql.connector.Error as e:
+        logger.error("Error conectando a MySQL: %s", e)
+        return False
@@ -0,0 +1,158 @@
+"""
+Enrutado de lecturas y escrituras entre el primario y las réplicas
+
+Cada conexión se pide con una clase de consulta:
+- WRITE: escrituras y lecturas que deben ver el último commit (primario).
+- READ: listados e históricos del usuario (réplicas de lectura).
+- ANALYTICS: agregados pesados (réplicas analíticas, o las de lectura).
+
+Read-your-writes: tras guardar, el usuario queda anclado al primario
+durante una ventana corta (`StickyWindow`, memoria compartida entre los
+workers de gunicorn de la máquina). Una réplica cuyo retraso supera
+`max_lag` o que no responde se salta hasta la siguiente comprobación; sin
+réplicas sanas la lectura va al primario.
+
+Los extremos son fábricas de conexiones, así que el router se prueba
+en local con dos instancias o con SQLite:
+    router = ReplicaRouter(lambda: sqlite3.connect("primary.db"),
+                           [ReplicaEndpoint("r1", lambda: sqlite3.connect("replica.db"))],
+                           lag_probe=lambda connection: 0.0)
+"""
+import itertools
+import logging
+import mmap
+import time
+from collections import defaultdict
+from typing import Optional, Dict, List, Any, Callable, Sequence
+
+logger = logging.getLogger(__name__)
+
+WRITE = "write"
+READ = "read"
+ANALYTICS = "analytics"
+
+# =====================================
+# VENTANA DE LECTURA DEL PRIMARIO
+# =====================================
+
+class StickyWindow:
+    """Usuarios que escribieron hace menos de `seconds`
+
+    Tabla de tamaño fijo en un mmap anónimo compartido: creada antes del
+    fork (gunicorn con preload) la ven todos los workers. Dos usuarios en
+    la misma celda solo provocan lecturas de más en el primario.
+    """
+
+    def __init__(self, seconds: float, slots: int = 4096):
+        self.seconds = seconds
+        self.slots = slots
+        self._buffer = mmap.mmap(-1, slots * 8)
+        self._until = memoryview(self._buffer).cast("d")
+
+    def mark(self, user_id: int) -> None:
+        self._until[user_id % self.slots] = time.time() + self.seconds
+
+    def active(self, user_id: int) -> bool:
+        return self._until[user_id % self.slots] > time.time()
+
+# =====================================
+# RÉPLICAS
+# =====================================
+
+class ReplicaEndpoint:
+    """Réplica con su fábrica de conexiones y el último retraso medido"""
+
+    def __init__(self, name: str, connect: Callable[[], Any]):
+        self.name = name
+        self.connect = connect
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.checked_at = float("-inf")
+
+    def status(self) -> Dict[str, Any]:
+        return {"name": self.name, "healthy": self.healthy, "lag_seconds": self.lag}
+
+class ReplicaRouter:
+    """Elegir primario o réplica según la clase de consulta"""
+
+    def __init__(self, primary: Callable[[], Any], replicas: Sequence[ReplicaEndpoint] = (),
+                 analytics: Sequence[ReplicaEndpoint] = (), max_lag: float = 5.0,
+                 check_interval: float = 5.0, sticky_seconds: float = 10.0,
+                 lag_probe: Optional[Callable[[Any], Optional[float]]] = None):
+        self.primary = primary
+        self.groups: Dict[str, List[ReplicaEndpoint]] = {
+            READ: list(replicas),
+            ANALYTICS: list(analytics) or list(replicas)
+        }
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky = StickyWindow(sticky_seconds)
+        self.lag_probe = lag_probe
+        self._turn = itertools.count()
+        self._counters: Dict[str, int] = defaultdict(int)
+
+    def mark_write(self, user_id: int) -> None:
+        """Anclar al usuario al primario tras un commit suyo"""
+        self.sticky.mark(user_id)
+
+    def connection(self, query_class: str = WRITE, user_id: Optional[int] = None):
+        """Conexión para una clase de consulta (la del primario puede ser None si no conecta)"""
+        endpoints = self.groups.get(query_class)
+        if endpoints and not (user_id is not None and self.sticky.active(user_id)):
+            start = next(self._turn)
+            for i in range(len(endpoints)):
+                endpoint = endpoints[(start + i) % len(endpoints)]
+                connection = self._replica_connection(endpoint)
+                if connection is not None:
+                    self._counters[f"{query_class}:{endpoint.name}"] += 1
+                    return connection
+        self._counters[f"{query_class}:primary"] += 1
+        return self.primary()
+
+    def _replica_connection(self, endpoint: ReplicaEndpoint):
+        now = time.monotonic()
+        due = now - endpoint.checked_at >= self.check_interval
+        if not endpoint.healthy and not due:
+            return None
+
+        try:
+            connection = endpoint.connect()
+        except Exception as e:
+            self._mark(endpoint, now, None, False, f"sin conexión: {e}")
+            return None
+
+        if due:
+            lag, healthy, reason = None, True, ""
+            if self.lag_probe is not None:
+                try:
+                    lag = self.lag_probe(connection)
+                    reason = "no es réplica" if lag is None else f"retraso de {lag:.1f}s"
+                except Exception as e:
+                    reason = f"error midiendo el retraso: {e}"
+                healthy = lag is not None and lag <= self.max_lag
+            if not self._mark(endpoint, now, lag, healthy, reason):
+                connection.close()
+                return None
+        return connection
+
+    def _mark(self, endpoint: ReplicaEndpoint, now: float, lag: Optional[float],
+              healthy: bool, reason: str) -> bool:
+        if endpoint.healthy and not healthy:
+            logger.warning("Réplica %s fuera de servicio (%s), lecturas al primario", endpoint.name, reason)
+        elif healthy and not endpoint.healthy:
+            logger.info("Réplica %s de nuevo en servicio", endpoint.name)
+        endpoint.healthy, endpoint.lag, endpoint.checked_at = healthy, lag, now
+        return healthy
+
+    def stats(self) -> Dict[str, Any]:
+        """Conexiones servidas por clase y extremo, y estado de las réplicas"""
+        seen = {}
+        for endpoints in self.groups.values():
+            for endpoint in endpoints:
+                seen[endpoint.name] = endpoint.status()
+        return {
+            "connections": dict(self._counters),
+            "replicas": list(seen.values()),
+            "max_lag_seconds": self.max_lag,
+            "sticky_seconds": self.sticky.seconds
+        }
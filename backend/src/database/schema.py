@@ -0,0 +1,218 @@
+"""
+Esquema de las tablas auxiliares del backend
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+# DEFINICIONES DE TABLAS
+# =====================================
+
+ANGLE_SAMPLE_CHUNKS_TABLE = """
+CREATE TABLE IF NOT EXISTS angle_sample_chunks (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    performance_id INT NOT NULL,
+    user_id INT NOT NULL,
+    chunk_index INT NOT NULL,
+    recorded_at DATETIME NOT NULL,
+    t_start_ms INT NOT NULL,
+    t_end_ms INT NOT NULL,
+    sample_count INT NOT NULL,
+    joints VARCHAR(255) NOT NULL,
+    summary JSON NOT NULL,
+    payload MEDIUMBLOB NOT NULL,
+    UNIQUE KEY uq_chunk (performance_id, chunk_index),
+    KEY idx_performance_time (performance_id, t_start_ms, t_end_ms),
+    KEY idx_user_time (user_id, recorded_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+ANALYSIS_JOBS_TABLE = """
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    job_type VARCHAR(50) NOT NULL,
+    user_id INT NOT NULL,
+    session_id INT NULL,
+    payload JSON NULL,
+    priority INT NOT NULL DEFAULT 5,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    progress FLOAT NOT NULL DEFAULT 0,
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    run_after DATETIME NOT NULL,
+    locked_by VARCHAR(100) NULL,
+    locked_at DATETIME NULL,
+    result JSON NULL,
+    error TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_queue (status, priority, run_after),
+    KEY idx_session (session_id, job_type),
+    KEY idx_type_status (job_type, status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+# Una fila por tipo de trabajo limitado: bloquearla serializa el conteo de
+# trabajos en ejecución de ese tipo dentro de la transacción de reclamo
+ANALYSIS_JOB_TYPE_LOCKS_TABLE = """
+CREATE TABLE IF NOT EXISTS analysis_job_type_locks (
+    job_type VARCHAR(50) NOT NULL PRIMARY KEY
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+LEADERBOARD_ENTRIES_TABLE = """
+CREATE TABLE IF NOT EXISTS leaderboard_entries (
+    board VARCHAR(30) NOT NULL,
+    exercise_type VARCHAR(100) NOT NULL,
+    period VARCHAR(20) NOT NULL,
+    user_id INT NOT NULL,
+    value DOUBLE NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (board, exercise_type, period, user_id),
+    KEY idx_rank (board, exercise_type, period, value),
+    KEY idx_updated (updated_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+LEADERBOARD_STREAKS_TABLE = """
+CREATE TABLE IF NOT EXISTS leaderboard_streaks (
+    user_id INT NOT NULL,
+    exercise_type VARCHAR(100) NOT NULL,
+    last_day DATE NOT NULL,
+    current_streak INT NOT NULL,
+    best_streak INT NOT NULL,
+    PRIMARY KEY (user_id, exercise_type)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+USER_DATA_VERSIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS user_data_versions (
+    user_id INT NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+USER_AUTH_VERSIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS user_auth_versions (
+    user_id INT NOT NULL PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_updated (updated_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+REVOKED_TOKENS_TABLE = """
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti CHAR(32) NOT NULL PRIMARY KEY,
+    user_id INT NOT NULL,
+    expires_at DATETIME NOT NULL,
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_user_expires (user_id, expires_at),
+    KEY idx_expires (expires_at),
+    KEY idx_revoked (revoked_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+SESSION_CHANGES_TABLE = """
+CREATE TABLE IF NOT EXISTS session_changes (
+    user_id INT NOT NULL,
+    session_id INT NOT NULL,
+    version BIGINT NOT NULL,
+    deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    changed_at DATETIME NOT NULL,
+    PRIMARY KEY (user_id, session_id),
+    KEY idx_user_version (user_id, version)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+POSE_RETENTION_TABLE = """
+CREATE TABLE IF NOT EXISTS pose_retention (
+    performance_id INT NOT NULL PRIMARY KEY,
+    tier ENUM('downsampled', 'archived', 'restored') NOT NULL,
+    original_samples INT NULL,
+    kept_samples INT NULL,
+    archive_path VARCHAR(512) NULL,
+    checksum CHAR(64) NULL,
+    processed_at DATETIME NOT NULL,
+    restored_at DATETIME NULL,
+    KEY idx_tier (tier, restored_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+USER_EXERCISE_STATS_TABLE = """
+CREATE TABLE IF NOT EXISTS user_exercise_stats (
+    user_id INT NOT NULL,
+    exercise_type_id INT NOT NULL,
+    session_count INT NOT NULL DEFAULT 0,
+    last_session_at DATETIME NULL,
+    metrics JSON NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, exercise_type_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+COACH_MEMBERS_TABLE = """
+CREATE TABLE IF NOT EXISTS coach_members (
+    coach_id INT NOT NULL,
+    member_id INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (coach_id, member_id),
+    KEY idx_member (member_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+PERFORMANCE_KINEMATICS_TABLE = """
+CREATE TABLE IF NOT EXISTS performance_kinematics (
+    performance_id INT NOT NULL PRIMARY KEY,
+    frames LONGBLOB NULL,
+    metrics JSON NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+PERFORMANCE_KEYFRAMES_TABLE = """
+CREATE TABLE IF NOT EXISTS performance_keyframes (
+    performance_id INT NOT NULL PRIMARY KEY,
+    tolerance FLOAT NOT NULL,
+    original_samples INT NOT NULL,
+    kept_samples INT NOT NULL,
+    processed_at DATETIME NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+TABLES = {
+    "angle_sample_chunks": ANGLE_SAMPLE_CHUNKS_TABLE,
+    "analysis_jobs": ANALYSIS_JOBS_TABLE,
+    "analysis_job_type_locks": ANALYSIS_JOB_TYPE_LOCKS_TABLE,
+    "leaderboard_entries": LEADERBOARD_ENTRIES_TABLE,
+    "leaderboard_streaks": LEADERBOARD_STREAKS_TABLE,
+    "user_data_versions": USER_DATA_VERSIONS_TABLE,
+    "user_auth_versions": USER_AUTH_VERSIONS_TABLE,
+    "revoked_tokens": REVOKED_TOKENS_TABLE,
+    "session_changes": SESSION_CHANGES_TABLE,
+    "pose_retention": POSE_RETENTION_TABLE,
+    "user_exercise_stats": USER_EXERCISE_STATS_TABLE,
+    "coach_members": COACH_MEMBERS_TABLE,
+    "performance_kinematics": PERFORMANCE_KINEMATICS_TABLE,
+    "performance_keyframes": PERFORMANCE_KEYFRAMES_TABLE,
+}
+
+# =====================================
+# CREACIÓN
+# =====================================
+
+def create_tables(connection) -> bool:
+    """Crear las tablas auxiliares si no existen"""
+    cursor = connection.cursor()
+    try:
+        for name, ddl in TABLES.items():
+            cursor.execute(ddl)
+        connection.commit()
+        return True
+    except Exception as e:
+        logger.error("Error creando tablas auxiliares: %s", e)
+        return False
+    finally:
+        cursor.close()
@@ -0,0 +1,48 @@
+"""
+Modelos Pydantic para sesiones de entrenamiento
+"""
+from pydantic import BaseModel, Field, field_validator
+from typing import Annotated, Optional, Dict, List, Tuple, Union
+
+# Puntos por frame: los 12 de la cinemática o los 33 landmarks de MediaPipe
+WORLD_LANDMARK_COUNTS = (12, 33)
+
+class WorldLandmarkPoint(BaseModel):
+    x: float
+    y: float
+    z: float
+    visibility: Optional[float] = None
+
+# Lista [x, y, z] primero: es el formato habitual y evita probar las dos formas
+LandmarkCoordinates = Annotated[
+    Union[Tuple[float, float, float], WorldLandmarkPoint], Field(union_mode="left_to_right")
+]
+
+class WorldLandmarkFrame(BaseModel):
+    t: float = Field(..., ge=0, description="Tiempo del frame en ms")
+    points: List[Optional[LandmarkCoordinates]] = Field(
+        ..., description="Puntos [x, y, z] o {x, y, z} en metros; null si no se detectó"
+    )
+
+    @field_validator("points")
+    @classmethod
+    def check_point_count(cls, points):
+        if len(points) not in WORLD_LANDMARK_COUNTS:
+            raise ValueError("Se esperan 12 o 33 puntos por frame")
+        return points
+
+class WorkoutSessionCreateWithPose(BaseModel):
+    exercise_type: str = Field(..., description="Tipo de ejercicio")
+    duration_seconds: int = Field(..., gt=0, description="Duración en segundos")
+    technique_score: float = Field(..., ge=0, le=100, description="Puntuación de técnica")
+    accuracy_percentage: float = Field(..., ge=0, le=100, description="Porcentaje de precisión")
+    total_frames: int = Field(..., ge=0, description="Total de frames procesados")
+    good_frames: int = Field(..., ge=0, description="Frames con buena técnica")
+    avg_angles: Dict[str, float] = Field(default_factory=dict, description="Ángulos promedio")
+    pose_data: Optional[str] = Field(None, description="Datos de pose en JSON")
+    angle_history: Optional[List[Dict]] = Field(None, description="Historial de ángulos")
+    keyframe_tolerance: Optional[float] = Field(None, gt=0, description="Tolerancia (grados) si angle_history ya viene reducido a keyframes")
+    original_samples: Optional[int] = Field(None, ge=0, description="Frames antes de reducir a keyframes en el cliente")
+    world_landmarks: Optional[List[WorldLandmarkFrame]] = Field(None, description="Serie de world landmarks 3D ({t, points})")
+    feedback: Optional[List[str]] = Field(None, description="Feedback generado")
+    session_notes: Optional[str] = Field(None, description="Notas de la sesión")
@@ -0,0 +1,377 @@
+"""
+Almacenamiento de series temporales de ángulos por performance
+
+Cada historial de ángulos se divide en chunks de tamaño fijo. Dentro de
+cada chunk los tiempos (ms) y los ángulos (décimas de grado) se guardan
+codificados en delta + zigzag + varint y comprimidos con zlib. Cada chunk
+lleva además un resumen (min/max/suma/cuenta por articulación) para que
+las consultas de tendencia no necesiten decodificar el payload.
+"""
+import json
+import logging
+import math
+import zlib
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Tuple
+
+CHUNK_SIZE = 256          # muestras por chunk
+ANGLE_SCALE = 10          # 0.1 grados de resolución
+TIME_KEYS = ("t", "timestamp")
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+# CODIFICACIÓN
+# =====================================
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """Escribir entero sin signo en formato varint"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """Leer varint, devuelve (valor, nueva posición)"""
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+def _write_deltas(out: bytearray, values: List[int]) -> None:
+    previous = 0
+    for value in values:
+        _write_varint(out, _zigzag(value - previous))
+        previous = value
+
+def _read_deltas(data: bytes, pos: int, count: int) -> Tuple[List[int], int]:
+    values = []
+    previous = 0
+    for _ in range(count):
+        raw, pos = _read_varint(data, pos)
+        previous += _unzigzag(raw)
+        values.append(previous)
+    return values, pos
+
+def encode_chunk(times: List[int], series: Dict[str, List[Optional[float]]]) -> bytes:
+    """Codificar un chunk: tiempos y una serie por articulación (orden de `series`)"""
+    out = bytearray()
+    _write_varint(out, len(times))
+    _write_deltas(out, times)
+
+    for values in series.values():
+        missing = [i for i, v in enumerate(values) if v is None or not math.isfinite(v)]
+        present = [round(v * ANGLE_SCALE) for v in values if v is not None and math.isfinite(v)]
+        _write_varint(out, len(missing))
+        _write_deltas(out, missing)
+        _write_deltas(out, present)
+
+    return zlib.compress(bytes(out))
+
+def decode_chunk(payload: bytes, joints: List[str],
+                 only: Optional[List[str]] = None) -> Tuple[List[int], Dict[str, List[Optional[float]]]]:
+    """Decodificar un chunk; `only` limita las articulaciones devueltas"""
+    data = zlib.decompress(payload)
+    count, pos = _read_varint(data, 0)
+    times, pos = _read_deltas(data, pos, count)
+
+    series = {}
+    for joint in joints:
+        missing_count, pos = _read_varint(data, pos)
+        missing, pos = _read_deltas(data, pos, missing_count)
+        present, pos = _read_deltas(data, pos, count - missing_count)
+        if only is not None and joint not in only:
+            continue
+
+        values: List[Optional[float]] = [None] * count
+        missing_set = set(missing)
+        it = iter(present)
+        for i in range(count):
+            if i not in missing_set:
+                values[i] = next(it) / ANGLE_SCALE
+        series[joint] = values
+
+    return times, series
+
+# =====================================
+# PREPARACIÓN DEL HISTORIAL
+# =====================================
+
+def _finite(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def _frame_time(frame: Dict[str, Any]) -> Optional[float]:
+    for key in TIME_KEYS:
+        value = frame.get(key)
+        if _finite(value):
+            return float(value)
+    return None
+
+def normalize_history(angle_history: List[Dict[str, Any]]) -> Tuple[List[int], Dict[str, List[Optional[float]]]]:
+    """Convertir el historial del frontend en tiempos relativos (ms) y series por articulación
+
+    Solo se usan los frames con `t`/`timestamp` (relativos al primero): los
+    tiempos no se inventan. Los valores no finitos quedan como huecos.
+    """
+    frames = [f for f in angle_history if isinstance(f, dict) and _frame_time(f) is not None]
+    if not frames:
+        return [], {}
+
+    joints: List[str] = []
+    for frame in frames:
+        for key, value in frame.items():
+            if key in TIME_KEYS or key in joints:
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                joints.append(key)
+
+    raw_times = [_frame_time(f) for f in frames]
+    origin = raw_times[0]
+    times = [int(round(t - origin)) for t in raw_times]
+
+    series = {}
+    for joint in joints:
+        values = []
+        for frame in frames:
+            value = frame.get(joint)
+            values.append(float(value) if _finite(value) else None)
+        series[joint] = values
+
+    return times, series
+
+def _summarize(series: Dict[str, List[Optional[float]]]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for joint, values in series.items():
+        present = [round(v * ANGLE_SCALE) / ANGLE_SCALE for v in values if v is not None]
+        if present:
+            summary[joint] = {
+                "min": min(present),
+                "max": max(present),
+                "sum": sum(present),
+                "count": len(present)
+            }
+    return summary
+
+# =====================================
+# ESCRITURA
+# =====================================
+
+def store_angle_history(cursor, performance_id: int, user_id: int,
+                        recorded_at: datetime, angle_history: List[Dict[str, Any]]) -> int:
+    """Guardar el historial de ángulos en chunks; devuelve el número de chunks
+
+    Los frames sin tiempo se descartan y se deja constancia en el log.
+    """
+    times, series = normalize_history(angle_history)
+    untimed = len(angle_history) - len(times)
+    if untimed:
+        logger.warning("Performance %s: %d de %d frames de ángulos sin tiempo descartados",
+                       performance_id, untimed, len(angle_history))
+    if not times:
+        return 0
+
+    insert_query = """
+    INSERT INTO angle_sample_chunks (
+        performance_id, user_id, chunk_index, recorded_at, t_start_ms,
+        t_end_ms, sample_count, joints, summary, payload
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+
+    joints = list(series.keys())
+    rows = []
+    for chunk_index, start in enumerate(range(0, len(times), CHUNK_SIZE)):
+        end = start + CHUNK_SIZE
+        chunk_times = times[start:end]
+        chunk_series = {joint: values[start:end] for joint, values in series.items()}
+        rows.append((
+            performance_id,
+            user_id,
+            chunk_index,
+            recorded_at,
+            chunk_times[0],
+            chunk_times[-1],
+            len(chunk_times),
+            ",".join(joints),
+            json.dumps(_summarize(chunk_series)),
+            encode_chunk(chunk_times, chunk_series)
+        ))
+
+    cursor.executemany(insert_query, rows)
+    return len(rows)
+
+def replace_angle_history(cursor, performance_id: int, user_id: int,
+                          recorded_at: datetime, frames: List[Dict[str, Any]]) -> int:
+    """Sustituir la serie guardada (chunks y columna `angle_history`) por `frames` con `t` en ms"""
+    cursor.execute("DELETE FROM angle_sample_chunks WHERE performance_id = %s", (performance_id,))
+    chunks = store_angle_history(cursor, performance_id, user_id, recorded_at, frames)
+    cursor.execute(
+        "UPDATE exercise_performances SET angle_history = %s WHERE id = %s",
+        (json.dumps(frames), performance_id)
+    )
+    return chunks
+
+# =====================================
+# CONSULTAS
+# =====================================
+
+def _new_bucket() -> Dict[str, float]:
+    return {"min": None, "max": None, "sum": 0.0, "count": 0}
+
+def _merge(bucket: Dict[str, Any], stats: Dict[str, float]) -> None:
+    if bucket["min"] is None or stats["min"] < bucket["min"]:
+        bucket["min"] = stats["min"]
+    if bucket["max"] is None or stats["max"] > bucket["max"]:
+        bucket["max"] = stats["max"]
+    bucket["sum"] += stats["sum"]
+    bucket["count"] += stats["count"]
+
+def _finish(buckets: Dict[int, Dict[str, Any]], width: float) -> List[Dict[str, Any]]:
+    result = []
+    for index in sorted(buckets):
+        bucket = buckets[index]
+        if not bucket["count"]:
+            continue
+        result.append({
+            "t_start_ms": int(index * width),
+            "min": bucket["min"],
+            "max": bucket["max"],
+            "avg": round(bucket["sum"] / bucket["count"], 2),
+            "count": bucket["count"]
+        })
+    return result
+
+def query_angle_range(cursor, performance_id: int, joint: str,
+                      start_ms: int = 0, end_ms: Optional[int] = None,
+                      bucket_ms: Optional[int] = None) -> Dict[str, Any]:
+    """Obtener la serie de una articulación en [start_ms, end_ms]
+
+    Solo se leen los chunks que solapan el rango. Con `bucket_ms` se
+    devuelve min/max/avg por bucket; un chunk que cae entero dentro de
+    un bucket se resuelve con su resumen, sin decodificar el payload.
+    """
+    query = """
+    SELECT chunk_index, t_start_ms, t_end_ms, joints, summary, payload
+    FROM angle_sample_chunks
+    WHERE performance_id = %s AND t_end_ms >= %s
+    """
+    params: List[Any] = [performance_id, start_ms]
+    if end_ms is not None:
+        query += " AND t_start_ms <= %s"
+        params.append(end_ms)
+    query += " ORDER BY chunk_index"
+
+    cursor.execute(query, tuple(params))
+    chunks = cursor.fetchall()
+
+    upper = end_ms if end_ms is not None else float("inf")
+    samples: List[Dict[str, Any]] = []
+    buckets: Dict[int, Dict[str, Any]] = {}
+    decoded_chunks = 0
+
+    for chunk in chunks:
+        joints = chunk["joints"].split(",") if chunk["joints"] else []
+        if joint not in joints:
+            continue
+
+        if bucket_ms:
+            first = (chunk["t_start_ms"] - start_ms) // bucket_ms
+            last = (chunk["t_end_ms"] - start_ms) // bucket_ms
+            inside = chunk["t_start_ms"] >= start_ms and chunk["t_end_ms"] <= upper
+            if inside and first == last:
+                stats = json.loads(chunk["summary"]).get(joint)
+                if stats:
+                    _merge(buckets.setdefault(first, _new_bucket()), stats)
+                continue
+
+        times, series = decode_chunk(chunk["payload"], joints, only=[joint])
+        decoded_chunks += 1
+        for t, value in zip(times, series[joint]):
+            if value is None or t < start_ms or t > upper:
+                continue
+            if bucket_ms:
+                index = (t - start_ms) // bucket_ms
+                _merge(buckets.setdefault(index, _new_bucket()),
+                       {"min": value, "max": value, "sum": value, "count": 1})
+            else:
+                samples.append({"t_ms": t, "value": value})
+
+    result: Dict[str, Any] = {
+        "performance_id": performance_id,
+        "joint": joint,
+        "start_ms": start_ms,
+        "end_ms": end_ms,
+        "chunks_read": len(chunks),
+        "chunks_decoded": decoded_chunks
+    }
+    if bucket_ms:
+        result["bucket_ms"] = bucket_ms
+        result["buckets"] = [
+            dict(b, t_start_ms=b["t_start_ms"] + start_ms)
+            for b in _finish(buckets, bucket_ms)
+        ]
+    else:
+        result["samples"] = samples
+    return result
+
+def load_series(cursor, performance_id: int,
+                joints: Optional[List[str]] = None) -> Tuple[List[int], Dict[str, List[Optional[float]]]]:
+    """Cargar la serie completa de una performance (todas las articulaciones o solo `joints`)"""
+    cursor.execute("""
+    SELECT joints, payload
+    FROM angle_sample_chunks
+    WHERE performance_id = %s
+    ORDER BY chunk_index
+    """, (performance_id,))
+
+    times: List[int] = []
+    series: Dict[str, List[Optional[float]]] = {}
+    for chunk in cursor.fetchall():
+        chunk_joints = chunk["joints"].split(",") if chunk["joints"] else []
+        chunk_times, chunk_series = decode_chunk(chunk["payload"], chunk_joints, only=joints)
+        offset = len(times)
+        times.extend(chunk_times)
+        for joint, values in chunk_series.items():
+            series.setdefault(joint, [None] * offset).extend(values)
+        for values in series.values():
+            if len(values) < len(times):
+                values.extend([None] * (len(times) - len(values)))
+
+    return times, series
+
+def query_user_trend(cursor, user_id: int, joint: str, days: int = 180) -> List[Dict[str, Any]]:
+    """Tendencia diaria (min/max/avg) de una articulación usando solo los resúmenes de chunk"""
+    cursor.execute("""
+    SELECT DATE(recorded_at) as day, summary
+    FROM angle_sample_chunks
+    WHERE user_id = %s
+    AND recorded_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
+    ORDER BY recorded_at
+    """, (user_id, days))
+
+    days_map: Dict[Any, Dict[str, Any]] = {}
+    for row in cursor.fetchall():
+        stats = json.loads(row["summary"]).get(joint)
+        if stats:
+            _merge(days_map.setdefault(row["day"], _new_bucket()), stats)
+
+    return [
+        {
+            "day": day,
+            "min": bucket["min"],
+            "max": bucket["max"],
+            "avg": round(bucket["sum"] / bucket["count"], 2),
+            "samples": bucket["count"]
+        }
+        for day, bucket in days_map.items()
+    ]
@@ -0,0 +1,257 @@
+"""
+Detección en streaming de fatiga y degradación de la técnica
+
+`FatigueDetector` consume frames de ángulos uno a uno con coste constante:
+- Detecta repeticiones por histéresis sobre la articulación principal,
+  con umbrales sobre una envolvente min/max que se adapta lentamente.
+- Al cerrar cada repetición guarda profundidad (rango de movimiento),
+  tempo y asimetría izquierda/derecha en buffers circulares de tamaño
+  fijo (FATIGUE_WINDOW repeticiones).
+- Compara las últimas FATIGUE_RECENT_REPS repeticiones con las anteriores
+  de la serie y avisa si el cambio supera el umbral relativo y es
+  significativo (estadístico t de Welch).
+
+La memoria por sesión es fija, así que un worker puede atender cientos
+de sesiones en vivo a la vez. Una pausa larga sin frames o sin
+repeticiones empieza una serie nueva.
+"""
+import math
+import os
+from typing import Optional, Dict, List, Any, Tuple
+
+from .session_analysis import primary_joint
+
+WINDOW = int(os.getenv("FATIGUE_WINDOW", "10"))
+RECENT_REPS = int(os.getenv("FATIGUE_RECENT_REPS", "3"))
+SET_REST_SECONDS = float(os.getenv("FATIGUE_SET_REST_SECONDS", "20"))
+MIN_T_STAT = 2.0
+MIN_RANGE_DEGREES = 10.0
+ENVELOPE_DECAY = 0.002    # fracción del rango que la envolvente cede por frame
+
+# Métrica -> (dirección de empeoramiento, cambio relativo mínimo, mensaje)
+DEGRADATION_RULES = {
+    "depth": (-1, 0.15, "La profundidad ha bajado un {pct:.0f}% en las últimas {reps} repeticiones"),
+    "tempo": (1, 0.25, "Las últimas {reps} repeticiones son un {pct:.0f}% más lentas"),
+    "asymmetry": (1, 0.50, "La asimetría entre lados ha subido un {pct:.0f}% en las últimas {reps} repeticiones"),
+}
+
+# Articulación -> su par del otro lado
+JOINT_PAIRS = {
+    "leftKnee": "rightKnee",
+    "leftElbow": "rightElbow",
+    "leftShoulder": "rightShoulder",
+}
+
+# =====================================
+# BUFFER CIRCULAR
+# =====================================
+
+class RingBuffer:
+    """Buffer circular de floats con capacidad fija"""
+
+    __slots__ = ("_values", "_start", "size")
+
+    def __init__(self, capacity: int):
+        self._values = [0.0] * capacity
+        self._start = 0
+        self.size = 0
+
+    def append(self, value: float) -> None:
+        capacity = len(self._values)
+        if self.size < capacity:
+            self._values[(self._start + self.size) % capacity] = value
+            self.size += 1
+        else:
+            self._values[self._start] = value
+            self._start = (self._start + 1) % capacity
+
+    def values(self) -> List[float]:
+        """Contenido en orden de inserción (del más antiguo al más reciente)"""
+        capacity = len(self._values)
+        return [self._values[(self._start + i) % capacity] for i in range(self.size)]
+
+    def clear(self) -> None:
+        self._start = 0
+        self.size = 0
+
+def _mean_var(values: List[float]) -> Tuple[float, float]:
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, 0.0
+    return mean, sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+
+def degradation(history: List[float], recent: int, direction: int,
+                min_change: float) -> Optional[float]:
+    """Cambio relativo de las `recent` últimas repeticiones frente a las anteriores
+
+    Devuelve el cambio (fracción) si empeora al menos `min_change` y la
+    diferencia es significativa; None en otro caso.
+    """
+    if len(history) < recent * 2:
+        return None
+    base_mean, base_var = _mean_var(history[:-recent])
+    last_mean, last_var = _mean_var(history[-recent:])
+    if base_mean == 0:
+        return None
+
+    change = (last_mean - base_mean) / abs(base_mean)
+    if change * direction < min_change:
+        return None
+
+    stderr = math.sqrt(base_var / (len(history) - recent) + last_var / recent)
+    if stderr > 0 and abs(last_mean - base_mean) / stderr < MIN_T_STAT:
+        return None
+    return change
+
+# =====================================
+# DETECTOR
+# =====================================
+
+class FatigueDetector:
+    """Estado de una sesión en vivo; `push` procesa un frame en O(1)"""
+
+    __slots__ = (
+        "joint", "pair", "window", "recent", "rest_ms",
+        "depths", "tempos", "asymmetries",
+        "low", "high", "phase", "rep_start_ms", "top_value", "bottom_value",
+        "asym_sum", "asym_count", "last_t", "last_rep_t", "reps", "set_number",
+        "cooldown"
+    )
+
+    def __init__(self, exercise_type: str, window: int = WINDOW, recent: int = RECENT_REPS,
+                 rest_seconds: float = SET_REST_SECONDS):
+        self.joint = primary_joint(exercise_type)
+        self.pair = JOINT_PAIRS.get(self.joint)
+        self.window = window
+        self.recent = recent
+        self.rest_ms = rest_seconds * 1000
+        self.depths = RingBuffer(window)
+        self.tempos = RingBuffer(window)
+        self.asymmetries = RingBuffer(window)
+        self.cooldown = {metric: 0 for metric in DEGRADATION_RULES}
+        self.set_number = 0
+        self.reps = 0
+        self.last_t: Optional[float] = None
+        self._new_set()
+
+    def _new_set(self) -> None:
+        self.depths.clear()
+        self.tempos.clear()
+        self.asymmetries.clear()
+        for metric in self.cooldown:
+            self.cooldown[metric] = 0
+        self.low: Optional[float] = None
+        self.high: Optional[float] = None
+        self.phase = "up"
+        self.rep_start_ms: Optional[float] = None
+        self.top_value: Optional[float] = None
+        self.bottom_value: Optional[float] = None
+        self.asym_sum = 0.0
+        self.asym_count = 0
+        self.last_rep_t: Optional[float] = None
+        self.reps = 0
+        self.set_number += 1
+
+    def push(self, t_ms: float, angles: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Procesar un frame; devuelve los eventos generados (repetición, avisos)"""
+        value = angles.get(self.joint)
+        if value is None and self.pair:
+            value = angles.get(self.pair)
+        if value is None:
+            return []
+
+        rest_since = self.last_rep_t if self.last_rep_t is not None else self.last_t
+        if self.last_t is not None and (
+            t_ms - self.last_t > self.rest_ms
+            or (self.reps and rest_since is not None and t_ms - rest_since > self.rest_ms)
+        ):
+            self._new_set()
+        self.last_t = t_ms
+
+        # Envolvente min/max que olvida lentamente los extremos antiguos
+        if self.low is None:
+            self.low = self.high = value
+        else:
+            shrink = (self.high - self.low) * ENVELOPE_DECAY
+            self.low = min(value, self.low + shrink)
+            self.high = max(value, self.high - shrink)
+        span = self.high - self.low
+        if span < MIN_RANGE_DEGREES:
+            # Aún sin rango: el punto más alto visto es el inicio de la primera repetición
+            if self.top_value is None or value >= self.top_value:
+                self.top_value = value
+                self.rep_start_ms = t_ms
+            return []
+        low_threshold = self.low + span * 0.3
+        high_threshold = self.low + span * 0.7
+
+        if self.pair:
+            left, right = angles.get(self.joint), angles.get(self.pair)
+            if left is not None and right is not None:
+                self.asym_sum += abs(left - right)
+                self.asym_count += 1
+
+        if self.phase == "up":
+            if value >= high_threshold:
+                if self.top_value is None or self.rep_start_ms is None or value >= self.top_value:
+                    self.top_value = value
+                    self.rep_start_ms = t_ms
+                    self.asym_sum = 0.0
+                    self.asym_count = 0
+            elif value <= low_threshold and self.rep_start_ms is not None:
+                self.phase = "down"
+                self.bottom_value = value
+            return []
+
+        if value < self.bottom_value:
+            self.bottom_value = value
+        if value < high_threshold:
+            return []
+        return self._close_rep(t_ms, value)
+
+    def _close_rep(self, t_ms: float, value: float) -> List[Dict[str, Any]]:
+        depth = self.top_value - self.bottom_value
+        tempo = t_ms - self.rep_start_ms
+        asymmetry = self.asym_sum / self.asym_count if self.asym_count else None
+
+        self.reps += 1
+        self.last_rep_t = t_ms
+        self.depths.append(depth)
+        self.tempos.append(tempo)
+        if asymmetry is not None:
+            self.asymmetries.append(asymmetry)
+
+        # La siguiente repetición empieza en este punto alto
+        self.phase = "up"
+        self.top_value = value
+        self.rep_start_ms = t_ms
+        self.asym_sum = 0.0
+        self.asym_count = 0
+
+        events: List[Dict[str, Any]] = [{
+            "type": "rep",
+            "set": self.set_number,
+            "rep": self.reps,
+            "depth": round(depth, 1),
+            "tempo_ms": round(tempo),
+            "asymmetry": round(asymmetry, 1) if asymmetry is not None else None
+        }]
+
+        buffers = {"depth": self.depths, "tempo": self.tempos, "asymmetry": self.asymmetries}
+        for metric, (direction, min_change, message) in DEGRADATION_RULES.items():
+            if self.cooldown[metric] > 0:
+                self.cooldown[metric] -= 1
+                continue
+            change = degradation(buffers[metric].values(), self.recent, direction, min_change)
+            if change is None:
+                continue
+            self.cooldown[metric] = self.recent
+            events.append({
+                "type": "fatigue",
+                "metric": metric,
+                "set": self.set_number,
+                "rep": self.reps,
+                "change_pct": round(change * 100, 1),
+                "message": message.format(pct=abs(change) * 100, reps=self.recent)
+            })
+        return events
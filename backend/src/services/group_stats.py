@@ -0,0 +1,121 @@
+"""
+Estadísticas agregadas de un grupo de usuarios (panel del entrenador)
+
+Mismos datos que `/api/workouts/stats/advanced`, pero para muchos
+miembros a la vez: cada bloque de miembros se resuelve con tres consultas
+agrupadas (`WHERE user_id IN (...)`) en lugar de tres por miembro.
+"""
+import os
+from typing import Dict, List, Any, Iterator
+
+GROUP_CHUNK_SIZE = int(os.getenv("COACH_CHUNK_SIZE", "100"))
+
+def get_coach_members(cursor, coach_id: int) -> List[Dict[str, Any]]:
+    """Miembros asignados a un entrenador"""
+    cursor.execute("""
+    SELECT u.id, u.username
+    FROM coach_members cm
+    JOIN users u ON u.id = cm.member_id
+    WHERE cm.coach_id = %s
+    ORDER BY u.username
+    """, (coach_id,))
+    return cursor.fetchall()
+
+def add_coach_member(cursor, coach_id: int, member_id: int) -> None:
+    """Asignar un miembro a un entrenador"""
+    cursor.execute("""
+    INSERT IGNORE INTO coach_members (coach_id, member_id) VALUES (%s, %s)
+    """, (coach_id, member_id))
+
+def remove_coach_member(cursor, coach_id: int, member_id: int) -> int:
+    """Quitar un miembro de un entrenador"""
+    cursor.execute(
+        "DELETE FROM coach_members WHERE coach_id = %s AND member_id = %s",
+        (coach_id, member_id)
+    )
+    return cursor.rowcount
+
+def _group_stats(cursor, user_ids: List[int], days: int) -> Dict[int, Dict[str, Any]]:
+    """Estadísticas de un bloque de usuarios con tres consultas agrupadas"""
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    params = (*user_ids, days)
+    stats = {
+        user_id: {"general_stats": None, "exercise_progress": [], "weekly_trend": []}
+        for user_id in user_ids
+    }
+
+    cursor.execute(f"""
+    SELECT
+        ws.user_id,
+        COUNT(DISTINCT ws.id) as total_sessions,
+        AVG(ws.average_score) as avg_score,
+        MAX(ws.average_score) as best_score,
+        SUM(ws.duration_minutes) as total_minutes,
+        COUNT(CASE WHEN ep.pose_data IS NOT NULL THEN 1 END) as sessions_with_pose
+    FROM workout_sessions ws
+    LEFT JOIN exercise_performances ep ON ws.id = ep.session_id
+    WHERE ws.user_id IN ({placeholders})
+    AND ws.created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
+    GROUP BY ws.user_id
+    """, params)
+    for row in cursor.fetchall():
+        stats[row.pop("user_id")]["general_stats"] = row
+
+    cursor.execute(f"""
+    SELECT
+        ws.user_id,
+        et.name as exercise_name,
+        COUNT(ep.id) as total_performances,
+        AVG(ep.technique_score) as avg_score,
+        MAX(ep.technique_score) as best_score,
+        AVG(ep.avg_knee_angle) as avg_knee_angle,
+        AVG(ep.stability_score) as avg_stability
+    FROM exercise_performances ep
+    JOIN exercise_types et ON ep.exercise_type_id = et.id
+    JOIN workout_sessions ws ON ep.session_id = ws.id
+    WHERE ws.user_id IN ({placeholders})
+    AND ws.created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
+    GROUP BY ws.user_id, et.id, et.name
+    ORDER BY ws.user_id, total_performances DESC
+    """, params)
+    for row in cursor.fetchall():
+        stats[row.pop("user_id")]["exercise_progress"].append(row)
+
+    cursor.execute(f"""
+    SELECT
+        ws.user_id,
+        YEARWEEK(ws.created_at) as week,
+        COUNT(ws.id) as sessions_count,
+        AVG(ws.average_score) as avg_score
+    FROM workout_sessions ws
+    WHERE ws.user_id IN ({placeholders})
+    AND ws.created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
+    GROUP BY ws.user_id, YEARWEEK(ws.created_at)
+    ORDER BY ws.user_id, week
+    """, params)
+    for row in cursor.fetchall():
+        stats[row.pop("user_id")]["weekly_trend"].append(row)
+
+    return stats
+
+def iter_member_stats(cursor, members: List[Dict[str, Any]], days: int,
+                      chunk_size: int = GROUP_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Estadísticas por miembro, resolviendo los miembros por bloques"""
+    for start in range(0, len(members), chunk_size):
+        chunk = members[start:start + chunk_size]
+        stats = _group_stats(cursor, [member["id"] for member in chunk], days)
+        for member in chunk:
+            member_stats = stats[member["id"]]
+            general = member_stats["general_stats"] or {
+                "total_sessions": 0, "avg_score": None, "best_score": None,
+                "total_minutes": None, "sessions_with_pose": 0
+            }
+            yield {
+                "user_id": member["id"],
+                "username": member["username"],
+                "period_days": days,
+                "general_stats": general,
+                "exercise_progress": member_stats["exercise_progress"],
+                "weekly_trend": member_stats["weekly_trend"],
+                "pose_analysis_available": general["sessions_with_pose"] > 0
+            }
@@ -0,0 +1,356 @@
+"""
+Cola de trabajos persistente respaldada por la tabla `analysis_jobs`
+
+No usa broker externo: los trabajos se insertan en la misma transacción
+que los datos de la sesión y los workers los reclaman con
+SELECT ... FOR UPDATE SKIP LOCKED, por lo que varios procesos pueden
+consumir la cola a la vez sin pisarse.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Prioridades: mayor número se procesa antes
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 5
+PRIORITY_HIGH = 10
+
+RETRY_BASE_SECONDS = 5
+STALE_LOCK_MINUTES = 10
+# Cada cuánto renueva `locked_at` un trabajo en curso (muy por debajo de STALE_LOCK_MINUTES)
+HEARTBEAT_SECONDS = float(os.getenv("ANALYSIS_HEARTBEAT_SECONDS", "60"))
+
+# Registro de manejadores (y limpiezas) por tipo de trabajo
+JOB_HANDLERS: Dict[str, Callable] = {}
+JOB_CLEANUPS: Dict[str, Callable] = {}
+
+class PermanentJobError(Exception):
+    """Fallo que no se arregla reintentando (entrada inválida): el trabajo falla ya"""
+
+def job_handler(job_type: str, cleanup: Optional[Callable] = None):
+    """Decorador para registrar el manejador de un tipo de trabajo
+
+    El manejador no confirma: `run_job` guarda sus escrituras y el estado
+    `done` en el mismo commit. `cleanup(job)` se ejecuta cuando el trabajo
+    queda en un estado final (terminado o sin más reintentos) ya confirmado.
+    """
+    def decorator(func: Callable) -> Callable:
+        JOB_HANDLERS[job_type] = func
+        if cleanup is not None:
+            JOB_CLEANUPS[job_type] = cleanup
+        return func
+    return decorator
+
+def after_commit(job: Dict[str, Any], action: Callable[[], Any]) -> None:
+    """Programar `action` para cuando el resultado del trabajo esté confirmado"""
+    job.setdefault("after_commit", []).append(action)
+
+# =====================================
+# PRODUCTOR
+# =====================================
+
+def enqueue_job(cursor, job_type: str, user_id: int, payload: Dict[str, Any],
+                session_id: Optional[int] = None, priority: int = PRIORITY_NORMAL,
+                max_attempts: int = 3) -> int:
+    """Encolar un trabajo; se confirma junto con la transacción del llamador"""
+    cursor.execute("""
+    INSERT INTO analysis_jobs (
+        job_type, user_id, session_id, payload, priority,
+        status, attempts, max_attempts, run_after
+    ) VALUES (%s, %s, %s, %s, %s, %s, 0, %s, %s)
+    """, (
+        job_type,
+        user_id,
+        session_id,
+        json.dumps(payload),
+        priority,
+        STATUS_QUEUED,
+        max_attempts,
+        datetime.now()
+    ))
+    return cursor.lastrowid
+
+def get_job(cursor, job_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+    """Trabajo del usuario por id"""
+    cursor.execute("""
+    SELECT id, job_type, session_id, status, progress, attempts, max_attempts,
+           result, error, created_at, updated_at
+    FROM analysis_jobs
+    WHERE id = %s AND user_id = %s
+    """, (job_id, user_id))
+    job = cursor.fetchone()
+    if job and job["result"]:
+        job["result"] = json.loads(job["result"])
+    return job
+
+def get_session_job(cursor, session_id: int, user_id: int,
+                    job_type: str = "session_analysis") -> Optional[Dict[str, Any]]:
+    """Último trabajo de un tipo asociado a una sesión del usuario"""
+    cursor.execute("""
+    SELECT id, job_type, status, attempts, max_attempts, result, error,
+           created_at, updated_at
+    FROM analysis_jobs
+    WHERE session_id = %s AND user_id = %s AND job_type = %s
+    ORDER BY id DESC
+    LIMIT 1
+    """, (session_id, user_id, job_type))
+    job = cursor.fetchone()
+    if job and job["result"]:
+        job["result"] = json.loads(job["result"])
+    return job
+
+def cancel_session_jobs(cursor, session_id: int) -> int:
+    """Borrar los trabajos de una sesión que se elimina, en la transacción del llamador
+
+    Los que estén en ejecución terminan sin efecto: sus UPDATE finales ya no
+    encuentran la fila y `requeue_stale_jobs` no puede reencolarlos.
+    """
+    cursor.execute("DELETE FROM analysis_jobs WHERE session_id = %s", (session_id,))
+    return cursor.rowcount
+
+# =====================================
+# CONSUMIDOR
+# =====================================
+
+def claim_job(connection, worker_id: str,
+              type_limits: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+    """Reclamar el siguiente trabajo disponible por prioridad
+
+    `type_limits` limita cuántos trabajos de cada tipo pueden estar en
+    ejecución a la vez entre todos los workers. El conteo se hace con la
+    fila del tipo en `analysis_job_type_locks` bloqueada, así que dos
+    workers no pueden superar el límite reclamando a la vez.
+    """
+    type_limits = type_limits or {}
+    cursor = connection.cursor(dictionary=True)
+    try:
+        excluded: List[str] = []
+        while True:
+            query = """
+            SELECT * FROM analysis_jobs
+            WHERE status = %s AND run_after <= %s
+            """
+            params = [STATUS_QUEUED, datetime.now()]
+            if excluded:
+                query += f" AND job_type NOT IN ({', '.join(['%s'] * len(excluded))})"
+                params.extend(excluded)
+            query += " ORDER BY priority DESC, id LIMIT 1 FOR UPDATE SKIP LOCKED"
+
+            cursor.execute(query, tuple(params))
+            job = cursor.fetchone()
+            if not job:
+                connection.commit()
+                return None
+
+            limit = type_limits.get(job["job_type"])
+            if limit is None or _running_below_limit(cursor, job["job_type"], limit):
+                break
+            excluded.append(job["job_type"])
+
+        cursor.execute("""
+        UPDATE analysis_jobs
+        SET status = %s, attempts = attempts + 1, locked_by = %s, locked_at = %s
+        WHERE id = %s
+        """, (STATUS_RUNNING, worker_id, datetime.now(), job["id"]))
+        connection.commit()
+
+        job["attempts"] += 1
+        job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+        return job
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def _running_below_limit(cursor, job_type: str, limit: int) -> bool:
+    # El upsert bloquea la fila del tipo hasta el commit del reclamo
+    cursor.execute("""
+    INSERT INTO analysis_job_type_locks (job_type) VALUES (%s)
+    ON DUPLICATE KEY UPDATE job_type = job_type
+    """, (job_type,))
+    cursor.execute(
+        "SELECT COUNT(*) as running FROM analysis_jobs WHERE job_type = %s AND status = %s",
+        (job_type, STATUS_RUNNING)
+    )
+    return cursor.fetchone()["running"] < limit
+
+def update_progress(connection, job_id: int, progress: float) -> None:
+    """Actualizar el progreso (0-100) de un trabajo en ejecución
+
+    Confirma la transacción: llamarlo antes de que el manejador escriba.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "UPDATE analysis_jobs SET progress = %s, locked_at = %s WHERE id = %s",
+            (round(progress, 1), datetime.now(), job_id)
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+
+def complete_job(connection, job_id: int, result: Dict[str, Any]) -> None:
+    """Marcar un trabajo como terminado; confirma también lo escrito por el manejador"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+        UPDATE analysis_jobs
+        SET status = %s, progress = 100, result = %s, error = NULL, locked_by = NULL
+        WHERE id = %s
+        """, (STATUS_DONE, json.dumps(result, default=str), job_id))
+        connection.commit()
+    finally:
+        cursor.close()
+
+def fail_job(connection, job: Dict[str, Any], error: str) -> None:
+    """Registrar un fallo; reencola con backoff exponencial si quedan intentos"""
+    retry = job["attempts"] < job["max_attempts"]
+    run_after = datetime.now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1))
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+        UPDATE analysis_jobs
+        SET status = %s, error = %s, run_after = %s, locked_by = NULL
+        WHERE id = %s
+        """, (STATUS_QUEUED if retry else STATUS_FAILED, error[:1000], run_after, job["id"]))
+        connection.commit()
+    finally:
+        cursor.close()
+
+def requeue_stale_jobs(connection, locked_by_prefix: Optional[str] = None) -> int:
+    """Devolver a la cola trabajos de workers que murieron sin terminar
+
+    Sin `locked_by_prefix` se reencolan los bloqueados hace más de
+    STALE_LOCK_MINUTES; con él, todos los de ese worker (se sabe que murió).
+    """
+    cursor = connection.cursor()
+    try:
+        if locked_by_prefix is None:
+            condition, value = "locked_at < %s", datetime.now() - timedelta(minutes=STALE_LOCK_MINUTES)
+        else:
+            condition, value = "locked_by LIKE %s", locked_by_prefix + "%"
+        cursor.execute(f"""
+        UPDATE analysis_jobs
+        SET status = %s, locked_by = NULL
+        WHERE status = %s AND {condition}
+        """, (STATUS_QUEUED, STATUS_RUNNING, value))
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+class _Heartbeat(threading.Thread):
+    """Renovar `locked_at` con una conexión propia mientras el manejador trabaja
+
+    Usa otra conexión para no confirmar a medias la transacción del manejador.
+    """
+
+    def __init__(self, connect: Callable, job_id: int, interval: float):
+        super().__init__(name=f"heartbeat-{job_id}", daemon=True)
+        self.connect = connect
+        self.job_id = job_id
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        connection = None
+        while not self.stopped.wait(self.interval):
+            try:
+                if connection is None:
+                    connection = self.connect()
+                    if connection is None:
+                        continue
+                cursor = connection.cursor()
+                try:
+                    cursor.execute(
+                        "UPDATE analysis_jobs SET locked_at = %s WHERE id = %s AND status = %s",
+                        (datetime.now(), self.job_id, STATUS_RUNNING)
+                    )
+                    connection.commit()
+                finally:
+                    cursor.close()
+            except Exception as e:
+                logger.warning("Heartbeat del trabajo %s fallido: %s", self.job_id, e)
+                _close(connection)
+                connection = None
+        _close(connection)
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join(timeout=self.interval)
+
+def _close(connection) -> None:
+    if connection is None:
+        return
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+def _run_hooks(job: Dict[str, Any], hooks: List[Callable[[], Any]]) -> None:
+    for hook in hooks:
+        try:
+            hook()
+        except Exception as e:
+            logger.warning("Error tras confirmar el trabajo %s: %s", job["id"], e,
+                           extra={"job_id": job["id"], "job_type": job["job_type"]})
+
+def _final_hooks(job: Dict[str, Any]) -> List[Callable[[], Any]]:
+    cleanup = JOB_CLEANUPS.get(job["job_type"])
+    return [lambda: cleanup(job)] if cleanup else []
+
+def run_job(connection, job: Dict[str, Any], connect: Optional[Callable] = None) -> None:
+    """Ejecutar un trabajo reclamado con su manejador registrado
+
+    Con `connect` (fábrica de conexiones) se mantiene un heartbeat sobre
+    `locked_at` para que un trabajo largo no se reencole mientras corre.
+    """
+    handler = JOB_HANDLERS.get(job["job_type"])
+    if handler is None:
+        fail_job(connection, dict(job, attempts=job["max_attempts"]),
+                 f"Tipo de trabajo desconocido: {job['job_type']}")
+        return
+
+    fields = {"job_id": job["id"], "job_type": job["job_type"]}
+    heartbeat = _Heartbeat(connect, job["id"], HEARTBEAT_SECONDS) if connect else None
+    if heartbeat:
+        heartbeat.start()
+    start = time.perf_counter()
+    try:
+        try:
+            result = handler(connection, job)
+        except PermanentJobError as e:
+            connection.rollback()
+            logger.info("Trabajo %s rechazado: %s", job["id"], e, extra=fields)
+            fail_job(connection, dict(job, attempts=job["max_attempts"]), str(e))
+            _run_hooks(job, _final_hooks(job))
+            return
+        except Exception as e:
+            connection.rollback()
+            logger.warning("Trabajo %s fallido: %s", job["id"], e, exc_info=True, extra=fields)
+            fail_job(connection, job, f"{type(e).__name__}: {e}")
+            if job["attempts"] >= job["max_attempts"]:
+                _run_hooks(job, _final_hooks(job))
+            return
+        complete_job(connection, job["id"], result)
+        _run_hooks(job, job.get("after_commit", []) + _final_hooks(job))
+    finally:
+        # Tras el commit/rollback: el heartbeat ya no espera bloqueos de esta transacción
+        if heartbeat:
+            heartbeat.stop()
+    logger.info("Trabajo %s completado", job["id"], extra=dict(
+        fields, duration_ms=round((time.perf_counter() - start) * 1000, 1)
+    ))
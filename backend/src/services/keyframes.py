@@ -0,0 +1,210 @@
+"""
+Muestreo adaptativo de keyframes
+
+Conserva un frame solo cuando el movimiento lo exige: entre dos keyframes
+consecutivos, la interpolación lineal reconstruye cada canal (ángulo o
+coordenada) con un error máximo de `tolerance`. Las pausas y los tramos
+a velocidad constante se reducen a sus extremos y los puntos de inicio,
+fondo y fin de cada repetición se conservan siempre.
+
+El criterio es el de "puerta giratoria": desde el último keyframe se
+mantiene, por canal, el intervalo de pendientes que pasa a menos de
+`tolerance` de todos los frames intermedios; coste O(1) por frame y canal.
+
+Se aplica al guardar `angle_history` y a datos ya guardados:
+    python manage.py compact-keyframes
+El frontend usa el mismo criterio en utils/keyframes.js antes de enviar la
+sesión y lo indica con `keyframe_tolerance`; esas series no se vuelven a
+muestrear (el error de dos pasadas se sumaría).
+"""
+import logging
+import math
+import os
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Sequence, Tuple
+
+from .angle_store import load_series, normalize_history, replace_angle_history
+from .session_analysis import primary_joint, segment_reps, rep_boundaries
+
+logger = logging.getLogger(__name__)
+
+ANGLE_TOLERANCE = float(os.getenv("KEYFRAME_TOLERANCE_DEG", "2.0"))
+
+# =====================================
+# SELECCIÓN
+# =====================================
+
+def select_keyframes(times: Sequence[float], channels: Sequence[Sequence[Optional[float]]],
+                     tolerance: float, keep: Sequence[int] = ()) -> List[int]:
+    """Índices a conservar para reconstruir cada canal con error <= `tolerance`
+
+    `channels` es una lista de series alineadas con `times` (None si falta
+    el valor); los índices de `keep` se conservan siempre. Un canal que
+    aparece o desaparece fuerza keyframes en el cambio.
+    """
+    count = len(times)
+    if count <= 2 or tolerance <= 0:
+        return list(range(count))
+
+    forced = set(keep)
+    kept = [0]
+    anchor = 0
+    lower = [-math.inf] * len(channels)
+    upper = [math.inf] * len(channels)
+
+    def present(i: int) -> Tuple[bool, ...]:
+        return tuple(channel[i] is not None for channel in channels)
+
+    def reset(i: int) -> None:
+        nonlocal anchor
+        anchor = i
+        for c in range(len(channels)):
+            lower[c], upper[c] = -math.inf, math.inf
+
+    def fits(i: int) -> bool:
+        dt = times[i] - times[anchor]
+        for c, channel in enumerate(channels):
+            value, origin = channel[i], channel[anchor]
+            if value is None or origin is None:
+                continue
+            slope = (value - origin) / dt
+            if slope < lower[c] or slope > upper[c]:
+                return False
+        return True
+
+    def narrow(i: int) -> None:
+        dt = times[i] - times[anchor]
+        for c, channel in enumerate(channels):
+            value, origin = channel[i], channel[anchor]
+            if value is None or origin is None:
+                continue
+            lower[c] = max(lower[c], (value - tolerance - origin) / dt)
+            upper[c] = min(upper[c], (value + tolerance - origin) / dt)
+
+    anchor_presence = present(0)
+    for i in range(1, count):
+        if times[i] <= times[anchor]:
+            # Tiempos repetidos: no hay pendiente posible, se conserva el frame
+            kept.append(i)
+            reset(i)
+            anchor_presence = present(i)
+            continue
+        presence = present(i)
+        if presence != anchor_presence or not fits(i):
+            # El tramo anchor -> i ya no cumple: i - 1 pasa a ser keyframe
+            if i - 1 != anchor:
+                kept.append(i - 1)
+                reset(i - 1)
+            if presence != anchor_presence:
+                kept.append(i)
+                reset(i)
+                anchor_presence = presence
+                continue
+        if i in forced:
+            kept.append(i)
+            reset(i)
+            continue
+        narrow(i)
+
+    if kept[-1] != count - 1:
+        kept.append(count - 1)
+    return kept
+
+def interpolate(times: Sequence[float], values: Sequence[Optional[float]],
+                at: Sequence[float]) -> List[Optional[float]]:
+    """Reconstruir una serie en los tiempos `at` por interpolación lineal"""
+    result: List[Optional[float]] = []
+    j = 0
+    for t in at:
+        while j + 1 < len(times) and times[j + 1] <= t:
+            j += 1
+        if j + 1 >= len(times) or times[j] == t:
+            result.append(values[j] if times[j] == t else None)
+            continue
+        a, b = values[j], values[j + 1]
+        if a is None or b is None:
+            result.append(None)
+            continue
+        result.append(a + (b - a) * (t - times[j]) / (times[j + 1] - times[j]))
+    return result
+
+# =====================================
+# HISTORIAL DE ÁNGULOS
+# =====================================
+
+def _sample_series(times: List[int], series: Dict[str, List[Optional[float]]],
+                   exercise_type: str, tolerance: float) -> List[Dict[str, Any]]:
+    joint = primary_joint(exercise_type)
+    keep = rep_boundaries(segment_reps(times, series[joint])) if joint in series else []
+    return [
+        dict({name: values[i] for name, values in series.items() if values[i] is not None}, t=times[i])
+        for i in select_keyframes(times, list(series.values()), tolerance, keep)
+    ]
+
+def sample_angle_history(angle_history: List[Dict[str, Any]], exercise_type: str,
+                         tolerance: float = ANGLE_TOLERANCE) -> List[Dict[str, Any]]:
+    """Reducir un historial de ángulos del frontend; los frames conservados llevan `t` en ms"""
+    times, series = normalize_history(angle_history)
+    if len(times) <= 2 or tolerance <= 0:
+        return angle_history
+    return _sample_series(times, series, exercise_type, tolerance)
+
+# =====================================
+# DATOS GUARDADOS
+# =====================================
+
+def record_sampling(cursor, performance_id: int, tolerance: float,
+                    original_samples: int, kept_samples: int) -> None:
+    """Registrar que una performance ya está reducida (evita acumular error)"""
+    cursor.execute("""
+    INSERT INTO performance_keyframes (performance_id, tolerance, original_samples, kept_samples, processed_at)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE tolerance = VALUES(tolerance), kept_samples = VALUES(kept_samples),
+        processed_at = VALUES(processed_at)
+    """, (performance_id, tolerance, original_samples, kept_samples, datetime.now()))
+
+def compact_performance(cursor, performance: Dict[str, Any],
+                        tolerance: float = ANGLE_TOLERANCE) -> Dict[str, int]:
+    """Reducir la serie guardada de una performance y reescribirla"""
+    times, series = load_series(cursor, performance["id"])
+    sampled = _sample_series(times, series, performance["exercise_name"], tolerance)
+
+    if len(sampled) < len(times):
+        replace_angle_history(
+            cursor, performance["id"], performance["user_id"],
+            performance["start_time"] or datetime.now(), sampled
+        )
+    record_sampling(cursor, performance["id"], tolerance, len(times), len(sampled))
+    return {"original": len(times), "kept": len(sampled)}
+
+def compact_stored(connection, tolerance: float = ANGLE_TOLERANCE,
+                   batch_size: int = 200) -> Dict[str, int]:
+    """Reducir las performances guardadas que aún no pasaron por el muestreo"""
+    cursor = connection.cursor(dictionary=True)
+    report = {"performances": 0, "samples_removed": 0, "errors": 0}
+    try:
+        cursor.execute("""
+        SELECT ep.id, ep.user_id, et.name as exercise_name, ws.start_time
+        FROM exercise_performances ep
+        JOIN workout_sessions ws ON ep.session_id = ws.id
+        JOIN exercise_types et ON ep.exercise_type_id = et.id
+        LEFT JOIN performance_keyframes pk ON pk.performance_id = ep.id
+        LEFT JOIN pose_retention pr ON pr.performance_id = ep.id
+        WHERE pk.performance_id IS NULL
+        AND (pr.tier IS NULL OR pr.tier <> 'archived')
+        ORDER BY ep.id
+        LIMIT %s
+        """, (batch_size,))
+        for performance in cursor.fetchall():
+            try:
+                result = compact_performance(cursor, performance, tolerance)
+                connection.commit()
+                report["performances"] += 1
+                report["samples_removed"] += result["original"] - result["kept"]
+            except Exception:
+                connection.rollback()
+                report["errors"] += 1
+                logger.exception("Error reduciendo keyframes de la performance %s", performance['id'])
+    finally:
+        cursor.close()
+    return report
@@ -0,0 +1,317 @@
+"""
+Cinemática 3D a partir de los world landmarks de MediaPipe
+
+Los world landmarks están en metros con origen en el centro de la cadera.
+Todo el cálculo es vectorizado con numpy sobre la serie completa
+(N frames x 12 puntos x 3 coordenadas):
+- velocidades y aceleraciones por diferencias finitas (`np.gradient`
+  con los tiempos reales, admite frames irregulares),
+- tempo excéntrico/concéntrico por repetición,
+- simetría izquierda/derecha de los ángulos de rodilla y codo,
+- desviación horizontal de la trayectoria de muñecas (barra) y cadera.
+
+Cada frame llega como {"t": ms, "points": [[x, y, z] | None, ...]} con los
+puntos en el orden de KINEMATIC_LANDMARKS, o los 33 landmarks completos.
+Los puntos también pueden venir como {x, y, z, visibility} (MediaPipe JS).
+
+Al guardar la sesión los frames solo se empaquetan en binario
+(`pack_frames`, sin numpy); el cálculo lo hace el trabajo de análisis.
+"""
+import json
+import struct
+import warnings
+from array import array
+from itertools import chain
+from typing import Optional, Dict, List, Any, Tuple
+
+import numpy as np
+
+from .angle_store import load_series
+from .session_analysis import primary_joint, segment_reps
+
+# Puntos usados y su índice en MediaPipe Pose
+KINEMATIC_LANDMARKS = (
+    "leftShoulder", "rightShoulder", "leftElbow", "rightElbow",
+    "leftWrist", "rightWrist", "leftHip", "rightHip",
+    "leftKnee", "rightKnee", "leftAnkle", "rightAnkle",
+)
+MEDIAPIPE_INDICES = (11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28)
+_INDEX = {name: i for i, name in enumerate(KINEMATIC_LANDMARKS)}
+
+# Ángulo -> (extremo, vértice, extremo)
+JOINT_ANGLES = {
+    "leftKnee": ("leftHip", "leftKnee", "leftAnkle"),
+    "rightKnee": ("rightHip", "rightKnee", "rightAnkle"),
+    "leftElbow": ("leftShoulder", "leftElbow", "leftWrist"),
+    "rightElbow": ("rightShoulder", "rightElbow", "rightWrist"),
+}
+SYMMETRY_PAIRS = (("leftKnee", "rightKnee"), ("leftElbow", "rightElbow"))
+
+# Punto que marca la velocidad del movimiento por ejercicio
+TRACKING_POINTS = {
+    "pushup": ("leftShoulder", "rightShoulder"),
+    "flexion": ("leftShoulder", "rightShoulder"),
+}
+DEFAULT_TRACKING = ("leftHip", "rightHip")
+
+def _coordinates(point: Any) -> Optional[List[float]]:
+    """[x, y, z] de un punto en lista o en dict de MediaPipe JS"""
+    if point is None:
+        return None
+    if isinstance(point, dict):
+        return [point.get(axis, np.nan) for axis in ("x", "y", "z")]
+    values = list(point[:3])
+    return values + [np.nan] * (3 - len(values))
+
+def select_world_landmarks(world_landmarks: List[Any]) -> List[Optional[List[float]]]:
+    """Reducir los 33 landmarks de MediaPipe a KINEMATIC_LANDMARKS"""
+    return [_coordinates(world_landmarks[i]) for i in MEDIAPIPE_INDICES]
+
+# =====================================
+# ALMACENAMIENTO
+# =====================================
+
+_MISSING = (float("nan"),) * 3
+
+def pack_frames(frames: List[Any]) -> bytes:
+    """Frames validados (WorldLandmarkFrame) a binario: número de frames,
+    tiempos en float64 y KINEMATIC_LANDMARKS x 3 coordenadas en float32"""
+    times = array("d")
+    coordinates = array("f")
+    for frame in frames:
+        points = frame.points
+        if len(points) > len(KINEMATIC_LANDMARKS):
+            points = [points[i] for i in MEDIAPIPE_INDICES]
+        times.append(frame.t)
+        for point in points:
+            if point is None:
+                coordinates.extend(_MISSING)
+            elif isinstance(point, tuple):
+                coordinates.extend(point)
+            else:
+                coordinates.extend((point.x, point.y, point.z))
+    return struct.pack("<I", len(times)) + times.tobytes() + coordinates.tobytes()
+
+def unpack_frames(blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Tiempos (s) y posiciones (N, 12, 3) de un blob de `pack_frames`"""
+    count, = struct.unpack_from("<I", blob)
+    offset = struct.calcsize("<I")
+    times = np.frombuffer(blob, dtype=np.float64, count=count, offset=offset) / 1000.0
+    positions = np.frombuffer(blob, dtype=np.float32, offset=offset + count * 8)
+    return _ordered(times, positions.astype(float).reshape(count, len(KINEMATIC_LANDMARKS), 3))
+
+# =====================================
+# SERIES
+# =====================================
+
+def to_arrays(frames: List[Dict[str, Any]],
+              duration_seconds: float = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Tiempos (s) y posiciones (N, 12, 3) con NaN donde falta un punto"""
+    count = len(frames)
+    size = len(KINEMATIC_LANDMARKS)
+    positions = None
+    try:
+        # Caso habitual: 12 puntos [x, y, z] por frame, conversión en bloque.
+        # Las longitudes se comprueban antes: fromiter con `count` truncaría
+        # en silencio frames de 33 landmarks o puntos con visibilidad.
+        rows = [frame["points"] for frame in frames]
+        if all(len(points) == size for points in rows) and \
+                all(len(point) == 3 for point in chain.from_iterable(rows)):
+            coordinates = chain.from_iterable(chain.from_iterable(rows))
+            positions = np.fromiter(coordinates, dtype=float, count=count * size * 3).reshape(count, size, 3)
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    if positions is None:
+        missing = [np.nan] * 3
+        flat: List[float] = []
+        for frame in frames:
+            points = frame.get("points") or []
+            if len(points) > size:
+                points = select_world_landmarks(points)
+            for j in range(size):
+                point = _coordinates(points[j]) if j < len(points) else None
+                flat.extend(point if point is not None else missing)
+        positions = np.array(flat, dtype=float).reshape(count, size, 3)
+
+    times = np.array(
+        [frame["t"] if isinstance(frame.get("t"), (int, float)) else np.nan for frame in frames],
+        dtype=float
+    ) / 1000.0
+
+    if count and np.isnan(times).any():
+        # Sin tiempos: repartir los frames uniformemente en la duración
+        times = np.linspace(0, duration_seconds or count / 30.0, count)
+    return _ordered(times, positions)
+
+def _ordered(times: np.ndarray, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Ordenar por tiempo y quitar frames con el tiempo repetido"""
+    order = np.argsort(times, kind="stable")
+    times, positions = times[order], positions[order]
+    times, unique = np.unique(times, return_index=True)
+    return times, positions[unique]
+
+def joint_angle(positions: np.ndarray, a: str, b: str, c: str) -> np.ndarray:
+    """Ángulo 3D en `b` (grados) para todos los frames"""
+    u = positions[:, _INDEX[a]] - positions[:, _INDEX[b]]
+    w = positions[:, _INDEX[c]] - positions[:, _INDEX[b]]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cosine = np.einsum("ij,ij->i", u, w) / (np.linalg.norm(u, axis=1) * np.linalg.norm(w, axis=1))
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+def _midpoint(positions: np.ndarray, pair: Tuple[str, str]) -> np.ndarray:
+    return (positions[:, _INDEX[pair[0]]] + positions[:, _INDEX[pair[1]]]) / 2
+
+def _path_deviation(path: np.ndarray, segments: List[Tuple[int, int]]) -> Optional[float]:
+    """RMS (cm) de la desviación horizontal (x, z) respecto a la media de cada segmento"""
+    labels = np.full(len(path), -1)
+    for number, (start, end) in enumerate(segments):
+        labels[start:end + 1] = number
+    horizontal = path[:, [0, 2]]
+    valid = (labels >= 0) & ~np.isnan(horizontal).any(axis=1)
+    if valid.sum() < 2:
+        return None
+
+    labels, horizontal = labels[valid], horizontal[valid]
+    counts = np.bincount(labels, minlength=len(segments))
+    means = np.stack([
+        np.bincount(labels, weights=horizontal[:, axis], minlength=len(segments)) for axis in (0, 1)
+    ], axis=1) / np.maximum(counts, 1)[:, None]
+    deviation = horizontal - means[labels]
+    return float(np.sqrt((deviation ** 2).sum(axis=1).mean()) * 100)
+
+def _nan_to_none(values: np.ndarray) -> List[Optional[float]]:
+    return [None if v != v else v for v in values.tolist()]
+
+def _round(value: Optional[float], digits: int = 3) -> Optional[float]:
+    if value is None or not np.isfinite(value):
+        return None
+    return round(float(value), digits)
+
+# =====================================
+# MÉTRICAS
+# =====================================
+
+def symmetry_from_angles(angles: Dict[str, np.ndarray]) -> Optional[float]:
+    """100 si izquierda y derecha coinciden; resta 2 puntos por grado de diferencia media"""
+    differences = []
+    for left, right in SYMMETRY_PAIRS:
+        if left in angles and right in angles:
+            difference = np.abs(angles[left] - angles[right])
+            if not np.isnan(difference).all():
+                differences.append(np.nanmean(difference))
+    if not differences:
+        return None
+    return max(0.0, round(100.0 - float(np.mean(differences)) * 2, 1))
+
+def series_symmetry(series: Dict[str, List[Optional[float]]]) -> Optional[float]:
+    """Simetría a partir de las series de ángulos 2D guardadas (`load_series`)"""
+    angles = {
+        joint: np.array([np.nan if v is None else v for v in series[joint]], dtype=float)
+        for pair in SYMMETRY_PAIRS for joint in pair if joint in series
+    }
+    return symmetry_from_angles(angles)
+
+def compute_kinematics(frames: List[Dict[str, Any]], exercise_type: str,
+                       duration_seconds: float = 0) -> Optional[Dict[str, Any]]:
+    """Métricas cinemáticas de una serie de world landmarks"""
+    times, positions = to_arrays(frames, duration_seconds)
+    return kinematics_from_arrays(times, positions, exercise_type)
+
+def kinematics_from_arrays(times: np.ndarray, positions: np.ndarray,
+                           exercise_type: str) -> Optional[Dict[str, Any]]:
+    """Métricas a partir de tiempos (s) y posiciones (N, 12, 3)"""
+    if len(times) < 3:
+        return None
+
+    velocity = np.gradient(positions, times, axis=0)
+    acceleration = np.gradient(velocity, times, axis=0)
+    speed = np.linalg.norm(velocity, axis=2)
+
+    tracking = TRACKING_POINTS.get((exercise_type or "").lower(), DEFAULT_TRACKING)
+    tracked = _midpoint(positions, tracking)
+    tracked_velocity = np.gradient(tracked, times, axis=0)
+    tracked_speed = np.linalg.norm(tracked_velocity, axis=1)
+    tracked_accel = np.linalg.norm(np.gradient(tracked_velocity, times, axis=0), axis=1)
+
+    angles = {name: joint_angle(positions, *points) for name, points in JOINT_ANGLES.items()}
+
+    # Repeticiones sobre el ángulo principal calculado en 3D
+    joint = primary_joint(exercise_type)
+    times_ms = (times * 1000).astype(int).tolist()
+    reps = segment_reps(times_ms, _nan_to_none(angles[joint])) if joint in angles else []
+    eccentric = [(rep["bottom_ms"] - rep["start_ms"]) / 1000 for rep in reps]
+    concentric = [(rep["end_ms"] - rep["bottom_ms"]) / 1000 for rep in reps]
+    segments = [(rep["start_index"], rep["end_index"]) for rep in reps] or [(0, len(times) - 1)]
+
+    # Puntos nunca visibles dan medias vacías (NaN -> None)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        joint_speeds = np.nanmean(speed, axis=0)
+        joint_accels = np.nanmean(np.linalg.norm(acceleration, axis=2), axis=0)
+        movement_speed = np.nanmean(tracked_speed) if not np.isnan(tracked_speed).all() else None
+        peak_velocity = np.nanmax(tracked_speed) if not np.isnan(tracked_speed).all() else None
+        peak_acceleration = np.nanmax(tracked_accel) if not np.isnan(tracked_accel).all() else None
+
+    return {
+        "frames": len(times),
+        "movement_speed": _round(movement_speed),
+        "peak_velocity": _round(peak_velocity),
+        "peak_acceleration": _round(peak_acceleration),
+        "symmetry_score": symmetry_from_angles(angles),
+        "reps": len(reps),
+        "eccentric_seconds": _round(float(np.mean(eccentric))) if eccentric else None,
+        "concentric_seconds": _round(float(np.mean(concentric))) if concentric else None,
+        "wrist_path_deviation_cm": _round(
+            _path_deviation(_midpoint(positions, ("leftWrist", "rightWrist")), segments), 2
+        ),
+        "hip_path_deviation_cm": _round(
+            _path_deviation(_midpoint(positions, ("leftHip", "rightHip")), segments), 2
+        ),
+        "joint_speed": {
+            name: _round(joint_speeds[i]) for i, name in enumerate(KINEMATIC_LANDMARKS)
+        },
+        "joint_acceleration": {
+            name: _round(joint_accels[i]) for i, name in enumerate(KINEMATIC_LANDMARKS)
+        }
+    }
+
+# =====================================
+# TRABAJO ASÍNCRONO
+# =====================================
+
+def analyze_kinematics(cursor, performance_id: int, exercise_type: str) -> Dict[str, Any]:
+    """Calcular la cinemática guardada al crear la sesión y rellenar la performance
+
+    Sin world landmarks la simetría sale de los ángulos 2D. Los frames
+    binarios se borran al guardar las métricas. No hace commit.
+    """
+    cursor.execute(
+        "SELECT frames FROM performance_kinematics WHERE performance_id = %s",
+        (performance_id,)
+    )
+    row = cursor.fetchone()
+    metrics = None
+    if row and row["frames"]:
+        metrics = kinematics_from_arrays(*unpack_frames(row["frames"]), exercise_type)
+
+    if metrics:
+        cursor.execute(
+            "UPDATE performance_kinematics SET metrics = %s, frames = NULL WHERE performance_id = %s",
+            (json.dumps(metrics), performance_id)
+        )
+        movement_speed, symmetry_score = metrics["movement_speed"], metrics["symmetry_score"]
+    else:
+        if row:
+            cursor.execute("DELETE FROM performance_kinematics WHERE performance_id = %s", (performance_id,))
+        joints = [joint for pair in SYMMETRY_PAIRS for joint in pair]
+        _, series = load_series(cursor, performance_id, joints=joints)
+        movement_speed, symmetry_score = None, series_symmetry(series)
+
+    if movement_speed is not None or symmetry_score is not None:
+        cursor.execute("""
+        UPDATE exercise_performances
+        SET movement_speed = %s, symmetry_score = COALESCE(%s, symmetry_score)
+        WHERE id = %s
+        """, (movement_speed, symmetry_score, performance_id))
+    return {"movement_speed": movement_speed, "symmetry_score": symmetry_score, "kinematics": metrics is not None}
@@ -0,0 +1,395 @@
+"""
+Rankings por ejercicio con top-k mantenido de forma incremental
+
+Cada escritura de sesión actualiza, dentro de su transacción, una fila
+por (ranking, ejercicio, periodo, usuario) en `leaderboard_entries`. Los
+valores solo crecen dentro de un periodo (mejor puntuación, número de
+sesiones, mejor racha), así que el top-k en memoria se mantiene con una
+sola comparación por actualización. Los rankings diarios y semanales
+cambian de periodo por clave, sin recalcular nada.
+
+Borrar una sesión es la excepción: `remove_session` recalcula desde las
+sesiones que quedan las filas del usuario en los periodos de esa sesión y
+su racha, y los tableros en memoria afectados se descartan.
+
+Cada worker tiene su propia copia en memoria; las actualizaciones (y
+bajadas por borrado) de otros procesos se incorporan al refrescar el
+tablero (LEADERBOARD_TTL), que se recarga tal cual está en la BD.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, date, timedelta
+from typing import Optional, Dict, List, Any, Tuple
+
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "50"))
+LEADERBOARD_TTL = float(os.getenv("LEADERBOARD_TTL", "30"))
+USERNAME_CACHE_SIZE = int(os.getenv("USERNAME_CACHE_SIZE", "10000"))
+
+# Ranking -> ventanas de tiempo disponibles
+BOARDS = {
+    "best_score": ("all", "daily", "weekly"),
+    "sessions": ("daily", "weekly"),
+    "streak": ("all",),
+}
+
+# =====================================
+# TOP-K EN MEMORIA
+# =====================================
+
+class TopK:
+    """Los k mejores usuarios de un tablero; valores monótonos crecientes por usuario"""
+
+    def __init__(self, k: int = LEADERBOARD_SIZE):
+        self.k = k
+        self.entries: Dict[int, float] = {}
+        self.loaded_at = 0.0
+        self._ranking: Optional[List[Tuple[int, float]]] = None
+
+    def offer(self, user_id: int, value: float) -> None:
+        current = self.entries.get(user_id)
+        if current is not None:
+            if value <= current:
+                return
+        elif len(self.entries) >= self.k and value <= min(self.entries.values()):
+            return
+
+        self.entries[user_id] = value
+        if len(self.entries) > self.k:
+            del self.entries[min(self.entries, key=self.entries.get)]
+        self._ranking = None
+
+    def ranking(self) -> List[Tuple[int, float]]:
+        if self._ranking is None:
+            self._ranking = sorted(self.entries.items(), key=lambda item: (-item[1], item[0]))
+        return self._ranking
+
+_boards: Dict[Tuple[str, str, str, str], TopK] = {}
+_boards_lock = threading.Lock()
+# Nombres de usuario de los rankings (LRU acotado, como la caché de tokens)
+_usernames: "OrderedDict[int, str]" = OrderedDict()
+_usernames_lock = threading.Lock()
+
+def period_for(window: str, when: Optional[datetime] = None) -> str:
+    """Clave del periodo actual de una ventana"""
+    when = when or datetime.now()
+    if window == "daily":
+        return when.strftime("%Y-%m-%d")
+    if window == "weekly":
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    return "all"
+
+def _drop_stale_periods(board: str, exercise_type: str, window: str, period: str) -> None:
+    """Olvidar en memoria los periodos anteriores de una ventana"""
+    for key in [k for k in _boards if k[:3] == (board, exercise_type, window) and k[3] != period]:
+        del _boards[key]
+
+# =====================================
+# ESCRITURA (dentro de la transacción de la sesión)
+# =====================================
+
+def _upsert(cursor, board: str, exercise_type: str, period: str, user_id: int,
+            value: float, accumulate: bool) -> float:
+    update = "value + VALUES(value)" if accumulate else "GREATEST(value, VALUES(value))"
+    cursor.execute(f"""
+    INSERT INTO leaderboard_entries (board, exercise_type, period, user_id, value)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE value = {update}
+    """, (board, exercise_type, period, user_id, value))
+    cursor.execute("""
+    SELECT value FROM leaderboard_entries
+    WHERE board = %s AND exercise_type = %s AND period = %s AND user_id = %s
+    """, (board, exercise_type, period, user_id))
+    return float(cursor.fetchone()["value"])
+
+def _update_streak(cursor, user_id: int, exercise_type: str, today: date) -> int:
+    """Actualizar la racha de días consecutivos; devuelve la mejor racha"""
+    cursor.execute("""
+    SELECT last_day, current_streak, best_streak FROM leaderboard_streaks
+    WHERE user_id = %s AND exercise_type = %s
+    FOR UPDATE
+    """, (user_id, exercise_type))
+    row = cursor.fetchone()
+
+    if row is None:
+        current, best = 1, 1
+    elif row["last_day"] == today:
+        return row["best_streak"]
+    elif row["last_day"] == today - timedelta(days=1):
+        current = row["current_streak"] + 1
+        best = max(row["best_streak"], current)
+    else:
+        current, best = 1, row["best_streak"]
+
+    cursor.execute("""
+    INSERT INTO leaderboard_streaks (user_id, exercise_type, last_day, current_streak, best_streak)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE last_day = VALUES(last_day),
+        current_streak = VALUES(current_streak), best_streak = VALUES(best_streak)
+    """, (user_id, exercise_type, today, current, best))
+    return best
+
+def record_session(cursor, user_id: int, exercise_type: str, technique_score: float,
+                   when: Optional[datetime] = None) -> List[Tuple[str, str, str, str, int, float]]:
+    """Actualizar las filas de ranking de una sesión nueva
+
+    Devuelve las actualizaciones para aplicarlas en memoria con
+    `apply_updates` una vez confirmada la transacción.
+    """
+    when = when or datetime.now()
+    updates = []
+
+    for window in BOARDS["best_score"]:
+        period = period_for(window, when)
+        value = _upsert(cursor, "best_score", exercise_type, period, user_id, technique_score, False)
+        updates.append(("best_score", exercise_type, window, period, user_id, value))
+
+    for window in BOARDS["sessions"]:
+        period = period_for(window, when)
+        value = _upsert(cursor, "sessions", exercise_type, period, user_id, 1, True)
+        updates.append(("sessions", exercise_type, window, period, user_id, value))
+
+    best_streak = _update_streak(cursor, user_id, exercise_type, when.date())
+    value = _upsert(cursor, "streak", exercise_type, "all", user_id, best_streak, False)
+    updates.append(("streak", exercise_type, "all", "all", user_id, value))
+
+    return updates
+
+def apply_updates(updates: List[Tuple[str, str, str, str, int, float]]) -> None:
+    """Aplicar en memoria actualizaciones ya confirmadas"""
+    with _boards_lock:
+        for board, exercise_type, window, period, user_id, value in updates:
+            board_top = _boards.get((board, exercise_type, window, period))
+            if board_top is not None:
+                board_top.offer(user_id, value)
+
+def _period_range(window: str, when: datetime) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """[inicio, fin) del periodo de `when` en una ventana (sin límites para 'all')"""
+    if window == "all":
+        return None, None
+    day = datetime.combine(when.date(), datetime.min.time())
+    if window == "weekly":
+        day -= timedelta(days=day.weekday())
+        return day, day + timedelta(days=7)
+    return day, day + timedelta(days=1)
+
+def _recompute_streak(cursor, user_id: int, exercise_type: str) -> int:
+    """Reconstruir la racha a partir de los días con sesión; devuelve la mejor (0 si no quedan)"""
+    cursor.execute("""
+    SELECT DISTINCT DATE(ws.start_time) AS day
+    FROM exercise_performances ep
+    JOIN workout_sessions ws ON ep.session_id = ws.id
+    JOIN exercise_types et ON ep.exercise_type_id = et.id
+    WHERE ep.user_id = %s AND et.name = %s
+    ORDER BY day
+    """, (user_id, exercise_type))
+    current = best = 0
+    previous = None
+    for row in cursor.fetchall():
+        day = row["day"]
+        current = current + 1 if previous is not None and day == previous + timedelta(days=1) else 1
+        best = max(best, current)
+        previous = day
+
+    if previous is None:
+        cursor.execute(
+            "DELETE FROM leaderboard_streaks WHERE user_id = %s AND exercise_type = %s",
+            (user_id, exercise_type)
+        )
+        return 0
+    cursor.execute("""
+    INSERT INTO leaderboard_streaks (user_id, exercise_type, last_day, current_streak, best_streak)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE last_day = VALUES(last_day),
+        current_streak = VALUES(current_streak), best_streak = VALUES(best_streak)
+    """, (user_id, exercise_type, previous, current, best))
+    return best
+
+def _set_entry(cursor, board: str, exercise_type: str, period: str, user_id: int,
+               value: Optional[float]) -> None:
+    if value:
+        cursor.execute("""
+        UPDATE leaderboard_entries SET value = %s
+        WHERE board = %s AND exercise_type = %s AND period = %s AND user_id = %s
+        """, (value, board, exercise_type, period, user_id))
+    else:
+        cursor.execute("""
+        DELETE FROM leaderboard_entries
+        WHERE board = %s AND exercise_type = %s AND period = %s AND user_id = %s
+        """, (board, exercise_type, period, user_id))
+
+def remove_session(cursor, user_id: int, exercise_type: str, when: datetime) -> None:
+    """Recalcular las filas de ranking del usuario tras borrar una sesión
+
+    Se llama con la sesión ya borrada, dentro de la misma transacción. Solo
+    se tocan los periodos de la sesión (los demás no cambian) y la racha.
+    Después del commit, `forget_boards(exercise_type)`.
+    """
+    for window in sorted(set(BOARDS["best_score"]) | set(BOARDS["sessions"])):
+        start, end = _period_range(window, when)
+        query = """
+        SELECT MAX(ep.technique_score) AS best, COUNT(*) AS sessions
+        FROM exercise_performances ep
+        JOIN workout_sessions ws ON ep.session_id = ws.id
+        JOIN exercise_types et ON ep.exercise_type_id = et.id
+        WHERE ep.user_id = %s AND et.name = %s
+        """
+        params: List[Any] = [user_id, exercise_type]
+        if start is not None:
+            query += " AND ws.start_time >= %s AND ws.start_time < %s"
+            params.extend([start, end])
+        cursor.execute(query, tuple(params))
+        row = cursor.fetchone()
+
+        period = period_for(window, when)
+        if window in BOARDS["best_score"]:
+            _set_entry(cursor, "best_score", exercise_type, period, user_id, row["best"])
+        if window in BOARDS["sessions"]:
+            _set_entry(cursor, "sessions", exercise_type, period, user_id, row["sessions"])
+
+    best_streak = _recompute_streak(cursor, user_id, exercise_type)
+    _set_entry(cursor, "streak", exercise_type, "all", user_id, best_streak)
+
+def forget_boards(exercise_type: str) -> None:
+    """Descartar de memoria los tableros de un ejercicio (se recargan en la siguiente lectura)"""
+    with _boards_lock:
+        for key in [k for k in _boards if k[1] == exercise_type]:
+            del _boards[key]
+
+# =====================================
+# LECTURA
+# =====================================
+
+def _load_board(cursor, board: str, exercise_type: str, period: str) -> TopK:
+    cursor.execute("""
+    SELECT user_id, value FROM leaderboard_entries
+    WHERE board = %s AND exercise_type = %s AND period = %s
+    ORDER BY value DESC
+    LIMIT %s
+    """, (board, exercise_type, period, LEADERBOARD_SIZE))
+    board_top = TopK()
+    for row in cursor.fetchall():
+        board_top.offer(row["user_id"], float(row["value"]))
+    board_top.loaded_at = time.monotonic()
+    return board_top
+
+def _cached_usernames(user_ids: List[int]) -> Dict[int, str]:
+    names = {}
+    with _usernames_lock:
+        for user_id in user_ids:
+            name = _usernames.get(user_id)
+            if name is not None:
+                _usernames.move_to_end(user_id)
+                names[user_id] = name
+    return names
+
+def _resolve_usernames(cursor, user_ids: List[int], names: Dict[int, str]) -> None:
+    missing = [user_id for user_id in user_ids if user_id not in names]
+    if not missing:
+        return
+    cursor.execute(
+        f"SELECT id, username FROM users WHERE id IN ({', '.join(['%s'] * len(missing))})",
+        tuple(missing)
+    )
+    rows = cursor.fetchall()
+    with _usernames_lock:
+        for row in rows:
+            names[row["id"]] = _usernames[row["id"]] = row["username"]
+            if len(_usernames) > USERNAME_CACHE_SIZE:
+                _usernames.popitem(last=False)
+
+def get_leaderboard(get_connection, board: str, exercise_type: str,
+                    window: str = "all", limit: int = 10) -> Dict[str, Any]:
+    """Ranking actual desde memoria; solo toca la BD si el tablero caducó o faltan nombres"""
+    if window not in BOARDS.get(board, ()):
+        raise ValueError(f"Ranking '{board}' no disponible para la ventana '{window}'")
+
+    period = period_for(window)
+    key = (board, exercise_type, window, period)
+
+    with _boards_lock:
+        board_top = _boards.get(key)
+        fresh = board_top is not None and time.monotonic() - board_top.loaded_at < LEADERBOARD_TTL
+        ranking = board_top.ranking()[:limit] if fresh else None
+
+    names = _cached_usernames([user_id for user_id, _ in ranking]) if ranking is not None else {}
+    if ranking is None or len(names) < len(ranking):
+        connection = get_connection()
+        if not connection:
+            raise ConnectionError("No se pudo conectar a la base de datos")
+        try:
+            cursor = connection.cursor(dictionary=True)
+            if ranking is None:
+                loaded = _load_board(cursor, board, exercise_type, period)
+                with _boards_lock:
+                    _drop_stale_periods(board, exercise_type, window, period)
+                    _boards[key] = loaded
+                    ranking = loaded.ranking()[:limit]
+                names = _cached_usernames([user_id for user_id, _ in ranking])
+            _resolve_usernames(cursor, [user_id for user_id, _ in ranking], names)
+            cursor.close()
+        finally:
+            connection.close()
+
+    return {
+        "board": board,
+        "exercise_type": exercise_type,
+        "window": window,
+        "period": period,
+        "entries": [
+            {
+                "rank": position + 1,
+                "user_id": user_id,
+                "username": names.get(user_id),
+                "value": value
+            }
+            for position, (user_id, value) in enumerate(ranking)
+        ]
+    }
+
+def warm_leaderboards(get_connection) -> int:
+    """Cargar en memoria el top-k de todos los tableros de los periodos actuales"""
+    periods = sorted({period_for(w) for windows in BOARDS.values() for w in windows})
+    connection = get_connection()
+    if not connection:
+        raise ConnectionError("No se pudo conectar a la base de datos")
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(f"""
+        SELECT board, exercise_type, period, user_id, value FROM (
+            SELECT board, exercise_type, period, user_id, value,
+                   ROW_NUMBER() OVER (PARTITION BY board, exercise_type, period ORDER BY value DESC) as position
+            FROM leaderboard_entries
+            WHERE period IN ({', '.join(['%s'] * len(periods))})
+        ) ranked
+        WHERE position <= %s
+        """, (*periods, LEADERBOARD_SIZE))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+
+    loaded: Dict[Tuple[str, str, str, str], TopK] = {}
+    now = time.monotonic()
+    for row in rows:
+        for window in BOARDS.get(row["board"], ()):
+            if period_for(window) != row["period"]:
+                continue
+            key = (row["board"], row["exercise_type"], window, row["period"])
+            board_top = loaded.setdefault(key, TopK())
+            board_top.offer(row["user_id"], float(row["value"]))
+            board_top.loaded_at = now
+
+    with _boards_lock:
+        _boards.update(loaded)
+    return len(loaded)
+
+def prune_periods(cursor, keep_days: int = 14) -> int:
+    """Borrar filas de periodos diarios/semanales antiguos"""
+    cursor.execute("""
+    DELETE FROM leaderboard_entries
+    WHERE period <> 'all' AND updated_at < DATE_SUB(NOW(), INTERVAL %s DAY)
+    """, (keep_days,))
+    return cursor.rowcount
@@ -0,0 +1,226 @@
+"""
+Estadísticas de progreso incrementales por (usuario, ejercicio)
+
+Cada guardado de sesión actualiza en O(1) una fila de `user_exercise_stats`
+con, por métrica: media y varianza (Welford), tendencia EWMA, mínimo y
+máximo históricos, y la EWMA al empezar el mes para calcular la mejora
+mensual. Las vistas de progreso leen esa fila sin recorrer sesiones.
+
+`check_consistency` recalcula todo desde `exercise_performances` y
+reporta las diferencias.
+"""
+import json
+import math
+import os
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Iterable, Tuple
+
+EWMA_ALPHA = float(os.getenv("PROGRESS_EWMA_ALPHA", "0.3"))
+DRIFT_TOLERANCE = 1e-6
+
+# Métrica -> columna de exercise_performances
+METRIC_COLUMNS = {
+    "technique_score": "technique_score",
+    "knee_angle": "avg_knee_angle",
+    "hip_angle": "avg_hip_angle",
+    "shoulder_angle": "avg_shoulder_angle",
+    "elbow_angle": "avg_elbow_angle",
+}
+
+# =====================================
+# ACUMULADORES
+# =====================================
+
+def update_metric(state: Optional[Dict[str, Any]], value: float, month: str) -> Dict[str, Any]:
+    """Incorporar un valor a los acumuladores de una métrica"""
+    if state is None:
+        return {
+            "n": 1, "mean": value, "m2": 0.0, "ewma": value,
+            "min": value, "max": value, "month": month, "month_baseline": None
+        }
+
+    if state["month"] != month:
+        state["month_baseline"] = state["ewma"]
+        state["month"] = month
+
+    state["n"] += 1
+    delta = value - state["mean"]
+    state["mean"] += delta / state["n"]
+    state["m2"] += delta * (value - state["mean"])
+    state["ewma"] += EWMA_ALPHA * (value - state["ewma"])
+    state["min"] = min(state["min"], value)
+    state["max"] = max(state["max"], value)
+    return state
+
+def apply_values(metrics: Dict[str, Any], values: Dict[str, Optional[float]], when: datetime) -> Dict[str, Any]:
+    """Aplicar los valores de una sesión a todas sus métricas presentes"""
+    month = when.strftime("%Y-%m")
+    for metric, value in values.items():
+        if value is not None:
+            metrics[metric] = update_metric(metrics.get(metric), float(value), month)
+    return metrics
+
+def describe_metric(state: Dict[str, Any], month: Optional[str] = None) -> Dict[str, Any]:
+    """Vista de una métrica: media, desviación, tendencia y mejora del mes"""
+    month = month or datetime.now().strftime("%Y-%m")
+    baseline = state["month_baseline"] if state["month"] == month else None
+    change = None
+    if baseline:
+        change = round((state["ewma"] - baseline) / abs(baseline) * 100, 1)
+    return {
+        "count": state["n"],
+        "mean": round(state["mean"], 2),
+        "stddev": round(math.sqrt(state["m2"] / (state["n"] - 1)), 2) if state["n"] > 1 else 0.0,
+        "trend": round(state["ewma"], 2),
+        "min": state["min"],
+        "max": state["max"],
+        "month_change_pct": change
+    }
+
+# =====================================
+# ESCRITURA (dentro de la transacción de la sesión)
+# =====================================
+
+def _save_row(cursor, user_id: int, exercise_type_id: int, session_count: int,
+              last_session_at: Optional[datetime], metrics: Dict[str, Any]) -> None:
+    cursor.execute("""
+    INSERT INTO user_exercise_stats (user_id, exercise_type_id, session_count, last_session_at, metrics)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE session_count = VALUES(session_count),
+        last_session_at = VALUES(last_session_at), metrics = VALUES(metrics)
+    """, (user_id, exercise_type_id, session_count, last_session_at, json.dumps(metrics)))
+
+def record_performance(cursor, user_id: int, exercise_type_id: int,
+                       values: Dict[str, Optional[float]], when: datetime) -> None:
+    """Actualizar las estadísticas de (usuario, ejercicio) con una sesión nueva"""
+    cursor.execute("""
+    SELECT session_count, metrics FROM user_exercise_stats
+    WHERE user_id = %s AND exercise_type_id = %s
+    FOR UPDATE
+    """, (user_id, exercise_type_id))
+    row = cursor.fetchone()
+
+    session_count = row["session_count"] if row else 0
+    metrics = json.loads(row["metrics"]) if row else {}
+    apply_values(metrics, values, when)
+    _save_row(cursor, user_id, exercise_type_id, session_count + 1, when, metrics)
+
+# =====================================
+# LECTURA
+# =====================================
+
+def get_progress(cursor, user_id: int, exercise_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Estadísticas de progreso del usuario, una fila por ejercicio"""
+    query = """
+    SELECT et.name as exercise_name, s.session_count, s.last_session_at, s.metrics
+    FROM user_exercise_stats s
+    JOIN exercise_types et ON s.exercise_type_id = et.id
+    WHERE s.user_id = %s
+    """
+    params: Tuple[Any, ...] = (user_id,)
+    if exercise_type:
+        query += " AND et.name = %s"
+        params += (exercise_type,)
+    query += " ORDER BY s.session_count DESC"
+
+    cursor.execute(query, params)
+    month = datetime.now().strftime("%Y-%m")
+    return [
+        {
+            "exercise_type": row["exercise_name"],
+            "session_count": row["session_count"],
+            "last_session_at": row["last_session_at"],
+            "metrics": {
+                metric: describe_metric(state, month)
+                for metric, state in json.loads(row["metrics"]).items()
+            }
+        }
+        for row in cursor.fetchall()
+    ]
+
+# =====================================
+# COMPROBACIÓN DE CONSISTENCIA
+# =====================================
+
+def _replay(rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[int, int], Dict[str, Any]]:
+    """Recalcular los acumuladores desde las performances, en orden cronológico"""
+    expected: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    for row in rows:
+        key = (row["user_id"], row["exercise_type_id"])
+        entry = expected.setdefault(key, {"session_count": 0, "last_session_at": None, "metrics": {}})
+        entry["session_count"] += 1
+        entry["last_session_at"] = row["start_time"]
+        apply_values(
+            entry["metrics"],
+            {metric: row[column] for metric, column in METRIC_COLUMNS.items()},
+            row["start_time"]
+        )
+    return expected
+
+def _metric_drift(stored: Dict[str, Any], expected: Dict[str, Any]) -> Dict[str, float]:
+    drift = {}
+    for metric in set(stored) | set(expected):
+        a, b = stored.get(metric), expected.get(metric)
+        if a is None or b is None:
+            drift[metric] = math.inf
+            continue
+        for field in ("n", "mean", "m2", "ewma", "min", "max", "month_baseline"):
+            x, y = a.get(field), b.get(field)
+            if x is None or y is None:
+                if x is not y:
+                    drift[f"{metric}.{field}"] = math.inf
+                continue
+            difference = abs(x - y)
+            if difference > DRIFT_TOLERANCE * max(1.0, abs(y)):
+                drift[f"{metric}.{field}"] = difference
+    return drift
+
+def check_consistency(cursor, user_id: Optional[int] = None, fix: bool = False) -> List[Dict[str, Any]]:
+    """Comparar las filas guardadas con un recálculo completo; con `fix` las reescribe"""
+    columns = ", ".join(f"ep.{column}" for column in METRIC_COLUMNS.values())
+    query = f"""
+    SELECT ep.user_id, ep.exercise_type_id, ws.start_time, {columns}
+    FROM exercise_performances ep
+    JOIN workout_sessions ws ON ep.session_id = ws.id
+    """
+    params: Tuple[Any, ...] = ()
+    if user_id is not None:
+        query += " WHERE ep.user_id = %s"
+        params = (user_id,)
+    query += " ORDER BY ws.start_time, ep.id"
+    cursor.execute(query, params)
+    expected = _replay(cursor.fetchall())
+
+    query = "SELECT user_id, exercise_type_id, session_count, metrics FROM user_exercise_stats"
+    if user_id is not None:
+        query += " WHERE user_id = %s"
+    cursor.execute(query, params)
+    stored = {(row["user_id"], row["exercise_type_id"]): row for row in cursor.fetchall()}
+
+    report = []
+    for key in set(expected) | set(stored):
+        should = expected.get(key)
+        row = stored.get(key)
+        if should is None:
+            report.append({"user_id": key[0], "exercise_type_id": key[1], "issue": "sin sesiones"})
+            continue
+        if row is None:
+            drift = {"session_count": should["session_count"]}
+        else:
+            drift = _metric_drift(json.loads(row["metrics"]), should["metrics"])
+            if row["session_count"] != should["session_count"]:
+                drift["session_count"] = abs(row["session_count"] - should["session_count"])
+        if drift:
+            report.append({"user_id": key[0], "exercise_type_id": key[1], "drift": drift})
+            if fix:
+                _save_row(cursor, key[0], key[1], should["session_count"],
+                          should["last_session_at"], should["metrics"])
+
+    if fix:
+        for entry in report:
+            if entry.get("issue"):
+                cursor.execute(
+                    "DELETE FROM user_exercise_stats WHERE user_id = %s AND exercise_type_id = %s",
+                    (entry["user_id"], entry["exercise_type_id"])
+                )
+    return report
@@ -0,0 +1,265 @@
+"""
+Retención por niveles de los datos de pose
+
+- Nivel "downsampled": performances con más de RETENTION_DOWNSAMPLE_DAYS
+  días se reducen a RETENTION_TARGET_FPS, conservando siempre los frames
+  que delimitan repeticiones (inicio, fondo y fin).
+- Nivel "archived": con más de RETENTION_ARCHIVE_DAYS días, `pose_data`,
+  `angle_history` y los chunks de ángulos salen de las tablas calientes a
+  un fichero JSON comprimido en disco. `pose_retention` actúa de índice.
+
+Las performances archivadas se restauran bajo demanda al pedir el
+detalle de la sesión (nivel "restored"); se vuelven a archivar pasados
+RETENTION_RESTORE_HOLD_DAYS días.
+
+    python manage.py retention
+"""
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Optional, Dict, List, Any
+
+from .angle_store import load_series, replace_angle_history
+from .session_analysis import primary_joint, segment_reps, rep_boundaries
+
+logger = logging.getLogger(__name__)
+
+DOWNSAMPLE_DAYS = int(os.getenv("RETENTION_DOWNSAMPLE_DAYS", "90"))
+ARCHIVE_DAYS = int(os.getenv("RETENTION_ARCHIVE_DAYS", "365"))
+RESTORE_HOLD_DAYS = int(os.getenv("RETENTION_RESTORE_HOLD_DAYS", "30"))
+TARGET_FPS = float(os.getenv("RETENTION_TARGET_FPS", "5"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "archive"
+))
+BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "200"))
+
+TIER_DOWNSAMPLED = "downsampled"
+TIER_ARCHIVED = "archived"
+TIER_RESTORED = "restored"
+
+# Marca que queda en `pose_data` de una performance archivada (mantiene IS NOT NULL)
+ARCHIVED_POSE_STUB = json.dumps({"archived": True})
+
+# =====================================
+# REDUCCIÓN DE FRECUENCIA
+# =====================================
+
+def select_keyframes(times: List[int], keep: List[int], target_fps: float) -> List[int]:
+    """Índices a conservar: uno cada 1/target_fps segundos más los obligatorios"""
+    interval = 1000.0 / target_fps
+    selected = set(keep)
+    last_t: Optional[float] = None
+    for i, t in enumerate(times):
+        if last_t is None or t - last_t >= interval:
+            selected.add(i)
+            last_t = t
+    if times:
+        selected.add(len(times) - 1)
+    return sorted(i for i in selected if 0 <= i < len(times))
+
+def downsample_performance(cursor, performance: Dict[str, Any],
+                           target_fps: float = TARGET_FPS) -> Dict[str, int]:
+    """Reducir la serie de una performance y reescribir chunks y `angle_history`"""
+    performance_id = performance["id"]
+    times, series = load_series(cursor, performance_id)
+    joint = primary_joint(performance["exercise_name"])
+    reps = segment_reps(times, series.get(joint, []))
+    keep = select_keyframes(times, rep_boundaries(reps), target_fps)
+
+    frames = []
+    for i in keep:
+        frame = {name: values[i] for name, values in series.items() if values[i] is not None}
+        frame["t"] = times[i]
+        frames.append(frame)
+
+    if len(frames) < len(times):
+        replace_angle_history(
+            cursor, performance_id, performance["user_id"],
+            performance["start_time"] or datetime.now(), frames
+        )
+
+    _set_tier(cursor, performance_id, TIER_DOWNSAMPLED, original_samples=len(times), kept_samples=len(frames))
+    return {"original": len(times), "kept": len(frames)}
+
+# =====================================
+# ARCHIVO
+# =====================================
+
+def _text(value: Any) -> Optional[str]:
+    """Columnas JSON/BLOB de mysql.connector como texto"""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8")
+    return value
+
+def _archive_path(performance: Dict[str, Any]) -> str:
+    when = performance["start_time"] or datetime.now()
+    return os.path.join(ARCHIVE_DIR, f"{when:%Y}", f"{when:%m}", f"performance-{performance['id']}.json.gz")
+
+def archive_performance(cursor, performance: Dict[str, Any]) -> str:
+    """Mover los datos de pose de una performance a un fichero comprimido"""
+    performance_id = performance["id"]
+    cursor.execute(
+        "SELECT pose_data, angle_history FROM exercise_performances WHERE id = %s",
+        (performance_id,)
+    )
+    row = cursor.fetchone()
+    cursor.execute("""
+    SELECT chunk_index, recorded_at, t_start_ms, t_end_ms, sample_count, joints, summary, payload
+    FROM angle_sample_chunks WHERE performance_id = %s ORDER BY chunk_index
+    """, (performance_id,))
+    chunks = cursor.fetchall()
+
+    document = {
+        "performance_id": performance_id,
+        "user_id": performance["user_id"],
+        "archived_at": datetime.now().isoformat(),
+        "pose_data": _text(row["pose_data"]),
+        "angle_history": _text(row["angle_history"]),
+        "chunks": [
+            dict(chunk, recorded_at=str(chunk["recorded_at"]), summary=_text(chunk["summary"]),
+                 payload=base64.b64encode(bytes(chunk["payload"])).decode("ascii"))
+            for chunk in chunks
+        ]
+    }
+    data = gzip.compress(json.dumps(document).encode("utf-8"))
+
+    path = _archive_path(performance)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    cursor.execute("DELETE FROM angle_sample_chunks WHERE performance_id = %s", (performance_id,))
+    cursor.execute(
+        "UPDATE exercise_performances SET pose_data = %s, angle_history = NULL WHERE id = %s",
+        (ARCHIVED_POSE_STUB if row["pose_data"] is not None else None, performance_id)
+    )
+    _set_tier(cursor, performance_id, TIER_ARCHIVED, archive_path=path,
+              checksum=hashlib.sha256(data).hexdigest())
+    return path
+
+def restore_performance(cursor, performance_id: int) -> bool:
+    """Devolver a las tablas calientes una performance archivada"""
+    cursor.execute(
+        "SELECT tier, archive_path, checksum FROM pose_retention WHERE performance_id = %s FOR UPDATE",
+        (performance_id,)
+    )
+    index = cursor.fetchone()
+    if not index or index["tier"] != TIER_ARCHIVED:
+        return False
+
+    with open(index["archive_path"], "rb") as f:
+        data = f.read()
+    if hashlib.sha256(data).hexdigest() != index["checksum"]:
+        raise ValueError(f"Archivo de la performance {performance_id} corrupto")
+    document = json.loads(gzip.decompress(data))
+
+    cursor.execute(
+        "UPDATE exercise_performances SET pose_data = %s, angle_history = %s WHERE id = %s",
+        (document["pose_data"], document["angle_history"], performance_id)
+    )
+    if document["chunks"]:
+        cursor.executemany("""
+        INSERT INTO angle_sample_chunks (
+            performance_id, user_id, chunk_index, recorded_at, t_start_ms,
+            t_end_ms, sample_count, joints, summary, payload
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, [
+            (performance_id, document["user_id"], c["chunk_index"], c["recorded_at"],
+             c["t_start_ms"], c["t_end_ms"], c["sample_count"], c["joints"],
+             c["summary"], base64.b64decode(c["payload"]))
+            for c in document["chunks"]
+        ])
+    cursor.execute(
+        "UPDATE pose_retention SET tier = %s, restored_at = %s WHERE performance_id = %s",
+        (TIER_RESTORED, datetime.now(), performance_id)
+    )
+    return True
+
+def remove_archives(paths: List[str]) -> None:
+    """Borrar ficheros de archivo de performances eliminadas (sin fallar)"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("No se pudo borrar el archivo %s: %s", path, e)
+
+def _set_tier(cursor, performance_id: int, tier: str, original_samples: Optional[int] = None,
+              kept_samples: Optional[int] = None, archive_path: Optional[str] = None,
+              checksum: Optional[str] = None) -> None:
+    cursor.execute("""
+    INSERT INTO pose_retention (
+        performance_id, tier, original_samples, kept_samples, archive_path, checksum, processed_at
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE tier = VALUES(tier),
+        original_samples = COALESCE(VALUES(original_samples), original_samples),
+        kept_samples = COALESCE(VALUES(kept_samples), kept_samples),
+        archive_path = COALESCE(VALUES(archive_path), archive_path),
+        checksum = COALESCE(VALUES(checksum), checksum),
+        processed_at = VALUES(processed_at)
+    """, (performance_id, tier, original_samples, kept_samples, archive_path, checksum, datetime.now()))
+
+# =====================================
+# TRABAJO DE RETENCIÓN
+# =====================================
+
+_CANDIDATES_QUERY = """
+SELECT ep.id, ep.user_id, et.name as exercise_name, ws.start_time
+FROM exercise_performances ep
+JOIN workout_sessions ws ON ep.session_id = ws.id
+JOIN exercise_types et ON ep.exercise_type_id = et.id
+LEFT JOIN pose_retention pr ON pr.performance_id = ep.id
+WHERE ws.created_at < DATE_SUB(NOW(), INTERVAL %s DAY)
+AND {condition}
+ORDER BY ep.id
+LIMIT %s
+"""
+
+def run_retention(connection, downsample_days: int = DOWNSAMPLE_DAYS,
+                  archive_days: int = ARCHIVE_DAYS, target_fps: float = TARGET_FPS,
+                  batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """Aplicar los niveles de retención; una transacción por performance"""
+    cursor = connection.cursor(dictionary=True)
+    report = {"archived": 0, "downsampled": 0, "samples_removed": 0, "errors": 0}
+
+    try:
+        # Primero archivar: lo que se va a archivar no merece reducirse antes
+        cursor.execute(_CANDIDATES_QUERY.format(condition="""(
+            pr.performance_id IS NULL OR pr.tier = 'downsampled'
+            OR (pr.tier = 'restored' AND pr.restored_at < DATE_SUB(NOW(), INTERVAL %s DAY))
+        )"""), (archive_days, RESTORE_HOLD_DAYS, batch_size))
+        for performance in cursor.fetchall():
+            try:
+                archive_performance(cursor, performance)
+                connection.commit()
+                report["archived"] += 1
+            except Exception:
+                connection.rollback()
+                report["errors"] += 1
+                logger.exception("Error archivando performance %s", performance['id'])
+
+        cursor.execute(_CANDIDATES_QUERY.format(condition="pr.performance_id IS NULL"),
+                       (downsample_days, batch_size))
+        for performance in cursor.fetchall():
+            try:
+                result = downsample_performance(cursor, performance, target_fps)
+                connection.commit()
+                report["downsampled"] += 1
+                report["samples_removed"] += result["original"] - result["kept"]
+            except Exception:
+                connection.rollback()
+                report["errors"] += 1
+                logger.exception("Error reduciendo performance %s", performance['id'])
+    finally:
+        cursor.close()
+
+    return report
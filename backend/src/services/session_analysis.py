@@ -0,0 +1,158 @@
+"""
+Análisis posterior a la sesión: segmentación de repeticiones y re-puntuación
+"""
+from typing import Optional, Dict, List, Any
+
+from .angle_store import load_series
+from .job_queue import job_handler
+
+# Articulación principal usada para segmentar repeticiones por ejercicio
+PRIMARY_JOINTS = {
+    "squat": "leftKnee",
+    "sentadilla": "leftKnee",
+    "pushup": "leftElbow",
+    "flexion": "leftElbow",
+    "plank": "spine",
+}
+DEFAULT_JOINT = "leftKnee"
+
+# =====================================
+# SEGMENTACIÓN DE REPETICIONES
+# =====================================
+
+def primary_joint(exercise_name: Optional[str]) -> str:
+    """Articulación que marca las repeticiones de un ejercicio"""
+    return PRIMARY_JOINTS.get((exercise_name or "").lower(), DEFAULT_JOINT)
+
+def segment_reps(times: List[int], values: List[Optional[float]],
+                 low_ratio: float = 0.3, high_ratio: float = 0.7) -> List[Dict[str, Any]]:
+    """Detectar repeticiones por histéresis sobre la serie de un ángulo
+
+    Una repetición empieza arriba (ángulo > umbral alto), baja por debajo
+    del umbral bajo y vuelve a subir. Devuelve inicio, fondo y fin de cada
+    repetición como índices y tiempos en ms.
+    """
+    present = [v for v in values if v is not None]
+    if len(present) < 3:
+        return []
+
+    lowest, highest = min(present), max(present)
+    span = highest - lowest
+    if span < 10:
+        return []
+    low = lowest + span * low_ratio
+    high = lowest + span * high_ratio
+
+    reps = []
+    top_index: Optional[int] = None
+    bottom_index: Optional[int] = None
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        if bottom_index is None:
+            if value >= high:
+                top_index = i
+            elif value <= low and top_index is not None:
+                bottom_index = i
+        else:
+            if value < values[bottom_index]:
+                bottom_index = i
+            elif value >= high:
+                reps.append({
+                    "start_index": top_index,
+                    "bottom_index": bottom_index,
+                    "end_index": i,
+                    "start_ms": times[top_index],
+                    "bottom_ms": times[bottom_index],
+                    "end_ms": times[i],
+                    "depth": values[bottom_index]
+                })
+                top_index = i
+                bottom_index = None
+
+    return reps
+
+def rep_boundaries(reps: List[Dict[str, Any]]) -> List[int]:
+    """Índices de frames que delimitan repeticiones (inicio, fondo y fin)"""
+    indices = set()
+    for rep in reps:
+        indices.update((rep["start_index"], rep["bottom_index"], rep["end_index"]))
+    return sorted(indices)
+
+# =====================================
+# ANÁLISIS DE PERFORMANCE
+# =====================================
+
+def _consistency_score(depths: List[float]) -> float:
+    """100 si todas las repeticiones tienen la misma profundidad"""
+    if len(depths) < 2:
+        return 100.0
+    mean = sum(depths) / len(depths)
+    variance = sum((d - mean) ** 2 for d in depths) / len(depths)
+    return max(0.0, round(100.0 - variance ** 0.5 * 2, 1))
+
+def analyze_performance(cursor, performance_id: int) -> Dict[str, Any]:
+    """Segmentar repeticiones y calcular métricas por repetición de una performance"""
+    cursor.execute("""
+    SELECT ep.id, ep.technique_score, et.name as exercise_name
+    FROM exercise_performances ep
+    JOIN exercise_types et ON ep.exercise_type_id = et.id
+    WHERE ep.id = %s
+    """, (performance_id,))
+    performance = cursor.fetchone()
+    if not performance:
+        raise ValueError(f"Performance {performance_id} no encontrada")
+
+    joint = primary_joint(performance["exercise_name"])
+    times, series = load_series(cursor, performance_id, joints=[joint])
+    values = series.get(joint, [])
+    reps = segment_reps(times, values)
+
+    depths = [rep["depth"] for rep in reps]
+    durations = [(rep["end_ms"] - rep["start_ms"]) / 1000 for rep in reps]
+
+    return {
+        "performance_id": performance_id,
+        "exercise_type": performance["exercise_name"],
+        "joint": joint,
+        "rep_count": len(reps),
+        "reps": [
+            {
+                "start_ms": rep["start_ms"],
+                "bottom_ms": rep["bottom_ms"],
+                "end_ms": rep["end_ms"],
+                "depth": rep["depth"]
+            }
+            for rep in reps
+        ],
+        "avg_depth": round(sum(depths) / len(depths), 1) if depths else None,
+        "avg_rep_seconds": round(sum(durations) / len(durations), 2) if durations else None,
+        "consistency_score": _consistency_score(depths),
+        "technique_score": performance["technique_score"]
+    }
+
+# =====================================
+# TRABAJO ASÍNCRONO
+# =====================================
+
+@job_handler("session_analysis")
+def run_session_analysis(connection, job: Dict[str, Any]) -> Dict[str, Any]:
+    """Manejador de la cola: analizar la performance, guardar el número real de
+    repeticiones y calcular la cinemática (velocidad y simetría)
+
+    No confirma: `run_job` guarda todo junto con el resultado del trabajo.
+    """
+    from .kinematics import analyze_kinematics   # importa numpy y este módulo
+
+    cursor = connection.cursor(dictionary=True)
+    try:
+        result = analyze_performance(cursor, job["payload"]["performance_id"])
+        if result["rep_count"]:
+            cursor.execute(
+                "UPDATE exercise_performances SET repetitions = %s WHERE id = %s",
+                (result["rep_count"], result["performance_id"])
+            )
+        result.update(analyze_kinematics(cursor, result["performance_id"], result["exercise_type"]))
+        return result
+    finally:
+        cursor.close()
@@ -0,0 +1,231 @@
+"""
+Escritura de sesiones de entrenamiento
+
+Punto único de guardado compartido por la API en vivo y por el
+pipeline de vídeo, para que ambos pasen por el mismo almacenamiento
+y el mismo análisis posterior.
+"""
+import json
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from .angle_store import store_angle_history
+from .job_queue import enqueue_job, cancel_session_jobs
+from .keyframes import ANGLE_TOLERANCE, sample_angle_history, record_sampling
+from .leaderboards import record_session, remove_session
+from .progress_stats import record_performance, check_consistency
+from .user_versions import record_session_change
+from ..models.workout_models import WorkoutSessionCreateWithPose
+
+def get_or_create_exercise_type(cursor, exercise_name: str) -> int:
+    """Obtener o crear tipo de ejercicio"""
+    cursor.execute("SELECT id FROM exercise_types WHERE name = %s", (exercise_name,))
+    result = cursor.fetchone()
+    
+    if result:
+        return result['id']
+    
+    insert_query = """
+    INSERT INTO exercise_types (name, description, category, difficulty_level)
+    VALUES (%s, %s, %s, %s)
+    """
+    
+    cursor.execute(insert_query, (
+        exercise_name,
+        f"Ejercicio {exercise_name} - análisis con IA",
+        "strength",
+        "beginner"
+    ))
+    
+    return cursor.lastrowid
+
+def save_workout_session(cursor, user_id: int,
+                         session_data: WorkoutSessionCreateWithPose) -> Dict[str, Any]:
+    """Insertar sesión, performance e historial de ángulos y encolar el análisis
+
+    No hace commit: la transacción la confirma el llamador, que después
+    puede aplicar `leaderboard_updates` a los rankings en memoria.
+    """
+    # 1. Crear sesión principal
+    session_query = """
+    INSERT INTO workout_sessions (
+        user_id, session_name, start_time, end_time, 
+        duration_minutes, average_score, notes
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """
+    
+    start_time = datetime.now()
+    end_time = start_time
+    duration_minutes = session_data.duration_seconds / 60
+    
+    cursor.execute(session_query, (
+        user_id,
+        f"Sesión {session_data.exercise_type}",
+        start_time,
+        end_time,
+        duration_minutes,
+        session_data.technique_score,
+        session_data.session_notes or ""
+    ))
+    
+    session_id = cursor.lastrowid
+    
+    # 2. Buscar o crear tipo de ejercicio
+    exercise_type_id = get_or_create_exercise_type(cursor, session_data.exercise_type)
+    
+    # 3. Crear registro de performance con datos de pose
+    performance_query = """
+    INSERT INTO exercise_performances (
+        session_id, exercise_type_id, user_id, set_number,
+        repetitions, technique_score, avg_knee_angle, avg_hip_angle,
+        avg_shoulder_angle, avg_elbow_angle, movement_speed,
+        stability_score, symmetry_score, pose_data,
+        angle_history, feedback
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    
+    angles = session_data.avg_angles
+    
+    # Solo se guardan keyframes (error de interpolación <= KEYFRAME_TOLERANCE_DEG).
+    # Si el cliente ya los seleccionó no se vuelve a muestrear: el error se sumaría
+    if session_data.keyframe_tolerance is not None:
+        angle_history = session_data.angle_history or []
+        sampling_tolerance = session_data.keyframe_tolerance
+        original_samples = session_data.original_samples or len(angle_history)
+    else:
+        angle_history = sample_angle_history(
+            session_data.angle_history or [], session_data.exercise_type
+        )
+        sampling_tolerance = ANGLE_TOLERANCE
+        original_samples = len(session_data.angle_history or [])
+    
+    cursor.execute(performance_query, (
+        session_id,
+        exercise_type_id,
+        user_id,
+        1,  # set_number
+        session_data.total_frames,
+        session_data.technique_score,
+        angles.get('leftKnee'),
+        angles.get('leftHip'),
+        angles.get('leftShoulder'),
+        angles.get('leftElbow'),
+        None,   # movement_speed: lo calcula el análisis posterior
+        session_data.accuracy_percentage,
+        100.0,  # symmetry_score: ídem
+        session_data.pose_data,
+        json.dumps(angle_history),
+        json.dumps(session_data.feedback or [])
+    ))
+    
+    performance_id = cursor.lastrowid
+    
+    # World landmarks en binario para la cinemática 3D del análisis posterior
+    # (numpy se importa en el primer guardado, no al arrancar)
+    if session_data.world_landmarks:
+        from .kinematics import pack_frames
+        cursor.execute(
+            "INSERT INTO performance_kinematics (performance_id, frames) VALUES (%s, %s)",
+            (performance_id, pack_frames(session_data.world_landmarks))
+        )
+    
+    # 4. Guardar historial de ángulos en el almacén de series temporales
+    store_angle_history(
+        cursor,
+        performance_id,
+        user_id,
+        start_time,
+        angle_history
+    )
+    record_sampling(cursor, performance_id, sampling_tolerance, original_samples, len(angle_history))
+    
+    # 5. Encolar el análisis posterior (se procesa fuera de la petición)
+    job_id = enqueue_job(
+        cursor,
+        "session_analysis",
+        user_id,
+        {"performance_id": performance_id},
+        session_id=session_id
+    )
+    
+    # 6. Actualizar rankings
+    leaderboard_updates = record_session(
+        cursor, user_id, session_data.exercise_type, session_data.technique_score, start_time
+    )
+    
+    # 7. Estadísticas de progreso incrementales
+    record_performance(cursor, user_id, exercise_type_id, {
+        "technique_score": session_data.technique_score,
+        "knee_angle": angles.get('leftKnee'),
+        "hip_angle": angles.get('leftHip'),
+        "shoulder_angle": angles.get('leftShoulder'),
+        "elbow_angle": angles.get('leftElbow')
+    }, start_time)
+    
+    # 8. Nueva versión de datos del usuario (invalida sus respuestas cacheadas y
+    #    marca la sesión para la sincronización incremental)
+    record_session_change(cursor, user_id, session_id)
+    
+    return {
+        "session_id": session_id,
+        "performance_id": performance_id,
+        "analysis_job_id": job_id,
+        "leaderboard_updates": leaderboard_updates
+    }
+
+# Tablas auxiliares con datos por performance
+_PERFORMANCE_TABLES = (
+    "angle_sample_chunks", "performance_kinematics", "performance_keyframes", "pose_retention"
+)
+
+def delete_workout_session(cursor, user_id: int, session_id: int) -> Optional[Dict[str, Any]]:
+    """Borrar una sesión del usuario con sus performances y dejar su tombstone
+
+    En la misma transacción se borran sus trabajos de análisis y se
+    recalculan las estadísticas de progreso y las filas de ranking del
+    usuario. Devuelve las rutas de archivo de pose huérfanas
+    (`archive_paths`, el llamador las borra tras el commit) y los
+    ejercicios cuyos tableros hay que refrescar (`exercise_types`), o None
+    si la sesión no existe.
+    """
+    cursor.execute(
+        "SELECT id, start_time FROM workout_sessions WHERE id = %s AND user_id = %s FOR UPDATE",
+        (session_id, user_id)
+    )
+    session = cursor.fetchone()
+    if session is None:
+        return None
+
+    cursor.execute("""
+    SELECT ep.id, et.name AS exercise_name
+    FROM exercise_performances ep
+    JOIN exercise_types et ON ep.exercise_type_id = et.id
+    WHERE ep.session_id = %s
+    """, (session_id,))
+    performances = cursor.fetchall()
+    performance_ids = [row['id'] for row in performances]
+    exercise_types = sorted({row['exercise_name'] for row in performances})
+
+    archive_paths = []
+    if performance_ids:
+        placeholders = ", ".join(["%s"] * len(performance_ids))
+        cursor.execute(
+            f"SELECT archive_path FROM pose_retention WHERE performance_id IN ({placeholders}) "
+            "AND archive_path IS NOT NULL",
+            tuple(performance_ids)
+        )
+        archive_paths = [row['archive_path'] for row in cursor.fetchall()]
+        for table in _PERFORMANCE_TABLES:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE performance_id IN ({placeholders})",
+                tuple(performance_ids)
+            )
+        cursor.execute("DELETE FROM exercise_performances WHERE session_id = %s", (session_id,))
+    cancel_session_jobs(cursor, session_id)
+    cursor.execute("DELETE FROM workout_sessions WHERE id = %s", (session_id,))
+
+    for exercise_type in exercise_types:
+        remove_session(cursor, user_id, exercise_type, session['start_time'])
+    check_consistency(cursor, user_id, fix=True)
+    record_session_change(cursor, user_id, session_id, deleted=True)
+    return {"archive_paths": archive_paths, "exercise_types": exercise_types}
@@ -0,0 +1,61 @@
+"""
+Versión de datos por usuario
+
+Contador monótono que se incrementa en la misma transacción que cualquier
+escritura de datos del usuario. Sirve como clave de invalidación exacta
+de cachés en todos los workers: leerlo es una consulta por clave primaria.
+
+También es el token de sincronización incremental: `session_changes`
+guarda por sesión la versión de su último cambio (y si se borró), así que
+"qué cambió desde la versión N" es un rango sobre (user_id, version).
+"""
+from datetime import datetime
+from typing import Dict, List, Any
+
+def bump_user_version(cursor, user_id: int) -> int:
+    """Incrementar la versión del usuario (visible al confirmar la transacción)
+
+    La fila queda bloqueada hasta el commit, así que las versiones de un
+    mismo usuario se confirman en orden.
+    """
+    cursor.execute("""
+    INSERT INTO user_data_versions (user_id, version) VALUES (%s, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1
+    """, (user_id,))
+    return get_user_version(cursor, user_id)
+
+def get_user_version(cursor, user_id: int) -> int:
+    """Versión actual de los datos del usuario (0 si nunca escribió)"""
+    cursor.execute("SELECT version FROM user_data_versions WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return 0
+    return row["version"] if isinstance(row, dict) else row[0]
+
+# =====================================
+# CAMBIOS POR SESIÓN
+# =====================================
+
+def record_session_change(cursor, user_id: int, session_id: int, deleted: bool = False) -> int:
+    """Nueva versión del usuario y marca de la sesión cambiada (o borrada)"""
+    version = bump_user_version(cursor, user_id)
+    cursor.execute("""
+    INSERT INTO session_changes (user_id, session_id, version, deleted, changed_at)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE version = VALUES(version), deleted = VALUES(deleted),
+        changed_at = VALUES(changed_at)
+    """, (user_id, session_id, version, deleted, datetime.now()))
+    return version
+
+def get_session_changes(cursor, user_id: int, since: int, limit: int) -> List[Dict[str, Any]]:
+    """Sesiones cambiadas después de la versión `since`, de la más antigua a la más reciente"""
+    cursor.execute("""
+    SELECT session_id, version, deleted FROM session_changes
+    WHERE user_id = %s AND version > %s
+    ORDER BY version
+    LIMIT %s
+    """, (user_id, since, limit))
+    return [
+        row if isinstance(row, dict) else {"session_id": row[0], "version": row[1], "deleted": row[2]}
+        for row in cursor.fetchall()
+    ]
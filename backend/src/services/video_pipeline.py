@@ -0,0 +1,301 @@
+"""
+Pipeline de análisis de vídeo grabado (workers de CPU)
+
+Decodifica el vídeo con OpenCV saltando frames hasta la tasa objetivo,
+estima la pose con MediaPipe por lotes y convierte los resultados en
+una sesión idéntica a las del análisis en vivo del navegador (mismos
+ángulos, misma puntuación y mismo guardado).
+
+OpenCV y MediaPipe solo se necesitan en los workers:
+    pip install -r requirements-worker.txt
+"""
+import math
+import os
+import time
+from typing import Optional, Dict, List, Any, Callable, Iterator, Tuple
+
+from .fatigue import FatigueDetector
+from . import leaderboards
+from .job_queue import job_handler, after_commit, update_progress, PermanentJobError
+from .kinematics import select_world_landmarks
+from .session_store import save_workout_session
+from ..models.workout_models import WorkoutSessionCreateWithPose
+
+TARGET_FPS = float(os.getenv("VIDEO_TARGET_FPS", "10"))
+BATCH_SIZE = int(os.getenv("VIDEO_BATCH_SIZE", "16"))
+MODEL_COMPLEXITY = int(os.getenv("VIDEO_MODEL_COMPLEXITY", "1"))
+MIN_VISIBILITY = 0.5
+GOOD_FRAME_SCORE = 70
+
+# Índices de landmarks de MediaPipe Pose (igual que PoseDetector.js)
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+# =====================================
+# ÁNGULOS Y PUNTUACIÓN (port de PoseDetector.js / EnhancedAutoCamera.jsx)
+# =====================================
+
+def calculate_angle(p1, p2, p3) -> Optional[float]:
+    """Ángulo en p2 formado por p1-p2-p3, en grados (0-180)"""
+    if p1 is None or p2 is None or p3 is None:
+        return None
+    radians = math.atan2(p3[1] - p2[1], p3[0] - p2[0]) - math.atan2(p1[1] - p2[1], p1[0] - p2[0])
+    angle = abs(math.degrees(radians))
+    if angle > 180.0:
+        angle = 360 - angle
+    return round(angle)
+
+def calculate_spine_angle(landmarks) -> Optional[float]:
+    """Inclinación de la columna respecto a la vertical"""
+    points = [landmarks[i] for i in (LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP)]
+    if any(p is None for p in points):
+        return None
+    shoulder_mid = ((points[0][0] + points[1][0]) / 2, (points[0][1] + points[1][1]) / 2)
+    hip_mid = ((points[2][0] + points[3][0]) / 2, (points[2][1] + points[3][1]) / 2)
+    angle = math.degrees(math.atan2(shoulder_mid[0] - hip_mid[0], shoulder_mid[1] - hip_mid[1]))
+    return round(abs(angle))
+
+def calculate_angles(landmarks) -> Dict[str, Optional[float]]:
+    """Ángulos de `calculateAngles` del frontend, más la cadera izquierda"""
+    lm = landmarks
+    return {
+        "leftElbow": calculate_angle(lm[LEFT_SHOULDER], lm[LEFT_ELBOW], lm[LEFT_WRIST]),
+        "rightElbow": calculate_angle(lm[RIGHT_SHOULDER], lm[RIGHT_ELBOW], lm[RIGHT_WRIST]),
+        "leftKnee": calculate_angle(lm[LEFT_HIP], lm[LEFT_KNEE], lm[LEFT_ANKLE]),
+        "rightKnee": calculate_angle(lm[RIGHT_HIP], lm[RIGHT_KNEE], lm[RIGHT_ANKLE]),
+        "leftShoulder": calculate_angle(lm[LEFT_ELBOW], lm[LEFT_SHOULDER], lm[LEFT_HIP]),
+        "rightShoulder": calculate_angle(lm[RIGHT_ELBOW], lm[RIGHT_SHOULDER], lm[RIGHT_HIP]),
+        "leftHip": calculate_angle(lm[LEFT_SHOULDER], lm[LEFT_HIP], lm[LEFT_KNEE]),
+        "spine": calculate_spine_angle(lm)
+    }
+
+def score_pose(angles: Dict[str, Optional[float]], exercise: str) -> int:
+    """Misma puntuación por frame que `calculatePoseScore` del frontend"""
+    score = 100
+    spine = angles.get("spine") or 0
+
+    if exercise == "squat":
+        left, right = angles.get("leftKnee"), angles.get("rightKnee")
+        if left and right:
+            if (left + right) / 2 > 120:
+                score -= 15
+            if abs(left - right) > 20:
+                score -= 10
+        if spine > 20:
+            score -= 15
+    elif exercise == "pushup":
+        left, right = angles.get("leftElbow"), angles.get("rightElbow")
+        if left and right and (left + right) / 2 > 120:
+            score -= 15
+        if spine > 15:
+            score -= 20
+    elif spine > 20:
+        score -= 10
+
+    return max(0, min(100, round(score)))
+
+# =====================================
+# DECODIFICACIÓN Y POSE
+# =====================================
+
+def iter_frame_batches(path: str, target_fps: float = TARGET_FPS,
+                       batch_size: int = BATCH_SIZE) -> Iterator[Tuple[List[Tuple[int, Any]], float]]:
+    """Leer el vídeo saltando frames hasta `target_fps`; produce (lote, fracción leída)
+
+    Los frames descartados solo se avanzan con `grab()`, sin decodificar
+    la imagen completa.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError("No se pudo abrir el vídeo")
+
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+        stride = max(1, int(round(fps / target_fps)))
+
+        batch: List[Tuple[int, Any]] = []
+        index = 0
+        while True:
+            if index % stride:
+                if not capture.grab():
+                    break
+                index += 1
+                continue
+
+            ok, frame = capture.read()
+            if not ok:
+                break
+            t_ms = int(index * 1000 / fps)
+            batch.append((t_ms, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+            index += 1
+
+            if len(batch) >= batch_size:
+                yield batch, min(index / total, 1.0)
+                batch = []
+
+        if batch:
+            yield batch, 1.0
+    finally:
+        capture.release()
+
+class PoseEstimator:
+    """Envoltorio de MediaPipe Pose en modo vídeo (mantiene el tracking entre frames)"""
+
+    def __init__(self, model_complexity: int = MODEL_COMPLEXITY):
+        import mediapipe as mp
+        self._pose = mp.solutions.pose.Pose(
+            static_image_mode=False,
+            model_complexity=model_complexity,
+            smooth_landmarks=True,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+
+    def process_batch(self, frames: List[Any]) -> List[Optional[Dict[str, Any]]]:
+        """Landmarks 2D y 3D (world) por frame, o None si no hay pose"""
+        results = []
+        for frame in frames:
+            output = self._pose.process(frame)
+            if not output.pose_landmarks:
+                results.append(None)
+                continue
+            points = output.pose_landmarks.landmark
+            world = output.pose_world_landmarks.landmark if output.pose_world_landmarks else None
+            results.append({
+                "landmarks": [
+                    (p.x, p.y) if p.visibility >= MIN_VISIBILITY else None for p in points
+                ],
+                "world_landmarks": [(p.x, p.y, p.z) for p in world] if world else None,
+                "confidence": sum(p.visibility for p in points) / len(points)
+            })
+        return results
+
+    def close(self) -> None:
+        self._pose.close()
+
+# =====================================
+# PIPELINE
+# =====================================
+
+def analyze_video(path: str, exercise_type: str,
+                  progress: Optional[Callable[[float], None]] = None,
+                  target_fps: float = TARGET_FPS,
+                  batch_size: int = BATCH_SIZE) -> WorkoutSessionCreateWithPose:
+    """Procesar un vídeo y devolver la sesión en el mismo formato que envía el frontend"""
+    estimator = PoseEstimator()
+    detector = FatigueDetector(exercise_type)
+    angle_history: List[Dict[str, Any]] = []
+    world_landmarks: List[Dict[str, Any]] = []
+    feedback: List[str] = []
+    scores: List[int] = []
+    last_t_ms = 0
+
+    try:
+        for batch, fraction in iter_frame_batches(path, target_fps, batch_size):
+            poses = estimator.process_batch([frame for _, frame in batch])
+            for (t_ms, _), pose in zip(batch, poses):
+                last_t_ms = t_ms
+                if pose is None or pose["confidence"] <= 0.5:
+                    continue
+                angles = calculate_angles(pose["landmarks"])
+                scores.append(score_pose(angles, exercise_type))
+                angle_history.append(dict(angles, t=t_ms))
+                if pose["world_landmarks"]:
+                    world_landmarks.append({"t": t_ms, "points": select_world_landmarks(pose["world_landmarks"])})
+                feedback.extend(
+                    event["message"] for event in detector.push(t_ms, angles) if event["type"] == "fatigue"
+                )
+            if progress:
+                progress(fraction * 100)
+    finally:
+        estimator.close()
+
+    if not scores:
+        raise ValueError("No se detectó ninguna pose en el vídeo")
+
+    good_frames = sum(1 for s in scores if s >= GOOD_FRAME_SCORE)
+    avg_angles = {}
+    for joint in ("leftKnee", "leftHip", "leftShoulder", "leftElbow", "spine"):
+        values = [f[joint] for f in angle_history if f.get(joint) is not None]
+        if values:
+            avg_angles[joint] = round(sum(values) / len(values))
+
+    return WorkoutSessionCreateWithPose(
+        exercise_type=exercise_type,
+        duration_seconds=max(1, round(last_t_ms / 1000)),
+        technique_score=sum(scores) / len(scores),
+        accuracy_percentage=good_frames / len(scores) * 100,
+        total_frames=len(scores),
+        good_frames=good_frames,
+        avg_angles=avg_angles,
+        angle_history=angle_history,
+        world_landmarks=world_landmarks or None,
+        feedback=feedback,
+        session_notes=f"Análisis de vídeo con IA - {exercise_type}"
+    )
+
+# =====================================
+# TRABAJO ASÍNCRONO
+# =====================================
+
+def remove_upload(job: Dict[str, Any]) -> None:
+    """Borrar el vídeo subido cuando el trabajo ya no va a reintentarse"""
+    try:
+        os.remove(job["payload"]["path"])
+    except OSError:
+        pass
+
+@job_handler("video_analysis", cleanup=remove_upload)
+def run_video_analysis(connection, job: Dict[str, Any]) -> Dict[str, Any]:
+    """Manejador de la cola: analizar el vídeo subido y guardarlo como sesión
+
+    Idempotente por trabajo: la fila del trabajo se bloquea antes de
+    guardar y, si un intento anterior ya guardó la sesión, no se repite.
+    """
+    payload = job["payload"]
+    started = time.perf_counter()
+    last_report = [0.0]
+
+    def report(percent: float) -> None:
+        # Limitar escrituras de progreso a una cada 5 puntos
+        if percent - last_report[0] >= 5 or percent >= 100:
+            last_report[0] = percent
+            update_progress(connection, job["id"], min(percent, 99))
+
+    try:
+        session_data = analyze_video(payload["path"], payload["exercise_type"], progress=report)
+    except ValueError as e:
+        # Vídeo ilegible o sin poses: otro intento daría lo mismo
+        raise PermanentJobError(str(e)) from e
+
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT session_id FROM analysis_jobs WHERE id = %s FOR UPDATE", (job["id"],))
+        row = cursor.fetchone()
+        if row is None:
+            raise PermanentJobError("Trabajo cancelado")
+        if row["session_id"] is not None:
+            saved = {"session_id": row["session_id"], "already_saved": True}
+        else:
+            saved = save_workout_session(cursor, job["user_id"], session_data)
+            cursor.execute("UPDATE analysis_jobs SET session_id = %s WHERE id = %s",
+                           (saved["session_id"], job["id"]))
+            updates = saved.pop("leaderboard_updates")
+            after_commit(job, lambda: leaderboards.apply_updates(updates))
+    finally:
+        cursor.close()
+
+    return dict(
+        saved,
+        video_seconds=session_data.duration_seconds,
+        processing_seconds=round(time.perf_counter() - started, 2),
+        frames_analyzed=session_data.total_frames,
+        technique_score=round(session_data.technique_score, 1)
+    )
@@ -0,0 +1,167 @@
+"""
+Control de admisión: limitación por usuario y concurrencia global
+
+Middleware ASGI con coste O(1) por petición:
+- Token bucket por (usuario, clase de ruta). Si se agota, 429 + Retry-After.
+- Semáforo global para las clases costosas con espera acotada. Si no hay
+  hueco a tiempo, 503 + Retry-After.
+
+El usuario se identifica con el `sub` del token, verificando solo la
+firma (cacheada); la revocación la comprueba la dependencia de la ruta.
+Sin token válido se usa la IP del cliente. Los límites
+son por proceso: con N workers el límite efectivo por usuario es hasta N
+veces el configurado.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional, Dict, Tuple, Any
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from .security import verify_signature
+
+# Clase de ruta -> (tokens por segundo, ráfaga máxima)
+RATE_LIMITS = {
+    "ingest": (float(os.getenv("RATE_INGEST_PER_MIN", "12")) / 60, float(os.getenv("RATE_INGEST_BURST", "5"))),
+    "stats": (float(os.getenv("RATE_STATS_PER_MIN", "60")) / 60, float(os.getenv("RATE_STATS_BURST", "10"))),
+}
+EXPENSIVE_CLASSES = {"ingest", "stats"}
+MAX_EXPENSIVE_CONCURRENCY = int(os.getenv("MAX_EXPENSIVE_CONCURRENCY", "8"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+MAX_TRACKED_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "50000"))
+
+# (método, prefijo de ruta) -> clase; número fijo de reglas
+ROUTE_CLASSES = (
+    ("POST", "/api/workouts/sessions", "ingest"),
+    ("POST", "/api/workouts/videos", "ingest"),
+    ("GET", "/api/workouts/stats/", "stats"),
+    ("GET", "/api/workouts/angles/", "stats"),
+    ("GET", "/api/workouts/leaderboards/", "stats"),
+    ("GET", "/api/coach/members/stats", "stats"),
+)
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Clase de ruta de una petición, o None si no está limitada"""
+    for rule_method, prefix, route_class in ROUTE_CLASSES:
+        if method == rule_method and path.startswith(prefix):
+            return route_class
+    return None
+
+# =====================================
+# TOKEN BUCKET
+# =====================================
+
+class TokenBuckets:
+    """Buckets por clave con expulsión LRU para acotar memoria"""
+
+    def __init__(self, max_keys: int = MAX_TRACKED_CLIENTS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+
+    def take(self, key: Tuple[str, str], rate: float, burst: float) -> float:
+        """Consumir un token; devuelve 0 si se admite o los segundos hasta el siguiente token"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [burst, now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+# =====================================
+# MIDDLEWARE
+# =====================================
+
+_counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"admitted": 0, "throttled": 0, "shed": 0})
+_in_flight = {"expensive": 0}
+
+def admission_stats() -> Dict[str, Any]:
+    """Contadores exportados del control de admisión de este proceso"""
+    return {
+        "classes": {name: dict(counts) for name, counts in _counters.items()},
+        "expensive_in_flight": _in_flight["expensive"],
+        "max_expensive_concurrency": MAX_EXPENSIVE_CONCURRENCY
+    }
+
+def _client_key(scope) -> str:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    sub = verify_signature(token).get("sub")
+                except HTTPException:
+                    sub = None
+                if sub is not None:
+                    return f"user:{sub}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+class AdmissionControlMiddleware:
+    """Middleware ASGI de limitación y descarte de carga"""
+
+    def __init__(self, app):
+        self.app = app
+        self.buckets = TokenBuckets()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        counters = _counters[route_class]
+        rate, burst = RATE_LIMITS[route_class]
+        wait = self.buckets.take((_client_key(scope), route_class), rate, burst)
+        if wait:
+            counters["throttled"] += 1
+            await _reject(429, "Demasiadas peticiones, inténtalo más tarde", wait)(scope, receive, send)
+            return
+
+        if route_class not in EXPENSIVE_CLASSES:
+            counters["admitted"] += 1
+            await self.app(scope, receive, send)
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(MAX_EXPENSIVE_CONCURRENCY)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            counters["shed"] += 1
+            await _reject(503, "Servidor ocupado, inténtalo más tarde", QUEUE_TIMEOUT_SECONDS)(scope, receive, send)
+            return
+
+        counters["admitted"] += 1
+        _in_flight["expensive"] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _in_flight["expensive"] -= 1
+            self._semaphore.release()
@@ -0,0 +1,13 @@
+"""
+Carga única de variables de entorno
+"""
+from dotenv import load_dotenv
+
+_loaded = False
+
+def load_environment() -> None:
+    """Cargar el fichero .env una sola vez por proceso"""
+    global _loaded
+    if not _loaded:
+        load_dotenv()
+        _loaded = True
@@ -0,0 +1,131 @@
+"""
+Ciclo de vida de cada worker: calentamiento, readiness y drenado
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import tempfile
+import time
+from typing import Callable, Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+# Directorio compartido donde cada worker publica su estado
+RUN_DIR = os.getenv("RUN_DIR", os.path.join(tempfile.gettempdir(), "gymform-workers"))
+
+STATE_STARTING = "starting"
+STATE_READY = "ready"
+STATE_DRAINING = "draining"
+
+_warmup_hooks: List[Callable[[], Any]] = []
+_state: Dict[str, Any] = {
+    "pid": os.getpid(),
+    "host": socket.gethostname(),
+    "state": STATE_STARTING,
+    "started_at": time.time(),
+    "ready_at": None,
+    "warmup": {}
+}
+
+def register_warmup(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Registrar una función que se ejecuta antes de aceptar tráfico (usable como decorador)"""
+    _warmup_hooks.append(func)
+    return func
+
+def _state_file() -> str:
+    return os.path.join(RUN_DIR, f"worker-{os.getpid()}.json")
+
+def _publish() -> None:
+    """Escribir el estado del worker para que otros procesos lo lean"""
+    try:
+        os.makedirs(RUN_DIR, exist_ok=True)
+        tmp_path = _state_file() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(_state, f)
+        os.replace(tmp_path, _state_file())
+    except OSError as e:
+        logger.warning("No se pudo publicar el estado del worker: %s", e)
+
+def warm_up() -> Dict[str, Any]:
+    """Ejecutar los hooks de calentamiento y marcar el worker como listo
+
+    Un hook que falla no bloquea el arranque: se registra el error y el
+    worker arranca en frío para esa parte.
+    """
+    _state.update(pid=os.getpid(), state=STATE_STARTING, started_at=time.time())
+    _publish()
+
+    for hook in _warmup_hooks:
+        start = time.perf_counter()
+        try:
+            hook()
+            outcome = "ok"
+        except Exception as e:
+            outcome = f"error: {e}"
+        _state["warmup"][hook.__name__] = {
+            "result": outcome,
+            "ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+
+    _state.update(state=STATE_READY, ready_at=time.time())
+    _publish()
+    return worker_state()
+
+def mark_draining() -> None:
+    """Marcar el worker como drenando (deja de reportarse listo)"""
+    _state["state"] = STATE_DRAINING
+    _publish()
+
+def install_drain_handler() -> None:
+    """Marcar el worker como drenando en cuanto llega SIGTERM
+
+    Se llama desde el arranque del lifespan: uvicorn ya instaló sus
+    manejadores al empezar a servir (antes se sobrescribirían) y el
+    nuestro encadena al que hubiera, que sigue iniciando el cierre.
+    """
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        mark_draining()
+        if callable(previous):
+            previous(signum, frame)
+        elif previous == signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    try:
+        signal.signal(signal.SIGTERM, handle_term)
+    except ValueError:
+        # Fuera del hilo principal (p. ej. TestClient): no hay señales que atender
+        logger.debug("Manejador de SIGTERM no instalado: no es el hilo principal")
+
+def shutdown() -> None:
+    """Eliminar el fichero de estado del worker al terminar"""
+    try:
+        os.remove(_state_file())
+    except OSError:
+        pass
+
+def is_ready() -> bool:
+    return _state["state"] == STATE_READY
+
+def worker_state() -> Dict[str, Any]:
+    """Estado de este worker"""
+    return dict(_state)
+
+def all_worker_states() -> List[Dict[str, Any]]:
+    """Estado publicado por todos los workers de esta máquina"""
+    states = []
+    if not os.path.isdir(RUN_DIR):
+        return states
+    for name in sorted(os.listdir(RUN_DIR)):
+        if not (name.startswith("worker-") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(RUN_DIR, name)) as f:
+                states.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return states
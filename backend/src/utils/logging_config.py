@@ -0,0 +1,299 @@
+"""
+Logging estructurado y no bloqueante
+
+Los módulos usan `logging.getLogger(__name__)`. `setup_logging()` deja un
+único handler en el root: un QueueHandler que solo encola el registro
+(coste O(1), nunca hace E/S en el hilo de la petición) y un QueueListener
+que formatea y escribe en un hilo de fondo.
+
+- Formato: JSON por línea (LOG_FORMAT=json) o texto para consola.
+- Niveles por módulo: LOG_LEVELS="src.services.retention=DEBUG,sqlalchemy.engine=INFO"
+- Muestreo de rutas calientes: LOG_SAMPLE="gymform.access=0.1" (valor por
+  defecto; vacío desactiva el muestreo); solo afecta a DEBUG/INFO, los
+  avisos y errores se escriben siempre.
+- Los parámetros con credenciales (token=...) de las URL que registran
+  uvicorn/gunicorn se ocultan antes de encolar.
+- Correlación: RequestContextMiddleware asigna un request id (cabecera
+  X-Request-ID o uno nuevo) que se añade a todos los registros de la petición.
+
+La cola es acotada (LOG_QUEUE_SIZE): si el escritor no da abasto se
+descartan registros y se cuentan en `logging_stats()`.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# El log de acceso es una línea por petición: por defecto se guarda el 10% de los INFO
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "gymform.access=0.1")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+REQUEST_ID_HEADER = "X-Request-ID"
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Atributos estándar de LogRecord; el resto llega por `extra` y se exporta
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_stats = {"dropped": 0}
+_state: Dict[str, Any] = {"pid": None, "handler": None, "listener": None, "json": True}
+
+def _parse_pairs(spec: str) -> Dict[str, str]:
+    pairs = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+# =====================================
+# FORMATO
+# =====================================
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por registro con los campos de `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Formato legible para desarrollo y comandos de administración"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        if getattr(record, "request_id", None):
+            line += f" [{record.request_id}]"
+        return line
+
+# =====================================
+# COLA
+# =====================================
+
+class ContextFilter(logging.Filter):
+    """Copiar el request id del contexto al registro (en el hilo que registra)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Dejar pasar solo una fracción de los DEBUG/INFO de los loggers configurados"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            # Prefijo más largo que coincide (igual que la jerarquía de logging)
+            rate = 1.0
+            for prefix in sorted(self.rates, key=len, reverse=True):
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = self.rates[prefix]
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+_SECRET_PARAMS = re.compile(r"((?:access_)?token=)[^&\s\"']+", re.IGNORECASE)
+
+class RedactFilter(logging.Filter):
+    """Ocultar tokens en las URL de los logs del servidor (p. ej. WebSocket ?token=)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                _SECRET_PARAMS.sub(r"\1***", arg) if isinstance(arg, str) else arg
+                for arg in record.args
+            )
+        elif isinstance(record.msg, str):
+            record.msg = _SECRET_PARAMS.sub(r"\1***", record.msg)
+        return True
+
+_redact_filter = RedactFilter()
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que no formatea ni espera: el trabajo caro va al listener"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolver args y traza aquí (pueden dejar de ser válidos), formatear después
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _stats["dropped"] += 1
+
+def _start_listener() -> None:
+    """Cola y escritor nuevos para este proceso"""
+    handler = _state["handler"]
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if _state["json"] else TextFormatter())
+    handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=False)
+    listener.start()
+    _state.update(pid=os.getpid(), listener=listener)
+
+def _after_fork() -> None:
+    # El hilo escritor no sobrevive al fork (gunicorn con preload, multiprocessing)
+    if _state["handler"] is not None:
+        _start_listener()
+
+def stop_logging() -> None:
+    """Vaciar la cola y parar el escritor (al salir del proceso)"""
+    listener = _state["listener"]
+    if listener is not None and _state["pid"] == os.getpid():
+        listener.stop()
+        _state["listener"] = None
+
+# =====================================
+# CONFIGURACIÓN
+# =====================================
+
+def setup_logging(fmt: Optional[str] = None) -> None:
+    """Configurar el logging del proceso; llamadas repetidas no hacen nada"""
+    if _state["handler"] is not None:
+        return
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_pairs(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    rates = {name: float(rate) for name, rate in _parse_pairs(LOG_SAMPLE).items()}
+    handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    handler.addFilter(SamplingFilter(rates))
+    handler.addFilter(ContextFilter())
+    root.addHandler(handler)
+
+    route_server_loggers()
+    _state.update(handler=handler, json=(fmt or LOG_FORMAT) == "json")
+    _start_listener()
+    os.register_at_fork(after_in_child=_after_fork)
+    atexit.register(stop_logging)
+
+def route_server_loggers() -> None:
+    """Hacer que los loggers de uvicorn/gunicorn pasen por la misma cola
+
+    El worker de uvicorn para gunicorn les asigna sus propios handlers al
+    crearse; gunicorn.conf.py vuelve a llamar a esta función en post_worker_init.
+    """
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access", "gunicorn.error"):
+        logger = logging.getLogger(name)
+        logger.handlers.clear()
+        logger.propagate = True
+        if _redact_filter not in logger.filters:
+            logger.addFilter(_redact_filter)
+    # El log de acceso lo escribe RequestContextMiddleware (con request id y muestreo)
+    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+
+def logging_stats() -> Dict[str, Any]:
+    """Estado de la cola de logs de este proceso"""
+    handler = _state["handler"]
+    return {
+        "queued": handler.queue.qsize() if handler is not None else 0,
+        "dropped": _stats["dropped"]
+    }
+
+# =====================================
+# MIDDLEWARE
+# =====================================
+
+access_logger = logging.getLogger("gymform.access")
+
+class RequestContextMiddleware:
+    """Middleware ASGI: request id por petición y log de acceso estructurado"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        if scope["type"] == "websocket":
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                request_id_var.reset(token)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", ())) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            access_logger.log(
+                logging.ERROR if status_code >= 500 else logging.INFO,
+                "%s %s %s", scope["method"], scope["path"], status_code,
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 1)
+                }
+            )
+            request_id_var.reset(token)
@@ -0,0 +1,135 @@
+"""
+Caché de respuestas por usuario con ETag
+
+Las respuestas se guardan por (usuario, endpoint, parámetros) junto con
+la versión de datos del usuario con la que se calcularon. Si el cliente
+envía un If-None-Match con el ETag de la versión actual se responde 304
+sin calcular ni serializar nada.
+
+El backend es intercambiable con `set_backend`; por defecto es un LRU en
+memoria del proceso.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional, Dict, Any, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+
+# =====================================
+# BACKENDS
+# =====================================
+
+class CacheBackend:
+    """Interfaz mínima de un backend de caché"""
+
+    def get(self, key: str) -> Optional[Tuple[int, bytes]]:
+        raise NotImplementedError
+
+    def set(self, key: str, version: int, body: bytes) -> None:
+        raise NotImplementedError
+
+    def invalidate_user(self, user_id: int) -> None:
+        raise NotImplementedError
+
+class InMemoryCacheBackend(CacheBackend):
+    """LRU acotado en memoria con caducidad"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, int, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, version, body = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return version, body
+
+    def set(self, key, version, body):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        prefix = f"{user_id}:"
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+_backend: CacheBackend = InMemoryCacheBackend()
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "not_modified": 0, "misses": 0})
+
+def set_backend(backend: CacheBackend) -> None:
+    """Sustituir el backend de caché"""
+    global _backend
+    _backend = backend
+
+# =====================================
+# USO DESDE LOS ENDPOINTS
+# =====================================
+
+def _key(user_id: int, endpoint: str, params: Dict[str, Any]) -> str:
+    return f"{user_id}:{endpoint}:{json.dumps(params, sort_keys=True, default=str)}"
+
+def _etag(key: str, version: int) -> str:
+    digest = hashlib.sha1(f"{key}:{version}".encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def _headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def lookup(request: Request, user_id: int, endpoint: str,
+           params: Dict[str, Any], version: int) -> Optional[Response]:
+    """Respuesta 304 o cacheada para la versión actual, o None si hay que calcularla"""
+    key = _key(user_id, endpoint, params)
+    etag = _etag(key, version)
+
+    if etag in request.headers.get("if-none-match", ""):
+        _stats[endpoint]["not_modified"] += 1
+        return Response(status_code=304, headers=_headers(etag))
+
+    cached = _backend.get(key)
+    if cached is not None and cached[0] == version:
+        _stats[endpoint]["hits"] += 1
+        return Response(content=cached[1], media_type="application/json", headers=_headers(etag))
+
+    _stats[endpoint]["misses"] += 1
+    return None
+
+def store(user_id: int, endpoint: str, params: Dict[str, Any],
+          version: int, content: Any) -> Response:
+    """Serializar, guardar en caché y devolver la respuesta con su ETag"""
+    key = _key(user_id, endpoint, params)
+    body = json.dumps(jsonable_encoder(content), ensure_ascii=False).encode("utf-8")
+    _backend.set(key, version, body)
+    return Response(content=body, media_type="application/json", headers=_headers(_etag(key, version)))
+
+def invalidate_user(user_id: int) -> None:
+    """Liberar las entradas de un usuario tras una escritura (la versión ya las invalida)"""
+    _backend.invalidate_user(user_id)
+
+def cache_stats() -> Dict[str, Any]:
+    """Aciertos, 304 y fallos por endpoint con su ratio de aciertos"""
+    endpoints = {}
+    for endpoint, counts in _stats.items():
+        total = counts["hits"] + counts["not_modified"] + counts["misses"]
+        served = counts["hits"] + counts["not_modified"]
+        endpoints[endpoint] = dict(counts, hit_ratio=round(served / total, 3) if total else None)
+    return {"backend": type(_backend).__name__, "endpoints": endpoints}
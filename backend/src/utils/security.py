@@ -1,52 +1,195 @@
 """
 Utilidades de seguridad y autenticación
 """
+import logging
 import os
 import jwt
-from datetime import datetime, timedelta
-from passlib.context import CryptContext
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Callable, Dict
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import mysql.connector
-from dotenv import load_dotenv
+from mysql.connector import pooling
+from .env import load_environment
+from ..database.routing import ReplicaRouter, ReplicaEndpoint, WRITE
 
-load_dotenv()
+load_environment()
+
+logger = logging.getLogger(__name__)
 
 # Configuración de seguridad
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24 horas
 
-# Context para hashear contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Context para hashear contraseñas (se crea en el primer uso: cargar bcrypt es costoso)
+_pwd_context = None
+
+def get_pwd_context():
+    """Contexto de passlib, inicializado de forma perezosa"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 # Bearer token scheme
 security = HTTPBearer()
 
-def get_mysql_connection():
-    """Obtener conexión a MySQL"""
+# Caché de tokens verificados (LRU acotado)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+_token_cache: "OrderedDict[str, dict]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+# Estado de revocación (versiones de autenticación y tokens revocados) en
+# memoria de cada proceso: un hilo lo sincroniza con la BD cada
+# AUTH_REFRESH_SECONDS, así la verificación de un token no hace E/S
+AUTH_REFRESH_SECONDS = float(os.getenv("AUTH_REFRESH_SECONDS", "5"))
+# Margen hacia atrás de cada sincronización: cubre transacciones que se
+# confirman después de que su marca de tiempo ya quedó atrás
+AUTH_SYNC_OVERLAP_SECONDS = 60
+_auth_versions: Dict[str, int] = {}       # sub -> versión vigente
+_revoked_jtis: Dict[str, float] = {}      # jti -> expiración (epoch)
+_auth_sync_lock = threading.Lock()
+_auth_synced_at: Optional[datetime] = None   # hora de la BD de la última sincronización
+_auth_refresher: Optional[threading.Thread] = None
+
+# Usuarios con acceso a los endpoints de operación (/api/*/stats): "1,7"
+ADMIN_USER_IDS = {item.strip() for item in os.getenv("ADMIN_USER_IDS", "").split(",") if item.strip()}
+
+# Pool de conexiones por proceso (0 desactiva el pool)
+DB_POOL_SIZE = min(int(os.getenv("DB_POOL_SIZE", "10")), pooling.CNX_POOL_MAXSIZE)
+_connection_pool = None
+
+def _mysql_config():
+    return {
+        'host': os.getenv("DB_HOST", "localhost"),
+        'port': int(os.getenv("DB_PORT", "3306")),
+        'user': os.getenv("DB_USER", "root"),
+        'password': os.getenv("DB_PASSWORD", ""),
+        'database': os.getenv("DB_NAME", "gymform_analyzer"),
+        'charset': 'utf8mb4',
+        'collation': 'utf8mb4_unicode_ci',
+        'connection_timeout': int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+    }
+
+def init_connection_pool():
+    """Crear el pool de conexiones del proceso (abre DB_POOL_SIZE conexiones)"""
+    global _connection_pool
+    if _connection_pool is None and DB_POOL_SIZE > 0:
+        _connection_pool = pooling.MySQLConnectionPool(
+            pool_name=f"gymform_{os.getpid()}",
+            pool_size=DB_POOL_SIZE,
+            **_mysql_config()
+        )
+    return _connection_pool
+
+def _primary_connection():
     try:
-        config = {
-            'host': os.getenv("DB_HOST", "localhost"),
-            'port': int(os.getenv("DB_PORT", "3306")),
-            'user': os.getenv("DB_USER", "root"),
-            'password': os.getenv("DB_PASSWORD", ""),
-            'database': os.getenv("DB_NAME", "gymform_analyzer"),
-            'charset': 'utf8mb4',
-            'collation': 'utf8mb4_unicode_ci'
-        }
-        return mysql.connector.connect(**config)
+        pool = init_connection_pool()
+        if pool is not None:
+            try:
+                return pool.get_connection()
+            except mysql.connector.errors.PoolError:
+                pass
+        return mysql.connector.connect(**_mysql_config())
     except mysql.connector.Error as e:
-        print(f"❌ Error conectando a MySQL: {e}")
+        logger.error("Error conectando a MySQL: %s", e)
+        return None
+
+# =====================================
+# RÉPLICAS DE LECTURA
+# =====================================
+
+# "host[:puerto],..." con el mismo usuario y base de datos que el primario
+DB_REPLICA_HOSTS = os.getenv("DB_REPLICA_HOSTS", "")
+DB_ANALYTICS_HOSTS = os.getenv("DB_ANALYTICS_HOSTS", "")
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+DB_REPLICA_LAG_CHECK = os.getenv("DB_REPLICA_LAG_CHECK", "True").lower() == "true"
+DB_STICKY_SECONDS = float(os.getenv("DB_STICKY_SECONDS", "10"))
+
+_replica_pools = {}
+
+def _replica_endpoint(address: str) -> ReplicaEndpoint:
+    host, _, port = address.strip().partition(":")
+    config = dict(_mysql_config(), host=host, port=int(port or 3306))
+    name = f"{host}:{config['port']}"
+
+    def connect():
+        # Pool por réplica y proceso, creado en el primer uso (después del fork)
+        pool = _replica_pools.get(name)
+        if pool is None and DB_POOL_SIZE > 0:
+            pool = _replica_pools[name] = pooling.MySQLConnectionPool(
+                pool_name=f"gymform_{os.getpid()}_{len(_replica_pools)}",
+                pool_size=DB_POOL_SIZE,
+                **config
+            )
+        if pool is not None:
+            try:
+                return pool.get_connection()
+            except mysql.connector.errors.PoolError:
+                pass
+        return mysql.connector.connect(**config)
+
+    return ReplicaEndpoint(name, connect)
+
+def replica_lag(connection):
+    """Segundos de retraso de la réplica (None si no replica o la replicación está parada)"""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except mysql.connector.Error:
+            cursor.execute("SHOW SLAVE STATUS")   # MySQL < 8.0.22
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if not row:
         return None
+    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+    return float(lag) if lag is not None else None
+
+def _endpoints(spec: str):
+    return [_replica_endpoint(address) for address in spec.split(",") if address.strip()]
+
+db_router = ReplicaRouter(
+    _primary_connection,
+    replicas=_endpoints(DB_REPLICA_HOSTS),
+    analytics=_endpoints(DB_ANALYTICS_HOSTS),
+    max_lag=DB_REPLICA_MAX_LAG,
+    check_interval=DB_REPLICA_CHECK_SECONDS,
+    sticky_seconds=DB_STICKY_SECONDS,
+    lag_probe=replica_lag if DB_REPLICA_LAG_CHECK else None
+)
+
+def get_mysql_connection(query_class: str = WRITE, user_id: Optional[int] = None):
+    """Obtener conexión a MySQL
+
+    Usa el pool del proceso si está disponible; `close()` devuelve la
+    conexión al pool. Si el pool está agotado se abre una conexión directa.
+    Por defecto va al primario; las lecturas (READ/ANALYTICS de
+    src.database.routing) pueden ir a una réplica salvo que `user_id`
+    haya escrito hace poco.
+    """
+    return db_router.connection(query_class, user_id)
+
+def mark_user_write(user_id: int) -> None:
+    """Llamar tras el commit de una escritura del usuario (read-your-writes)"""
+    db_router.mark_write(user_id)
 
 def hash_password(password: str) -> str:
     """Hash de contraseña"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar contraseña"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Crear token JWT"""
@@ -56,26 +199,227 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": int(time.time()), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Verificar token JWT"""
+def create_user_token(user: dict, expires_delta: timedelta = None):
+    """Crear token con los claims mínimos del usuario para autorizar sin consultar la BD
+
+    `av` es la versión de autenticación del usuario al emitirlo: al
+    desactivar la cuenta o cambiar el perfil sube y los claims anteriores
+    dejan de valer.
+    """
+    return create_access_token(
+        data={
+            "sub": str(user["id"]),
+            "av": int(user.get("auth_version") or 0),
+            "active": bool(user["is_active"]),
+            "fitness_level": user.get("fitness_level")
+        },
+        expires_delta=expires_delta
+    )
+
+# =====================================
+# VERIFICACIÓN CON CACHÉ
+# =====================================
+
+def _epoch(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+def _apply_auth_version(user_id, version: int) -> None:
+    key = str(user_id)
+    with _auth_sync_lock:
+        if version > _auth_versions.get(key, 0):
+            _auth_versions[key] = version
+
+def _apply_revoked_jti(jti: str, expires: float) -> None:
+    with _auth_sync_lock:
+        _revoked_jtis[jti] = expires
+
+def sync_auth_state(connection) -> Dict[str, int]:
+    """Traer de la BD las versiones y revocaciones nuevas desde la última sincronización
+
+    La primera vez carga todo; después solo lo cambiado (con un margen de
+    AUTH_SYNC_OVERLAP_SECONDS). Las revocaciones expiradas se descartan.
+    """
+    global _auth_synced_at
+    cursor = connection.cursor()
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
+        cursor.execute("SELECT NOW()")
+        db_now = cursor.fetchone()[0]
+        since = _auth_synced_at - timedelta(seconds=AUTH_SYNC_OVERLAP_SECONDS) if _auth_synced_at else None
+
+        query = "SELECT user_id, version FROM user_auth_versions"
+        cursor.execute(query + (" WHERE updated_at >= %s" if since else ""), (since,) if since else ())
+        versions = cursor.fetchall()
+
+        query = "SELECT jti, expires_at FROM revoked_tokens WHERE expires_at > %s"
+        params = (datetime.utcnow(),)
+        if since:
+            query += " AND revoked_at >= %s"
+            params += (since,)
+        cursor.execute(query, params)
+        revoked = cursor.fetchall()
+    finally:
+        cursor.close()
+    connection.commit()   # cerrar la instantánea de lectura (REPEATABLE READ)
+
+    for user_id, version in versions:
+        _apply_auth_version(user_id, version)
+    for jti, expires_at in revoked:
+        _apply_revoked_jti(jti, _epoch(expires_at))
+
+    now = time.time()
+    with _auth_sync_lock:
+        for jti in [jti for jti, expires in _revoked_jtis.items() if expires <= now]:
+            del _revoked_jtis[jti]
+    _auth_synced_at = db_now
+    return {"versions": len(versions), "revoked": len(revoked)}
+
+def _refresh_auth_state(connect: Callable, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        connection = connect()
+        if connection is None:
+            continue
+        try:
+            sync_auth_state(connection)
+        except Exception as e:
+            logger.warning("Error sincronizando revocaciones de tokens: %s", e)
+        finally:
+            connection.close()
+
+def start_auth_refresher(connect: Callable, interval: float = AUTH_REFRESH_SECONDS) -> None:
+    """Cargar el estado de revocación y mantenerlo al día en un hilo de fondo
+
+    Se llama al arrancar el worker; si la carga inicial falla, el hilo la
+    completa en la siguiente sincronización.
+    """
+    global _auth_refresher
+    if _auth_refresher is not None:
+        return
+    connection = connect()
+    if connection is not None:
+        try:
+            sync_auth_state(connection)
+        except Exception as e:
+            logger.error("Error cargando revocaciones de tokens: %s", e)
+        finally:
+            connection.close()
+    _auth_refresher = threading.Thread(
+        target=_refresh_auth_state, args=(connect, interval), name="auth-refresh", daemon=True
+    )
+    _auth_refresher.start()
+
+def _is_revoked(payload: dict) -> bool:
+    """Comprobar la versión de autenticación y los tokens revocados (solo memoria)"""
+    return (payload.get("av", 0) < _auth_versions.get(str(payload["sub"]), 0)
+            or payload.get("jti") in _revoked_jtis)
+
+def verify_signature(token: str) -> dict:
+    """Claims de un JWT con firma y expiración válidas, sin comprobar revocación
+
+    Cada token se verifica criptográficamente una sola vez; las siguientes
+    peticiones lo resuelven desde el LRU hasta que expira.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    now = time.time()
+
+    with _token_cache_lock:
+        payload = _token_cache.get(key)
+        if payload is not None:
+            if payload["exp"] > now:
+                _token_cache.move_to_end(key)
+            else:
+                del _token_cache[key]
+                payload = None
+
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.PyJWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token inválido"
             )
-        return user_id
-    except jwt.PyJWTError:
+        with _token_cache_lock:
+            _token_cache[key] = payload
+            if len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return payload
+
+def decode_token(token: str) -> dict:
+    """Decodificar y validar un JWT: firma (cacheada) y revocación"""
+    payload = verify_signature(token)
+    if payload.get("sub") is None or _is_revoked(payload):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido"
         )
+    return payload
+
+def revoke_token(payload: dict) -> None:
+    """Revocar un token concreto hasta su expiración (logout)"""
+    if not payload.get("jti"):
+        return
+    connection = get_mysql_connection()
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error de conexión a base de datos"
+        )
+    expires = payload.get("exp", time.time())
+    try:
+        cursor = connection.cursor()
+        # Las revocaciones de tokens ya expirados no hacen falta
+        cursor.execute("DELETE FROM revoked_tokens WHERE expires_at <= %s", (datetime.utcnow(),))
+        cursor.execute(
+            "INSERT IGNORE INTO revoked_tokens (jti, user_id, expires_at) VALUES (%s, %s, %s)",
+            (payload["jti"], payload["sub"], datetime.utcfromtimestamp(expires))
+        )
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+    _apply_revoked_jti(payload["jti"], expires)
+
+def revoke_user_tokens(cursor, user_id) -> int:
+    """Revocar todos los tokens emitidos hasta ahora para un usuario
+
+    Sube su versión de autenticación en la transacción del llamador y
+    devuelve la nueva, para emitir tokens que sí valgan. Tras el commit el
+    llamador pasa la versión a `apply_user_revocation`; los demás procesos
+    la ven en la siguiente sincronización (AUTH_REFRESH_SECONDS).
+    """
+    cursor.execute("""
+    INSERT INTO user_auth_versions (user_id, version) VALUES (%s, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1
+    """, (user_id,))
+    cursor.execute("SELECT version FROM user_auth_versions WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    return row["version"] if isinstance(row, dict) else row[0]
+
+def apply_user_revocation(user_id, version: int) -> None:
+    """Aplicar en este proceso una versión de autenticación ya confirmada"""
+    _apply_auth_version(user_id, version)
+
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Verificar token JWT"""
+    return decode_token(credentials.credentials)["sub"]
+
+def get_token_payload(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Claims del token verificado"""
+    return decode_token(credentials.credentials)
+
+def require_admin(payload: dict = Depends(get_token_payload)):
+    """Solo usuarios de ADMIN_USER_IDS (endpoints de operación)"""
+    if str(payload["sub"]) not in ADMIN_USER_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acceso restringido a administradores"
+        )
+    return payload
 
 async def get_current_user(user_id: int = Depends(verify_token)):
     """Obtener usuario actual"""
@@ -102,6 +446,28 @@ async def get_current_user(user_id: int = Depends(verify_token)):
         cursor.close()
         connection.close()
 
+async def get_current_user_claims(payload: dict = Depends(get_token_payload)):
+    """Usuario actual a partir de los claims del token, sin E/S
+
+    Para endpoints de solo lectura. La revocación se comprueba contra el
+    estado en memoria que sincroniza `start_auth_refresher`. Los tokens
+    antiguos sin claims de usuario recurren a la consulta en base de datos.
+    """
+    if "active" not in payload:
+        return await get_current_user(payload["sub"])
+    
+    if not payload["active"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado"
+        )
+    
+    return {
+        "id": int(payload["sub"]),
+        "fitness_level": payload.get("fitness_level"),
+        "is_active": True
+    }
+
 def authenticate_user(username: str, password: str):
     """Autenticar usuario"""
     connection = get_mysql_connection()
@@ -110,10 +476,11 @@ def authenticate_user(username: str, password: str):
     
     try:
         cursor = connection.cursor(dictionary=True)
-        cursor.execute(
-            "SELECT * FROM users WHERE username = %s AND is_active = TRUE", 
-            (username,)
-        )
+        cursor.execute("""
+        SELECT u.*, COALESCE(v.version, 0) AS auth_version
+        FROM users u LEFT JOIN user_auth_versions v ON v.user_id = u.id
+        WHERE u.username = %s AND u.is_active = TRUE
+        """, (username,))
         user = cursor.fetchone()
         
         if not user:
@@ -0,0 +1,132 @@
+"""
+Pruebas del control de admisión: token bucket, clave de cliente y
+límite de concurrencia, llamando al middleware ASGI directamente
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from src.utils import admission, security
+from src.utils.admission import AdmissionControlMiddleware, TokenBuckets
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(admission.time, "monotonic", fake)
+    return fake
+
+def test_bucket_allows_burst_then_waits_for_refill(clock):
+    buckets = TokenBuckets()
+    key = ("user:1", "ingest")
+
+    assert [buckets.take(key, rate=0.5, burst=3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take(key, rate=0.5, burst=3) == pytest.approx(2.0)
+
+    clock.now += 2.0
+    assert buckets.take(key, rate=0.5, burst=3) == 0.0
+
+    clock.now += 60
+    assert [buckets.take(key, rate=0.5, burst=3) for _ in range(4)][-1] > 0   # la ráfaga no pasa de 3
+
+def test_bucket_memory_is_bounded(clock):
+    buckets = TokenBuckets(max_keys=2)
+    for user in ("a", "b", "c"):
+        buckets.take((user, "stats"), rate=1, burst=1)
+    assert list(buckets._buckets) == [("b", "stats"), ("c", "stats")]
+
+def _scope(path="/api/workouts/stats/summary", method="GET", token=None, client="10.0.0.1"):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return {"type": "http", "method": method, "path": path, "headers": headers, "client": (client, 1234)}
+
+def test_client_key_uses_signed_sub_without_revocation_check(monkeypatch):
+    token = security.create_user_token({"id": 42, "is_active": True}, expires_delta=timedelta(minutes=5))
+    monkeypatch.setitem(security._auth_versions, "42", 99)   # revocado: lo rechaza la ruta, no la admisión
+
+    assert admission._client_key(_scope(token=token)) == "user:42"
+    assert admission._client_key(_scope(token="no-es-un-jwt")) == "ip:10.0.0.1"
+    assert admission._client_key(_scope()) == "ip:10.0.0.1"
+
+async def _call(middleware, scope):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    start = messages[0]
+    return start["status"], dict(start.get("headers", []))
+
+async def _ok(scope, receive, send, delay=0.0):
+    await asyncio.sleep(delay)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+def test_throttled_requests_get_429_with_retry_after(monkeypatch, clock):
+    monkeypatch.setitem(admission.RATE_LIMITS, "stats", (1 / 60, 2))
+    middleware = AdmissionControlMiddleware(_ok)
+
+    async def run():
+        return [await _call(middleware, _scope()) for _ in range(3)]
+
+    results = asyncio.run(run())
+    assert [status for status, _ in results] == [200, 200, 429]
+    assert results[2][1][b"retry-after"] == b"60"
+
+    other_client = asyncio.run(_call(middleware, _scope(client="10.0.0.2")))
+    assert other_client[0] == 200
+    unlimited = asyncio.run(_call(middleware, _scope(path="/api/workouts/sessions")))
+    assert unlimited[0] == 200
+
+def test_concurrency_limit_sheds_when_queue_wait_expires(monkeypatch):
+    monkeypatch.setattr(admission, "MAX_EXPENSIVE_CONCURRENCY", 2)
+    monkeypatch.setattr(admission, "QUEUE_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setitem(admission.RATE_LIMITS, "stats", (100.0, 100.0))
+    peak = {"now": 0, "max": 0}
+
+    async def slow(scope, receive, send):
+        peak["now"] += 1
+        peak["max"] = max(peak["max"], peak["now"])
+        try:
+            await _ok(scope, receive, send, delay=0.2)
+        finally:
+            peak["now"] -= 1
+
+    middleware = AdmissionControlMiddleware(slow)
+
+    async def run():
+        return await asyncio.gather(*(
+            _call(middleware, _scope(client=f"10.0.0.{i}")) for i in range(4)
+        ))
+
+    statuses = sorted(status for status, _ in asyncio.run(run()))
+    assert statuses == [200, 200, 503, 503]
+    assert peak["max"] == 2
+    assert admission.admission_stats()["expensive_in_flight"] == 0
+
+def test_queued_request_is_admitted_when_a_slot_frees(monkeypatch):
+    monkeypatch.setattr(admission, "MAX_EXPENSIVE_CONCURRENCY", 1)
+    monkeypatch.setattr(admission, "QUEUE_TIMEOUT_SECONDS", 1.0)
+    monkeypatch.setitem(admission.RATE_LIMITS, "stats", (100.0, 100.0))
+
+    async def quick(scope, receive, send):
+        await _ok(scope, receive, send, delay=0.05)
+
+    middleware = AdmissionControlMiddleware(quick)
+
+    async def run():
+        return await asyncio.gather(*(
+            _call(middleware, _scope(client=f"10.0.1.{i}")) for i in range(3)
+        ))
+
+    assert [status for status, _ in asyncio.run(run())] == [200, 200, 200]
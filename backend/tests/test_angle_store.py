@@ -0,0 +1,127 @@
+"""
+Pruebas del almacén de series de ángulos
+
+Un cursor falso guarda las filas de `angle_sample_chunks` en memoria y
+aplica los mismos filtros que las consultas (performance y rango de tiempo).
+"""
+import json
+import math
+from datetime import datetime
+
+from src.services import angle_store
+from src.services.angle_store import (
+    encode_chunk, decode_chunk, normalize_history, store_angle_history,
+    query_angle_range, load_series
+)
+
+COLUMNS = ("performance_id", "user_id", "chunk_index", "recorded_at", "t_start_ms",
+           "t_end_ms", "sample_count", "joints", "summary", "payload")
+
+class _ChunkCursor:
+    def __init__(self):
+        self.rows = []
+        self.result = []
+
+    def executemany(self, query, rows):
+        self.rows.extend(dict(zip(COLUMNS, row)) for row in rows)
+
+    def execute(self, query, params):
+        rows = [r for r in self.rows if r["performance_id"] == params[0]]
+        if "t_end_ms >= %s" in query:
+            rows = [r for r in rows if r["t_end_ms"] >= params[1]]
+        if "t_start_ms <= %s" in query:
+            rows = [r for r in rows if r["t_start_ms"] <= params[2]]
+        self.result = sorted(rows, key=lambda r: r["chunk_index"])
+
+    def fetchall(self):
+        return self.result
+
+def _history(count, step_ms=33):
+    return [
+        {"t": 1000 + i * step_ms, "leftKnee": 90 + (i % 50) * 1.5, "spine": None if i % 7 == 0 else 10.25}
+        for i in range(count)
+    ]
+
+def _store(cursor, history, performance_id=1):
+    return store_angle_history(cursor, performance_id, 5, datetime(2026, 1, 1), history)
+
+def test_chunk_round_trip_keeps_gaps_and_resolution():
+    times = [0, 33, 66, 100, 1000]
+    series = {"leftKnee": [90.04, None, 120.26, -3.5, 0.0], "spine": [None, None, 12.0, None, None]}
+
+    decoded_times, decoded = decode_chunk(encode_chunk(times, series), ["leftKnee", "spine"])
+
+    assert decoded_times == times
+    assert decoded["leftKnee"] == [90.0, None, 120.3, -3.5, 0.0]
+    assert decoded["spine"] == [None, None, 12.0, None, None]
+
+def test_non_finite_values_become_gaps():
+    history = [
+        {"t": 0, "leftKnee": 90.0},
+        {"t": 33, "leftKnee": float("inf")},
+        {"t": 66, "leftKnee": float("nan")},
+        {"t": 100, "leftKnee": 95.0},
+    ]
+    times, series = normalize_history(history)
+    assert series["leftKnee"] == [90.0, None, None, 95.0]
+
+    payload = encode_chunk([0, 1, 2], {"leftKnee": [1.0, float("-inf"), float("nan")]})
+    assert decode_chunk(payload, ["leftKnee"])[1]["leftKnee"] == [1.0, None, None]
+
+def test_untimed_frames_are_not_stored(caplog):
+    cursor = _ChunkCursor()
+    assert _store(cursor, [{"leftKnee": 90.0}, {"leftKnee": 95.0}]) == 0
+    assert cursor.rows == []
+    assert "sin tiempo" in caplog.text
+
+    times, series = normalize_history([{"t": 500, "leftKnee": 1.0}, {"leftKnee": 2.0}, {"t": 700, "leftKnee": 3.0}])
+    assert times == [0, 200]
+    assert series["leftKnee"] == [1.0, 3.0]
+
+def test_store_and_load_full_series():
+    cursor = _ChunkCursor()
+    history = _history(600)
+
+    assert _store(cursor, history) == math.ceil(600 / angle_store.CHUNK_SIZE)
+    times, series = load_series(cursor, 1)
+
+    assert times == [i * 33 for i in range(600)]
+    assert series["leftKnee"] == [round(f["leftKnee"] * 10) / 10 for f in history]
+    assert series["spine"] == [None if f["spine"] is None else 10.2 for f in history]
+
+def test_query_angle_range_reads_only_overlapping_chunks():
+    cursor = _ChunkCursor()
+    history = _history(600)
+    _store(cursor, history)
+
+    result = query_angle_range(cursor, 1, "leftKnee", start_ms=9000, end_ms=9100)
+
+    assert result["chunks_read"] == 1
+    assert result["chunks_decoded"] == 1
+    assert [s["t_ms"] for s in result["samples"]] == [9009, 9042, 9075]
+    assert [s["value"] for s in result["samples"]] == [
+        round(history[i]["leftKnee"] * 10) / 10 for i in (273, 274, 275)
+    ]
+
+def test_query_angle_range_buckets_use_chunk_summaries():
+    cursor = _ChunkCursor()
+    history = _history(600)
+    _store(cursor, history)
+    values = [round(f["leftKnee"] * 10) / 10 for f in history]
+
+    result = query_angle_range(cursor, 1, "leftKnee", bucket_ms=60_000)
+
+    assert result["chunks_read"] == 3
+    assert result["chunks_decoded"] == 0   # todos los chunks caen en un único bucket
+    [bucket] = result["buckets"]
+    assert bucket["count"] == 600
+    assert bucket["min"] == min(values)
+    assert bucket["max"] == max(values)
+    assert bucket["avg"] == round(sum(values) / 600, 2)
+
+def test_query_angle_range_ignores_unknown_joint():
+    cursor = _ChunkCursor()
+    _store(cursor, _history(10))
+
+    assert query_angle_range(cursor, 1, "rightElbow")["samples"] == []
+    assert json.loads(cursor.rows[0]["summary"])["leftKnee"]["count"] == 10
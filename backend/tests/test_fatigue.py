@@ -0,0 +1,96 @@
+"""
+Pruebas del detector de fatiga con sentadillas sintéticas a 30 fps
+"""
+import math
+import random
+
+from src.services.fatigue import FatigueDetector, RingBuffer, degradation
+
+FRAME_MS = 1000 / 30
+TOP = 170.0
+
+def _rep(start_ms, depth, seconds, asymmetry=2.0):
+    """Frames de una repetición: la rodilla baja `depth` grados y vuelve arriba"""
+    frames = []
+    count = int(seconds * 1000 / FRAME_MS)
+    for i in range(count):
+        knee = TOP - depth * (1 - math.cos(2 * math.pi * i / count)) / 2
+        frames.append((start_ms + i * FRAME_MS, {"leftKnee": knee, "rightKnee": knee + asymmetry}))
+    return frames
+
+def _session(reps):
+    """`reps`: lista de (profundidad, segundos, asimetría); una serie continua"""
+    frames, t = [], 0.0
+    for depth, seconds, asymmetry in reps:
+        frames.extend(_rep(t, depth, seconds, asymmetry))
+        t = frames[-1][0] + FRAME_MS
+    frames.append((t, {"leftKnee": TOP, "rightKnee": TOP + 2.0}))
+    return frames
+
+def _run(detector, frames):
+    events = []
+    for t_ms, angles in frames:
+        events.extend(detector.push(t_ms, angles))
+    return events
+
+def _jitter(seed=1):
+    generator = random.Random(seed)
+    return lambda value, spread: value + generator.uniform(-spread, spread)
+
+def test_steady_set_counts_reps_without_warnings():
+    jitter = _jitter()
+    events = _run(FatigueDetector("squat"), _session([(jitter(80, 2), jitter(2.0, 0.05), 2.0) for _ in range(10)]))
+
+    reps = [e for e in events if e["type"] == "rep"]
+    assert len(reps) == 10
+    assert all(75 <= e["depth"] <= 85 for e in reps)
+    assert all(1450 <= e["tempo_ms"] <= 1750 for e in reps)   # de arriba al 70% de subida
+    assert not [e for e in events if e["type"] == "fatigue"]
+
+def test_shallower_last_reps_raise_depth_warning_once():
+    jitter = _jitter(2)
+    plan = [(jitter(80, 1), 2.0, 2.0) for _ in range(7)] + [(jitter(55, 1), 2.0, 2.0) for _ in range(4)]
+    events = _run(FatigueDetector("squat"), _session(plan))
+
+    warnings = [e for e in events if e["type"] == "fatigue"]
+    assert [w["metric"] for w in warnings] == ["depth"]
+    assert warnings[0]["change_pct"] < -15
+    assert "profundidad" in warnings[0]["message"]
+
+def test_slower_reps_raise_tempo_warning():
+    jitter = _jitter(3)
+    plan = [(80, jitter(2.0, 0.05), 2.0) for _ in range(7)] + [(80, jitter(3.2, 0.05), 2.0) for _ in range(3)]
+    warnings = [e for e in _run(FatigueDetector("squat"), _session(plan)) if e["type"] == "fatigue"]
+
+    assert [w["metric"] for w in warnings] == ["tempo"]
+    assert warnings[0]["change_pct"] > 25
+
+def test_long_rest_starts_a_new_set():
+    detector = FatigueDetector("squat", rest_seconds=20)
+    first = _session([(80, 2.0, 2.0)] * 3)
+    rest = first[-1][0] + 30_000
+    second = [(t + rest, angles) for t, angles in _session([(80, 2.0, 2.0)] * 2)]
+
+    reps = [e for e in _run(detector, first + second) if e["type"] == "rep"]
+    assert [(e["set"], e["rep"]) for e in reps] == [(1, 1), (1, 2), (1, 3), (2, 1), (2, 2)]
+
+def test_frames_without_primary_joint_are_ignored():
+    detector = FatigueDetector("pushup")
+    assert detector.push(0, {"leftKnee": 90.0}) == []
+    assert detector.last_t is None
+
+def test_ring_buffer_keeps_last_values_in_order():
+    buffer = RingBuffer(3)
+    for value in range(5):
+        buffer.append(float(value))
+    assert buffer.values() == [2.0, 3.0, 4.0]
+    buffer.clear()
+    assert buffer.values() == []
+
+def test_degradation_needs_enough_reps_and_significance():
+    assert degradation([80, 80, 60, 60], recent=3, direction=-1, min_change=0.15) is None
+    assert degradation([80, 81, 79, 80, 60, 61, 59], recent=3, direction=-1, min_change=0.15) < -0.15
+    # Cambio grande pero con mucha dispersión: no es significativo
+    assert degradation([40, 120, 45, 115, 60, 20, 100], recent=3, direction=-1, min_change=0.15) is None
+    # Mejora: no es degradación
+    assert degradation([60, 61, 59, 60, 80, 81, 79], recent=3, direction=-1, min_change=0.15) is None
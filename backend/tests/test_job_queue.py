@@ -0,0 +1,146 @@
+"""
+Pruebas de la cola de trabajos con una conexión falsa
+
+La conexión guarda las sentencias pendientes y las agrupa por commit, así
+se comprueba qué se confirma junto y qué se descarta con el rollback.
+"""
+import threading
+import time
+
+import pytest
+
+from src.services import job_queue, kinematics, session_analysis
+from src.services.job_queue import (
+    run_job, fail_job, job_handler, PermanentJobError, JOB_HANDLERS,
+    STATUS_DONE, STATUS_FAILED, STATUS_QUEUED
+)
+
+class _Cursor:
+    rowcount = 1
+    lastrowid = 1
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=()):
+        self.connection.pending.append((" ".join(query.split()), params))
+
+    def close(self):
+        pass
+
+class _Connection:
+    def __init__(self):
+        self.pending = []
+        self.commits = []
+        self.rollbacks = 0
+        self.lock = threading.Lock()
+
+    def cursor(self, dictionary=False):
+        return _Cursor(self)
+
+    def commit(self):
+        with self.lock:
+            self.commits.append(self.pending)
+            self.pending = []
+
+    def rollback(self):
+        self.pending = []
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+def _job(job_type, attempts=1, max_attempts=3, payload=None):
+    return {"id": 7, "job_type": job_type, "user_id": 1, "attempts": attempts,
+            "max_attempts": max_attempts, "payload": payload or {}}
+
+@pytest.fixture
+def handlers():
+    registered = []
+
+    def register(job_type, func):
+        job_handler(job_type)(func)
+        registered.append(job_type)
+
+    yield register
+    for job_type in registered:
+        JOB_HANDLERS.pop(job_type, None)
+
+def test_handler_writes_commit_with_done_status(monkeypatch):
+    monkeypatch.setattr(session_analysis, "analyze_performance",
+                        lambda cursor, performance_id: {"performance_id": performance_id,
+                                                        "exercise_type": "squat", "rep_count": 4})
+
+    def analyze_kinematics(cursor, performance_id, exercise_type):
+        cursor.execute("UPDATE exercise_performances SET movement_speed = %s", (0.3,))
+        return {"movement_speed": 0.3}
+
+    monkeypatch.setattr(kinematics, "analyze_kinematics", analyze_kinematics)
+    connection = _Connection()
+
+    run_job(connection, _job("session_analysis", payload={"performance_id": 9}))
+
+    assert len(connection.commits) == 1
+    [(update, update_params), (speed, _), (done, done_params)] = connection.commits[0]
+    assert update.startswith("UPDATE exercise_performances SET repetitions")
+    assert update_params == (4, 9)
+    assert speed.startswith("UPDATE exercise_performances SET movement_speed")
+    assert done.startswith("UPDATE analysis_jobs SET status = %s, progress = 100")
+    assert done_params[0] == STATUS_DONE
+
+def test_failure_rolls_back_and_requeues_with_backoff(handlers):
+    def broken(connection, job):
+        connection.cursor().execute("UPDATE exercise_performances SET repetitions = 1")
+        raise RuntimeError("fallo")
+
+    handlers("test_broken", broken)
+    connection = _Connection()
+    run_job(connection, _job("test_broken", attempts=2))
+
+    assert connection.rollbacks == 1
+    [[(query, params)]] = connection.commits
+    assert query.startswith("UPDATE analysis_jobs SET status = %s, error = %s")
+    assert params[0] == STATUS_QUEUED
+    assert params[1] == "RuntimeError: fallo"
+    assert (params[2] - job_queue.datetime.now()).total_seconds() > job_queue.RETRY_BASE_SECONDS
+
+def test_permanent_error_and_last_attempt_fail_for_good(handlers):
+    def rejected(connection, job):
+        raise PermanentJobError("vídeo ilegible")
+
+    handlers("test_rejected", rejected)
+    connection = _Connection()
+    run_job(connection, _job("test_rejected", attempts=1))
+    assert connection.commits[-1][0][1][0] == STATUS_FAILED
+
+    fail_job(connection, _job("test_rejected", attempts=3), "sin más intentos")
+    assert connection.commits[-1][0][1][0] == STATUS_FAILED
+
+def test_unknown_job_type_fails():
+    connection = _Connection()
+    run_job(connection, _job("no_existe"))
+    [[(query, params)]] = connection.commits
+    assert params[0] == STATUS_FAILED
+    assert "desconocido" in params[1]
+
+def test_heartbeat_renews_lock_while_handler_runs(handlers, monkeypatch):
+    monkeypatch.setattr(job_queue, "HEARTBEAT_SECONDS", 0.02)
+    heartbeat_connection = _Connection()
+
+    def slow(connection, job):
+        time.sleep(0.15)
+        return {"ok": True}
+
+    handlers("test_slow", slow)
+    connection = _Connection()
+    run_job(connection, _job("test_slow"), connect=lambda: heartbeat_connection)
+
+    beats = heartbeat_connection.commits
+    assert len(beats) >= 3
+    assert all(q.startswith("UPDATE analysis_jobs SET locked_at") for [(q, _)] in beats)
+    assert not any(t.name.startswith("heartbeat-") for t in threading.enumerate())
+
+    # Sin nada en curso, el heartbeat no vuelve a escribir
+    count = len(heartbeat_connection.commits)
+    time.sleep(0.05)
+    assert len(heartbeat_connection.commits) == count
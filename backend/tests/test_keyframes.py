@@ -0,0 +1,98 @@
+"""
+Pruebas del muestreo adaptativo de keyframes y de su paridad con
+frontend/src/utils/keyframes.js (la prueba con node se salta si no está)
+"""
+import json
+import math
+import os
+import random
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from src.services import session_analysis
+from src.services.keyframes import select_keyframes, interpolate, sample_angle_history
+from src.services.session_analysis import segment_reps, rep_boundaries
+
+KEYFRAMES_JS = os.path.join(
+    os.path.dirname(__file__), "..", "..", "frontend", "src", "utils", "keyframes.js"
+)
+
+def _squats(count=600, step_ms=33, seed=3):
+    """Sentadillas de ~3 s con ruido de 0.5°; la cadera falta en un tramo"""
+    generator = random.Random(seed)
+    frames = []
+    for i in range(count):
+        phase = (i * step_ms) % 3000 / 3000
+        knee = 170 - 80 * (1 - math.cos(2 * math.pi * phase)) / 2
+        frame = {"t": i * step_ms, "leftKnee": round(knee + generator.uniform(-0.5, 0.5), 1),
+                 "spine": round(10 + generator.uniform(-0.5, 0.5), 1)}
+        if not 200 <= i < 230:
+            frame["leftHip"] = round(knee * 0.8, 1)
+        frames.append(frame)
+    return frames
+
+def _max_error(frames, sampled, joint):
+    times = [f["t"] for f in frames if joint in f]
+    kept = [(f["t"], f[joint]) for f in sampled if joint in f]
+    rebuilt = interpolate([t for t, _ in kept], [v for _, v in kept], times)
+    original = [f[joint] for f in frames if joint in f]
+    return max(abs(a - b) for a, b in zip(original, rebuilt))
+
+def test_straight_segments_reduce_to_their_ends():
+    times = list(range(0, 1000, 10))
+    ramp = [t * 0.1 for t in times]
+    flat = [5.0] * len(times)
+    assert select_keyframes(times, [ramp, flat], tolerance=0.5) == [0, len(times) - 1]
+    assert select_keyframes(times, [ramp], tolerance=0.5, keep=[40]) == [0, 40, len(times) - 1]
+    assert select_keyframes(times[:2], [ramp[:2]], tolerance=0.5) == [0, 1]
+
+def test_missing_channel_forces_keyframes():
+    times = list(range(10))
+    values = [1.0, 1.0, 1.0, None, None, 1.0, 1.0, 1.0, 1.0, 1.0]
+    assert select_keyframes(times, [values], tolerance=0.5) == [0, 2, 3, 4, 5, 9]
+
+def test_sampled_history_stays_within_tolerance_and_keeps_reps():
+    frames = _squats()
+    sampled = sample_angle_history(frames, "squat", tolerance=2.0)
+
+    assert len(sampled) < len(frames) / 3
+    for joint in ("leftKnee", "spine", "leftHip"):
+        assert _max_error(frames, sampled, joint) <= 2.0 + 1e-9
+
+    times = [f["t"] for f in frames]
+    boundaries = rep_boundaries(segment_reps(times, [f["leftKnee"] for f in frames]))
+    assert {times[i] for i in boundaries} <= {f["t"] for f in sampled}
+
+def test_primary_joints_match_frontend_copy():
+    with open(KEYFRAMES_JS, encoding="utf-8") as f:
+        source = f.read()
+    block = re.search(r"const PRIMARY_JOINTS = \{(.*?)\};", source, re.S).group(1)
+    frontend = dict(re.findall(r"(\w+): '(\w+)'", block))
+    default = re.search(r"const DEFAULT_JOINT = '(\w+)';", source).group(1)
+
+    assert frontend == session_analysis.PRIMARY_JOINTS
+    assert default == session_analysis.DEFAULT_JOINT
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node no disponible")
+def test_frontend_sampler_matches_backend(tmp_path):
+    # El módulo es ESM sin dependencias: se copia como .mjs para importarlo desde node
+    module = tmp_path / "keyframes.mjs"
+    shutil.copy(KEYFRAMES_JS, module)
+    script = (
+        "import { readFileSync } from 'fs';"
+        f"import {{ sampleAngleHistory }} from {json.dumps(module.as_uri())};"
+        "const { history, exercise } = JSON.parse(readFileSync(0, 'utf8'));"
+        "process.stdout.write(JSON.stringify(sampleAngleHistory(history, exercise, 2.0)));"
+    )
+
+    for exercise, frames in (("squat", _squats()), ("pushup", _squats(seed=5)),
+                             ("squat", _squats(count=300, step_ms=41, seed=9))):
+        output = subprocess.run(
+            ["node", "--input-type=module", "-e", script],
+            input=json.dumps({"history": frames, "exercise": exercise}),
+            capture_output=True, text=True, check=True, timeout=30
+        ).stdout
+        assert json.loads(output) == sample_angle_history(frames, exercise, tolerance=2.0)
@@ -0,0 +1,143 @@
+"""
+Pruebas de la cinemática 3D: validación de los world landmarks,
+empaquetado binario y cálculo en el trabajo de análisis
+"""
+import json
+import math
+from typing import List
+
+import numpy as np
+import pytest
+from pydantic import TypeAdapter, ValidationError
+
+from src.models.workout_models import WorldLandmarkFrame, WorkoutSessionCreateWithPose
+from src.services import kinematics
+from src.services.kinematics import (
+    KINEMATIC_LANDMARKS, MEDIAPIPE_INDICES, pack_frames, unpack_frames, to_arrays,
+    compute_kinematics, analyze_kinematics
+)
+
+_FRAMES = TypeAdapter(List[WorldLandmarkFrame])
+
+def _squats(seconds=8, fps=30, right_knee_offset=0.0):
+    """Frames {t, points} de sentadillas de 2 s; la rodilla derecha puede ir adelantada"""
+    frames = []
+    for i in range(int(seconds * fps)):
+        t = i / fps
+        depth = 0.25 * (1 - math.cos(2 * math.pi * t / 2.0)) / 2
+        base = {
+            "Shoulder": (0.0, -0.5 + depth, 0.0), "Elbow": (0.0, -0.3 + depth, 0.15),
+            "Wrist": (0.0, -0.45 + depth, 0.25), "Hip": (0.0, depth, 0.0),
+            "Knee": (0.0, 0.45 - depth * 0.2, 0.3 * depth / 0.25), "Ankle": (0.0, 0.9, 0.0),
+        }
+        points = []
+        for name in KINEMATIC_LANDMARKS:
+            side = -0.15 if name.startswith("left") else 0.15
+            x, y, z = base[name.replace("left", "").replace("right", "")]
+            if name == "rightKnee":
+                z += right_knee_offset
+            points.append([x + side, y, z])
+        frames.append({"t": round(t * 1000), "points": points})
+    return frames
+
+def _session(world_landmarks):
+    return WorkoutSessionCreateWithPose(
+        exercise_type="squat", duration_seconds=10, technique_score=80,
+        accuracy_percentage=80, total_frames=1, good_frames=1,
+        world_landmarks=world_landmarks
+    )
+
+@pytest.mark.parametrize("frames", [
+    [{"t": 0, "points": 5}],
+    [{"t": 0, "points": [[0.1, 0.2]] * 12}],
+    [{"t": 0, "points": [[0.1, 0.2, 0.3]] * 20}],
+    [{"points": [[0.1, 0.2, 0.3]] * 12}],
+    [{"t": 0, "points": [["a", 0.2, 0.3]] * 12}],
+    [{"t": 0, "points": [{"x": 0.1, "y": 0.2}] * 12}],
+])
+def test_malformed_world_landmarks_are_rejected(frames):
+    with pytest.raises(ValidationError):
+        _session(frames)
+
+def test_pack_round_trip_matches_json_conversion():
+    frames = _squats(seconds=1)
+    frames[3]["points"][5] = None
+    # Frame completo de MediaPipe JS: 33 puntos {x, y, z, visibility}
+    full = [{"x": 9.0, "y": 9.0, "z": 9.0, "visibility": 0.1}] * 33
+    for position, index in enumerate(MEDIAPIPE_INDICES):
+        x, y, z = frames[4]["points"][position]
+        full[index] = {"x": x, "y": y, "z": z, "visibility": 0.9}
+    frames[4] = {"t": frames[4]["t"], "points": full}
+    frames[1], frames[2] = frames[2], frames[1]   # desordenados
+
+    times, positions = unpack_frames(pack_frames(_session(frames).world_landmarks))
+    expected_times, expected_positions = to_arrays(frames)
+
+    np.testing.assert_array_equal(times, expected_times)
+    np.testing.assert_allclose(positions, expected_positions, rtol=1e-6)   # float32
+    assert np.isnan(positions[3, 5]).all()
+
+def test_squat_metrics():
+    metrics = compute_kinematics(_squats(), "squat")
+
+    assert metrics["reps"] in (3, 4)
+    assert metrics["symmetry_score"] == 100.0
+    assert 0.1 < metrics["movement_speed"] < 0.5
+    # Bajada y subida simétricas; el tempo se mide entre umbrales, no de extremo a extremo
+    assert 0.4 < metrics["eccentric_seconds"] < 1.0
+    assert metrics["concentric_seconds"] == pytest.approx(metrics["eccentric_seconds"], abs=0.05)
+    assert set(metrics["joint_speed"]) == set(KINEMATIC_LANDMARKS)
+    assert compute_kinematics(_squats()[:2], "squat") is None
+
+    asymmetric = compute_kinematics(_squats(right_knee_offset=0.1), "squat")
+    assert asymmetric["symmetry_score"] < 100.0
+
+class _Cursor:
+    """`performance_kinematics` y `exercise_performances` en memoria"""
+
+    def __init__(self, frames=None):
+        self.kinematics = {1: {"frames": frames, "metrics": None}} if frames is not None else {}
+        self.performance = {"movement_speed": None, "symmetry_score": 100.0}
+        self.rows = []
+
+    def execute(self, query, params=()):
+        query = " ".join(query.split())
+        if query.startswith("SELECT frames FROM performance_kinematics"):
+            row = self.kinematics.get(params[0])
+            self.rows = [dict(row)] if row else []
+        elif query.startswith("UPDATE performance_kinematics SET metrics"):
+            self.kinematics[params[1]] = {"frames": None, "metrics": params[0]}
+        elif query.startswith("DELETE FROM performance_kinematics"):
+            del self.kinematics[params[0]]
+        elif query.startswith("UPDATE exercise_performances SET movement_speed"):
+            speed, symmetry, _ = params
+            self.performance["movement_speed"] = speed
+            if symmetry is not None:
+                self.performance["symmetry_score"] = symmetry
+        else:
+            raise AssertionError(f"consulta inesperada: {query}")
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+def test_analysis_job_stores_metrics_and_drops_frames():
+    cursor = _Cursor(pack_frames(_FRAMES.validate_python(_squats())))
+
+    result = analyze_kinematics(cursor, 1, "squat")
+
+    stored = cursor.kinematics[1]
+    assert stored["frames"] is None
+    assert json.loads(stored["metrics"])["movement_speed"] == result["movement_speed"]
+    assert cursor.performance == {"movement_speed": result["movement_speed"], "symmetry_score": 100.0}
+    assert result["kinematics"] is True
+
+def test_analysis_job_without_world_landmarks_uses_2d_symmetry(monkeypatch):
+    series = {"leftKnee": [90.0, 100.0, None], "rightKnee": [95.0, 105.0, 120.0]}
+    monkeypatch.setattr(kinematics, "load_series", lambda cursor, performance_id, joints: ([0, 33, 66], series))
+
+    cursor = _Cursor(pack_frames(_FRAMES.validate_python(_squats()[:2])))   # muy corta
+    result = analyze_kinematics(cursor, 1, "squat")
+
+    assert cursor.kinematics == {}
+    assert cursor.performance == {"movement_speed": None, "symmetry_score": 90.0}
+    assert result == {"movement_speed": None, "symmetry_score": 90.0, "kinematics": False}
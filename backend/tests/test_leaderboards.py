@@ -0,0 +1,102 @@
+"""
+Pruebas del top-k incremental y de los tableros en memoria
+"""
+import random
+from datetime import datetime
+
+import pytest
+
+from src.services import leaderboards
+from src.services.leaderboards import TopK, apply_updates, get_leaderboard, period_for
+
+def _expected(values, k):
+    return sorted(values.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+def test_topk_matches_full_sort_with_monotonic_values():
+    generator = random.Random(3)
+    top = TopK(k=5)
+    best = {}
+
+    for _ in range(2000):
+        user_id = generator.randrange(40)
+        value = best.get(user_id, 0) + generator.choice([0, 0.5, 1, 3])
+        best[user_id] = value
+        top.offer(user_id, value)
+
+    assert top.ranking() == _expected(best, 5)
+
+def test_topk_ignores_lower_values_and_breaks_ties_by_user():
+    top = TopK(k=2)
+    top.offer(1, 80)
+    top.offer(2, 90)
+    top.offer(1, 70)          # no baja: los valores solo crecen
+    top.offer(3, 80)          # no entra: empata con el peor
+    assert top.ranking() == [(2, 90), (1, 80)]
+
+    top.offer(3, 95)
+    assert top.ranking() == [(3, 95), (2, 90)]
+    assert len(top.entries) == 2
+
+def test_period_keys():
+    when = datetime(2026, 1, 1, 23, 59)
+    assert period_for("daily", when) == "2026-01-01"
+    assert period_for("weekly", when) == "2026-W01"
+    assert period_for("all", when) == "all"
+
+class _Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, query, params=()):
+        self.connection.queries.append(query)
+        if "FROM leaderboard_entries" in query:
+            self.rows = [dict(row) for row in self.connection.entries]
+        elif "FROM users" in query:
+            self.rows = [{"id": user_id, "username": f"user{user_id}"} for user_id in params]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+class _Connection:
+    def __init__(self, entries):
+        self.entries = entries
+        self.queries = []
+
+    def cursor(self, dictionary=False):
+        return _Cursor(self)
+
+    def close(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def clean_boards():
+    leaderboards._boards.clear()
+    leaderboards._usernames.clear()
+    yield
+    leaderboards._boards.clear()
+    leaderboards._usernames.clear()
+
+def test_board_served_from_memory_after_first_load():
+    connection = _Connection([{"user_id": 1, "value": 70.0}, {"user_id": 2, "value": 60.0}])
+
+    first = get_leaderboard(lambda: connection, "best_score", "squat")
+    assert [(e["user_id"], e["username"]) for e in first["entries"]] == [(1, "user1"), (2, "user2")]
+    loaded_queries = len(connection.queries)
+
+    apply_updates([("best_score", "squat", "all", "all", 2, 85.0)])
+    second = get_leaderboard(lambda: connection, "best_score", "squat")
+
+    assert [(e["rank"], e["user_id"], e["value"]) for e in second["entries"]] == [(1, 2, 85.0), (2, 1, 70.0)]
+    assert len(connection.queries) == loaded_queries   # ni tablero ni nombres tocan la BD
+
+def test_updates_for_boards_not_loaded_are_ignored():
+    apply_updates([("sessions", "squat", "daily", period_for("daily"), 1, 3.0)])
+    assert leaderboards._boards == {}
+
+def test_unknown_window_is_rejected():
+    with pytest.raises(ValueError):
+        get_leaderboard(lambda: None, "streak", "squat", window="daily")
@@ -0,0 +1,32 @@
+"""
+Pruebas del drenado del worker al recibir SIGTERM
+"""
+import os
+import signal
+
+import pytest
+
+from src.utils import lifecycle
+
+@pytest.fixture
+def term_handler(tmp_path, monkeypatch):
+    monkeypatch.setattr(lifecycle, "RUN_DIR", str(tmp_path))
+    original = signal.getsignal(signal.SIGTERM)
+    yield
+    signal.signal(signal.SIGTERM, original)
+    lifecycle.shutdown()
+
+def test_sigterm_marks_draining_and_chains_to_server_handler(term_handler):
+    received = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: received.append(signum))
+    lifecycle.warm_up()
+    assert lifecycle.is_ready()
+
+    lifecycle.install_drain_handler()
+    os.kill(os.getpid(), signal.SIGTERM)
+
+    assert received == [signal.SIGTERM]
+    assert lifecycle.worker_state()["state"] == lifecycle.STATE_DRAINING
+    assert not lifecycle.is_ready()
+    [published] = lifecycle.all_worker_states()
+    assert published["state"] == lifecycle.STATE_DRAINING
@@ -0,0 +1,23 @@
+"""
+Pruebas del muestreo de logs con la configuración por defecto
+"""
+import logging
+import random
+
+from src.utils import logging_config
+from src.utils.logging_config import SamplingFilter, _parse_pairs
+
+def _record(name, level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, "GET /api 200", (), None)
+
+def test_default_samples_access_log_only(monkeypatch):
+    monkeypatch.setattr(logging_config.random, "random", random.Random(1).random)
+    rates = {name: float(rate) for name, rate in _parse_pairs(logging_config.LOG_SAMPLE).items()}
+    sampler = SamplingFilter(rates)
+
+    kept = sum(sampler.filter(_record("gymform.access")) for _ in range(10_000))
+
+    assert rates == {"gymform.access": 0.1}
+    assert 800 < kept < 1200
+    assert all(sampler.filter(_record("gymform.access", logging.ERROR)) for _ in range(100))
+    assert all(sampler.filter(_record("src.services.job_queue")) for _ in range(100))
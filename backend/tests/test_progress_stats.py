@@ -0,0 +1,120 @@
+"""
+Pruebas de los acumuladores de progreso (Welford, EWMA) y de
+`check_consistency`, con `user_exercise_stats` en un cursor falso
+"""
+import json
+import random
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.services import progress_stats
+from src.services.progress_stats import (
+    update_metric, describe_metric, record_performance, check_consistency, EWMA_ALPHA
+)
+
+def test_welford_and_ewma_match_direct_computation():
+    generator = random.Random(7)
+    values = [generator.uniform(40, 100) for _ in range(500)]
+    state = None
+    for value in values:
+        state = update_metric(state, value, "2026-01")
+
+    ewma = values[0]
+    for value in values[1:]:
+        ewma += EWMA_ALPHA * (value - ewma)
+
+    assert state["n"] == 500
+    assert state["mean"] == pytest.approx(statistics.fmean(values), rel=1e-12)
+    assert state["m2"] / (state["n"] - 1) == pytest.approx(statistics.variance(values), rel=1e-9)
+    assert state["ewma"] == pytest.approx(ewma, rel=1e-12)
+    assert (state["min"], state["max"]) == (min(values), max(values))
+
+def test_month_change_uses_trend_at_month_start():
+    state = update_metric(None, 50.0, "2026-01")
+    state = update_metric(state, 60.0, "2026-01")
+    january_trend = state["ewma"]
+    state = update_metric(state, 80.0, "2026-02")
+
+    view = describe_metric(state, "2026-02")
+    assert state["month_baseline"] == january_trend
+    assert view["month_change_pct"] == round((state["ewma"] - january_trend) / january_trend * 100, 1)
+    assert describe_metric(state, "2026-03")["month_change_pct"] is None
+    assert describe_metric(update_metric(None, 5.0, "2026-01"))["stddev"] == 0.0
+
+class _Cursor:
+    """`user_exercise_stats` en memoria y las performances para el recálculo"""
+
+    def __init__(self):
+        self.stats = {}
+        self.performances = []
+        self.rows = []
+
+    def execute(self, query, params=()):
+        query = " ".join(query.split())
+        if query.startswith("SELECT session_count, metrics FROM user_exercise_stats"):
+            row = self.stats.get(params)
+            self.rows = [dict(row)] if row else []
+        elif query.startswith("INSERT INTO user_exercise_stats"):
+            user_id, exercise_type_id, count, last, metrics = params
+            self.stats[(user_id, exercise_type_id)] = {
+                "user_id": user_id, "exercise_type_id": exercise_type_id,
+                "session_count": count, "last_session_at": last, "metrics": metrics
+            }
+        elif query.startswith("SELECT ep.user_id"):
+            self.rows = sorted(self.performances, key=lambda row: row["start_time"])
+        elif query.startswith("SELECT user_id, exercise_type_id, session_count, metrics"):
+            self.rows = [dict(row) for row in self.stats.values()]
+        elif query.startswith("DELETE FROM user_exercise_stats"):
+            del self.stats[params]
+        else:
+            raise AssertionError(f"consulta inesperada: {query}")
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+def _sessions(cursor, count=60):
+    generator = random.Random(11)
+    start = datetime(2026, 1, 20)
+    for i in range(count):
+        when = start + timedelta(days=i // 2, hours=i % 2)
+        user_id, exercise_type_id = 1 + i % 2, 3
+        row = {
+            "user_id": user_id, "exercise_type_id": exercise_type_id, "start_time": when,
+            "technique_score": generator.uniform(50, 95),
+            "avg_knee_angle": generator.uniform(80, 120) if i % 3 else None,
+            "avg_hip_angle": None, "avg_shoulder_angle": None,
+            "avg_elbow_angle": generator.uniform(60, 90),
+        }
+        cursor.performances.append(row)
+        values = {metric: row[column] for metric, column in progress_stats.METRIC_COLUMNS.items()}
+        record_performance(cursor, user_id, exercise_type_id, values, when)
+
+def test_incremental_rows_match_full_recompute():
+    cursor = _Cursor()
+    _sessions(cursor)
+
+    assert check_consistency(cursor) == []
+    assert cursor.stats[(1, 3)]["session_count"] == 30
+    assert "hip_angle" not in json.loads(cursor.stats[(1, 3)]["metrics"])
+
+def test_drift_is_reported_and_fixed():
+    cursor = _Cursor()
+    _sessions(cursor)
+    metrics = json.loads(cursor.stats[(2, 3)]["metrics"])
+    metrics["technique_score"]["mean"] += 0.5
+    cursor.stats[(2, 3)]["metrics"] = json.dumps(metrics)
+    cursor.stats[(9, 3)] = {"user_id": 9, "exercise_type_id": 3, "session_count": 1,
+                            "last_session_at": None, "metrics": "{}"}
+
+    report = sorted(check_consistency(cursor, fix=True), key=lambda entry: entry["user_id"])
+
+    assert report[0]["user_id"] == 2
+    assert report[0]["drift"] == {"technique_score.mean": pytest.approx(0.5)}
+    assert report[1] == {"user_id": 9, "exercise_type_id": 3, "issue": "sin sesiones"}
+    assert (9, 3) not in cursor.stats
+    assert check_consistency(cursor) == []
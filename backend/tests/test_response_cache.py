@@ -0,0 +1,66 @@
+"""
+Pruebas de la caché de respuestas con ETag e invalidación por versión
+"""
+import json
+
+import pytest
+from starlette.requests import Request
+
+from src.utils import response_cache
+from src.utils.response_cache import InMemoryCacheBackend, lookup, store, invalidate_user
+
+def _request(etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+@pytest.fixture(autouse=True)
+def backend(monkeypatch):
+    memory = InMemoryCacheBackend(max_entries=3, ttl=60)
+    monkeypatch.setattr(response_cache, "_backend", memory)
+    return memory
+
+def test_hit_then_not_modified_for_same_version():
+    assert lookup(_request(), 1, "sessions", {"limit": 10}, version=4) is None
+    stored = store(1, "sessions", {"limit": 10}, 4, {"sessions": [1, 2]})
+    etag = stored.headers["etag"]
+
+    hit = lookup(_request(), 1, "sessions", {"limit": 10}, version=4)
+    assert hit.status_code == 200
+    assert json.loads(hit.body) == {"sessions": [1, 2]}
+    assert hit.headers["etag"] == etag
+
+    assert lookup(_request(etag), 1, "sessions", {"limit": 10}, version=4).status_code == 304
+
+def test_new_version_invalidates_body_and_etag():
+    stored = store(1, "sessions", {"limit": 10}, 4, {"sessions": [1]})
+    etag = stored.headers["etag"]
+
+    assert lookup(_request(etag), 1, "sessions", {"limit": 10}, version=5) is None
+    assert lookup(_request(), 1, "sessions", {"limit": 10}, version=5) is None
+
+def test_params_and_users_do_not_share_entries():
+    store(1, "sessions", {"limit": 10}, 1, {"who": 1})
+
+    assert lookup(_request(), 1, "sessions", {"limit": 20}, version=1) is None
+    assert lookup(_request(), 2, "sessions", {"limit": 10}, version=1) is None
+
+def test_invalidate_user_frees_only_that_user(backend):
+    store(1, "sessions", {}, 1, {"who": 1})
+    store(1, "progress", {}, 1, {"who": 1})
+    store(12, "sessions", {}, 1, {"who": 12})
+
+    invalidate_user(1)
+
+    assert lookup(_request(), 1, "sessions", {}, version=1) is None
+    assert lookup(_request(), 1, "progress", {}, version=1) is None
+    assert json.loads(lookup(_request(), 12, "sessions", {}, version=1).body) == {"who": 12}
+
+def test_lru_bound_and_ttl(backend, monkeypatch):
+    for user_id in range(4):
+        store(user_id, "sessions", {}, 1, {"who": user_id})
+    assert lookup(_request(), 0, "sessions", {}, version=1) is None
+    assert lookup(_request(), 3, "sessions", {}, version=1) is not None
+
+    now = response_cache.time.monotonic()
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now + 61)
+    assert lookup(_request(), 3, "sessions", {}, version=1) is None
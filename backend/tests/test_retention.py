@@ -0,0 +1,140 @@
+"""
+Pruebas de la retención: reducción de frecuencia, archivo y restauración
+
+Un cursor falso mantiene en memoria `exercise_performances`,
+`angle_sample_chunks` y `pose_retention` con las sentencias que usa el módulo.
+"""
+import json
+from datetime import datetime
+
+import pytest
+
+from src.services import retention
+from src.services.angle_store import store_angle_history, load_series
+
+CHUNK_COLUMNS = ("performance_id", "user_id", "chunk_index", "recorded_at", "t_start_ms",
+                 "t_end_ms", "sample_count", "joints", "summary", "payload")
+
+class _Database:
+    def __init__(self):
+        self.performances = {}
+        self.chunks = []
+        self.retention = {}
+
+class _Cursor:
+    def __init__(self, database):
+        self.db = database
+        self.rows = []
+
+    def executemany(self, query, rows):
+        assert "INSERT INTO angle_sample_chunks" in query
+        self.db.chunks.extend(dict(zip(CHUNK_COLUMNS, row)) for row in rows)
+
+    def execute(self, query, params=()):
+        query = " ".join(query.split())
+        db = self.db
+        if query.startswith("SELECT pose_data, angle_history FROM exercise_performances"):
+            self.rows = [dict(db.performances[params[0]])]
+        elif query.startswith("SELECT") and "FROM angle_sample_chunks" in query:
+            self.rows = sorted((dict(c) for c in db.chunks if c["performance_id"] == params[0]),
+                               key=lambda c: c["chunk_index"])
+        elif query.startswith("DELETE FROM angle_sample_chunks"):
+            db.chunks = [c for c in db.chunks if c["performance_id"] != params[0]]
+        elif query.startswith("UPDATE exercise_performances SET pose_data = %s, angle_history = NULL"):
+            db.performances[params[1]].update(pose_data=params[0], angle_history=None)
+        elif query.startswith("UPDATE exercise_performances SET pose_data = %s, angle_history = %s"):
+            db.performances[params[2]].update(pose_data=params[0], angle_history=params[1])
+        elif query.startswith("UPDATE exercise_performances SET angle_history = %s"):
+            db.performances[params[1]]["angle_history"] = params[0]
+        elif query.startswith("INSERT INTO pose_retention"):
+            performance_id, tier, original, kept, path, checksum, _ = params
+            entry = db.retention.setdefault(performance_id, {})
+            entry["tier"] = tier
+            for name, value in (("original_samples", original), ("kept_samples", kept),
+                                ("archive_path", path), ("checksum", checksum)):
+                if value is not None:
+                    entry[name] = value
+        elif query.startswith("SELECT tier, archive_path, checksum FROM pose_retention"):
+            entry = db.retention.get(params[0])
+            self.rows = [dict(entry)] if entry else []
+        elif query.startswith("UPDATE pose_retention SET tier"):
+            db.retention[params[2]].update(tier=params[0], restored_at=params[1])
+        else:
+            raise AssertionError(f"consulta inesperada: {query}")
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+def _squats(count=900, step_ms=33):
+    """Sentadillas de ~3 s: la rodilla baja de 170° a 90° y vuelve"""
+    frames = []
+    for i in range(count):
+        phase = (i * step_ms) % 3000 / 3000
+        knee = 170 - 80 * (1 - abs(2 * phase - 1))
+        frames.append({"t": i * step_ms, "leftKnee": round(knee, 1), "spine": 10.0})
+    return frames
+
+@pytest.fixture
+def stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, "ARCHIVE_DIR", str(tmp_path))
+    database = _Database()
+    cursor = _Cursor(database)
+    history = _squats()
+    database.performances[1] = {"pose_data": json.dumps({"angles": []}), "angle_history": json.dumps(history)}
+    store_angle_history(cursor, 1, 7, datetime(2025, 3, 1), history)
+    performance = {"id": 1, "user_id": 7, "exercise_name": "squat", "start_time": datetime(2025, 3, 1)}
+    return database, cursor, performance
+
+def test_archive_and_restore_round_trip(stored):
+    database, cursor, performance = stored
+    original = (dict(database.performances[1]), [dict(c) for c in database.chunks])
+    series = load_series(cursor, 1)
+
+    path = retention.archive_performance(cursor, performance)
+
+    assert path.endswith("2025/03/performance-1.json.gz")
+    assert database.chunks == []
+    assert database.performances[1] == {"pose_data": retention.ARCHIVED_POSE_STUB, "angle_history": None}
+    assert database.retention[1]["tier"] == retention.TIER_ARCHIVED
+
+    assert retention.restore_performance(cursor, 1) is True
+    assert database.performances[1] == original[0]
+    assert [dict(c, recorded_at=str(c["recorded_at"])) for c in original[1]] == database.chunks
+    assert load_series(cursor, 1) == series
+    assert database.retention[1]["tier"] == retention.TIER_RESTORED
+
+    assert retention.restore_performance(cursor, 1) is False   # ya no está archivada
+
+def test_corrupt_archive_is_not_restored(stored):
+    database, cursor, performance = stored
+    path = retention.archive_performance(cursor, performance)
+    with open(path, "ab") as f:
+        f.write(b"x")
+
+    with pytest.raises(ValueError):
+        retention.restore_performance(cursor, 1)
+    assert database.chunks == []
+
+def test_downsample_keeps_rep_boundaries(stored):
+    database, cursor, performance = stored
+    times, series = load_series(cursor, 1)
+
+    result = retention.downsample_performance(cursor, performance, target_fps=2)
+
+    assert result["original"] == 900
+    assert result["kept"] < 100
+    kept_times, kept_series = load_series(cursor, 1)
+    assert kept_times[-1] == times[-1]
+    bottoms = [t for t, v in zip(times, series["leftKnee"]) if v == min(series["leftKnee"])]
+    assert set(bottoms) <= set(kept_times)
+    assert database.retention[1] == {"tier": retention.TIER_DOWNSAMPLED,
+                                     "original_samples": 900, "kept_samples": result["kept"]}
+    assert len(json.loads(database.performances[1]["angle_history"])) == result["kept"]
+
+def test_select_keyframes_interval_and_forced_indices():
+    times = list(range(0, 1000, 100))
+    assert retention.select_keyframes(times, keep=[5], target_fps=4) == [0, 3, 5, 6, 9]
+    assert retention.select_keyframes(times, keep=[], target_fps=5) == [0, 2, 4, 6, 8, 9]
@@ -0,0 +1,111 @@
+"""
+Pruebas de ReplicaRouter con SQLite como primario y réplica
+
+Cada base de datos guarda su nombre en la tabla `origin`, así se sabe a
+qué extremo fue cada conexión. El retraso lo da un `lag_probe` falso.
+"""
+import sqlite3
+import time
+
+import pytest
+
+from src.database.routing import ReplicaRouter, ReplicaEndpoint, READ, ANALYTICS, WRITE
+
+def _database(path, name):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE origin (name TEXT)")
+    connection.execute("INSERT INTO origin VALUES (?)", (name,))
+    connection.commit()
+    connection.close()
+    return lambda: sqlite3.connect(path)
+
+def _origin(connection):
+    try:
+        return connection.execute("SELECT name FROM origin").fetchone()[0]
+    finally:
+        connection.close()
+
+@pytest.fixture
+def databases(tmp_path):
+    return _database(tmp_path / "primary.db", "primary"), _database(tmp_path / "replica.db", "replica")
+
+def _router(primary, replicas, lag=0.0, **options):
+    lags = {"value": lag}
+    options.setdefault("check_interval", 0.0)
+    router = ReplicaRouter(primary, replicas, max_lag=5.0,
+                           lag_probe=lambda connection: lags["value"], **options)
+    return router, lags
+
+def test_reads_go_to_replica_and_writes_to_primary(databases):
+    primary, replica = databases
+    router, _ = _router(primary, [ReplicaEndpoint("r1", replica)])
+
+    assert _origin(router.connection(READ, user_id=1)) == "replica"
+    assert _origin(router.connection(ANALYTICS)) == "replica"
+    assert _origin(router.connection(WRITE, user_id=1)) == "primary"
+
+def test_sticky_window_pins_user_to_primary(databases):
+    primary, replica = databases
+    router, _ = _router(primary, [ReplicaEndpoint("r1", replica)], sticky_seconds=0.2)
+
+    router.mark_write(7)
+    assert _origin(router.connection(READ, user_id=7)) == "primary"
+    assert _origin(router.connection(READ, user_id=8)) == "replica"
+    assert _origin(router.connection(READ)) == "replica"
+
+    time.sleep(0.25)
+    assert _origin(router.connection(READ, user_id=7)) == "replica"
+
+def test_lagging_replica_is_skipped_until_it_catches_up(databases):
+    primary, replica = databases
+    endpoint = ReplicaEndpoint("r1", replica)
+    router, lags = _router(primary, [endpoint], lag=30.0)
+
+    assert _origin(router.connection(READ, user_id=1)) == "primary"
+    assert endpoint.healthy is False
+    assert endpoint.lag == 30.0
+
+    lags["value"] = 1.0
+    assert _origin(router.connection(READ, user_id=1)) == "replica"
+    assert endpoint.healthy is True
+
+def test_non_replica_is_skipped(databases):
+    primary, replica = databases
+    endpoint = ReplicaEndpoint("r1", replica)
+    router, _ = _router(primary, [endpoint], lag=None)
+
+    assert _origin(router.connection(READ)) == "primary"
+    assert endpoint.healthy is False
+
+def test_unreachable_replica_falls_back_and_waits_for_next_check(databases, tmp_path):
+    primary, replica = databases
+    attempts = []
+
+    def unreachable():
+        attempts.append(1)
+        return sqlite3.connect(f"file:{tmp_path / 'missing' / 'replica.db'}?mode=rw", uri=True)
+
+    endpoint = ReplicaEndpoint("down", unreachable)
+    router, _ = _router(primary, [endpoint], check_interval=60.0)
+
+    assert _origin(router.connection(READ)) == "primary"
+    assert _origin(router.connection(READ)) == "primary"
+    assert endpoint.healthy is False
+    assert len(attempts) == 1   # no se reintenta hasta la siguiente comprobación
+
+    endpoint.connect = replica
+    endpoint.checked_at = float("-inf")
+    assert _origin(router.connection(READ)) == "replica"
+    assert endpoint.healthy is True
+
+def test_healthy_replica_is_used_when_another_is_down(databases, tmp_path):
+    primary, replica = databases
+
+    def unreachable():
+        raise sqlite3.OperationalError("sin conexión")
+
+    router, _ = _router(primary, [ReplicaEndpoint("down", unreachable), ReplicaEndpoint("r1", replica)])
+
+    for _ in range(4):
+        assert _origin(router.connection(READ)) == "replica"
+    assert router.stats()["connections"] == {"read:r1": 4}
@@ -0,0 +1,161 @@
+"""
+Pruebas de la verificación de tokens y su revocación en memoria
+
+La BD se sustituye por un cursor falso que responde según la tabla de la
+consulta; `get_mysql_connection` falla si algo intenta abrir conexiones.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from src.utils import security
+
+class _Cursor:
+    def __init__(self, database):
+        self.database = database
+        self.rows = []
+
+    def execute(self, query, params=()):
+        self.database.queries.append((" ".join(query.split()), params))
+        if query.startswith("SELECT NOW()"):
+            self.rows = [(self.database.now,)]
+        elif "FROM user_auth_versions" in query:
+            self.rows = list(self.database.versions)
+        elif "FROM revoked_tokens" in query:
+            self.rows = list(self.database.revoked)
+        else:
+            self.rows = []
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+class _Database:
+    def __init__(self):
+        self.now = datetime(2026, 1, 1, 12, 0, 0)
+        self.versions = []
+        self.revoked = []
+        self.queries = []
+        self.commits = 0
+        self.fail_commit = False
+
+    def cursor(self, dictionary=False):
+        return _Cursor(self)
+
+    def commit(self):
+        if self.fail_commit:
+            raise RuntimeError("commit fallido")
+        self.commits += 1
+
+    def close(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    def no_io(*args, **kwargs):
+        raise AssertionError("la verificación de tokens no debe abrir conexiones")
+
+    monkeypatch.setattr(security, "get_mysql_connection", no_io)
+    monkeypatch.setattr(security, "_auth_synced_at", None)
+    security._auth_versions.clear()
+    security._revoked_jtis.clear()
+    security._token_cache.clear()
+    yield
+    security._auth_versions.clear()
+    security._revoked_jtis.clear()
+    security._token_cache.clear()
+
+def _token(user_id=42, auth_version=0):
+    user = {"id": user_id, "is_active": True, "auth_version": auth_version}
+    token = security.create_user_token(user, expires_delta=timedelta(minutes=30))
+    return token, security.decode_token(token)
+
+def _rejected(token):
+    with pytest.raises(HTTPException) as error:
+        security.decode_token(token)
+    return error.value.status_code == 401
+
+def test_version_bump_revokes_older_tokens():
+    old, _ = _token()
+    security.apply_user_revocation(42, 1)
+
+    assert _rejected(old)
+    new, payload = _token(auth_version=1)
+    assert payload["av"] == 1
+
+    # Una versión más antigua que llega tarde no rehabilita los tokens viejos
+    security.apply_user_revocation(42, 0)
+    assert _rejected(old)
+    _token(user_id=7)   # otros usuarios no se ven afectados
+
+def test_synced_jti_revocation_rejects_only_that_token():
+    database = _Database()
+    revoked, payload = _token()
+    other, _ = _token()
+    database.revoked = [(payload["jti"], datetime.utcfromtimestamp(payload["exp"]))]
+
+    assert security.sync_auth_state(database) == {"versions": 0, "revoked": 1}
+    assert _rejected(revoked)
+    assert security.decode_token(other)["sub"] == "42"
+    assert database.commits == 1
+
+def test_synced_version_bump_from_another_worker():
+    database = _Database()
+    token, _ = _token()
+    database.versions = [(42, 2)]
+
+    security.sync_auth_state(database)
+    assert _rejected(token)
+
+def test_incremental_sync_uses_overlap_and_prunes_expired():
+    database = _Database()
+    security.sync_auth_state(database)
+    full_load = [query for query, _ in database.queries]
+    assert "updated_at >=" not in full_load[1]
+    assert "revoked_at >=" not in full_load[2]
+
+    security._revoked_jtis["caducado"] = 0.0
+    database.queries.clear()
+    database.now += timedelta(seconds=5)
+    security.sync_auth_state(database)
+
+    [(_, _), (versions_query, versions_params), (revoked_query, revoked_params)] = database.queries
+    since = datetime(2026, 1, 1, 12, 0, 0) - timedelta(seconds=security.AUTH_SYNC_OVERLAP_SECONDS)
+    assert "updated_at >= %s" in versions_query and versions_params == (since,)
+    assert "revoked_at >= %s" in revoked_query and revoked_params[1] == since
+    assert "caducado" not in security._revoked_jtis
+
+def test_revoke_token_applies_locally_only_after_commit(monkeypatch):
+    database = _Database()
+    monkeypatch.setattr(security, "get_mysql_connection", lambda *args, **kwargs: database)
+    token, payload = _token()
+
+    database.fail_commit = True
+    with pytest.raises(RuntimeError):
+        security.revoke_token(payload)
+    assert security.decode_token(token)["jti"] == payload["jti"]
+
+    database.fail_commit = False
+    security.revoke_token(payload)
+    assert _rejected(token)
+
+def test_revoke_user_tokens_leaves_memory_to_the_caller():
+    class _VersionCursor:
+        def execute(self, query, params):
+            pass
+
+        def fetchone(self):
+            return {"version": 3}
+
+    token, _ = _token()
+    assert security.revoke_user_tokens(_VersionCursor(), 42) == 3
+    assert security.decode_token(token)   # aún sin confirmar
+
+    security.apply_user_revocation(42, 3)
+    assert _rejected(token)
@@ -0,0 +1,127 @@
+"""
+Pruebas del trabajo de análisis de vídeo: guardado idempotente, borrado
+del vídeo subido y rankings, siempre después del commit
+
+El análisis y el guardado se sustituyen; la conexión falsa anota en qué
+estado estaba el vídeo al confirmar.
+"""
+import pytest
+
+from src.services import video_pipeline, leaderboards
+from src.services.job_queue import run_job, STATUS_DONE, STATUS_FAILED, STATUS_QUEUED
+from src.models.workout_models import WorkoutSessionCreateWithPose
+
+class _Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.row = None
+
+    def execute(self, query, params=()):
+        self.connection.pending.append((" ".join(query.split()), params))
+        if "FOR UPDATE" in query:
+            self.row = self.connection.job_row
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+class _Connection:
+    def __init__(self, upload, session_id=None):
+        self.upload = upload
+        self.job_row = {"session_id": session_id}
+        self.pending = []
+        self.commits = []
+
+    def cursor(self, dictionary=False):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits.append({"statements": self.pending, "upload_exists": self.upload.exists()})
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+def _session():
+    return WorkoutSessionCreateWithPose(
+        exercise_type="squat", duration_seconds=10, technique_score=80.0,
+        accuracy_percentage=90.0, total_frames=100, good_frames=90,
+        angle_history=[{"t": 0, "leftKnee": 170.0}]
+    )
+
+@pytest.fixture
+def upload(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"\x00")
+    return path
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    calls = {"saved": 0, "applied": []}
+
+    def save(cursor, user_id, session_data):
+        calls["saved"] += 1
+        return {"session_id": 31, "performance_id": 32, "analysis_job_id": 33,
+                "leaderboard_updates": [("best_score", "squat", "all", "all", user_id, 80.0)]}
+
+    monkeypatch.setattr(video_pipeline, "analyze_video", lambda path, exercise, progress=None: _session())
+    monkeypatch.setattr(video_pipeline, "save_workout_session", save)
+    monkeypatch.setattr(leaderboards, "apply_updates", lambda updates: calls["applied"].append(updates))
+    return calls
+
+def _job(upload, attempts=1):
+    return {"id": 5, "job_type": "video_analysis", "user_id": 9, "attempts": attempts,
+            "max_attempts": 3, "payload": {"path": str(upload), "exercise_type": "squat"}}
+
+def _status(commit):
+    return commit["statements"][-1][1][0]
+
+def test_upload_removed_and_rankings_applied_after_commit(upload, pipeline):
+    connection = _Connection(upload)
+    run_job(connection, _job(upload))
+
+    [commit] = connection.commits
+    assert _status(commit) == STATUS_DONE
+    assert commit["upload_exists"] is True
+    assert any(q.startswith("UPDATE analysis_jobs SET session_id") for q, _ in commit["statements"])
+    assert not upload.exists()
+    assert pipeline["saved"] == 1
+    assert pipeline["applied"] == [[("best_score", "squat", "all", "all", 9, 80.0)]]
+
+def test_job_already_saved_is_not_saved_again(upload, pipeline):
+    connection = _Connection(upload, session_id=31)
+    run_job(connection, _job(upload, attempts=2))
+
+    assert pipeline["saved"] == 0
+    assert pipeline["applied"] == []
+    assert _status(connection.commits[-1]) == STATUS_DONE
+    assert not upload.exists()
+
+def test_upload_kept_while_retries_remain(upload, pipeline, monkeypatch):
+    def broken(cursor, user_id, session_data):
+        raise RuntimeError("sin conexión")
+
+    monkeypatch.setattr(video_pipeline, "save_workout_session", broken)
+    connection = _Connection(upload)
+
+    run_job(connection, _job(upload, attempts=1))
+    assert _status(connection.commits[-1]) == STATUS_QUEUED
+    assert upload.exists()
+
+    run_job(connection, _job(upload, attempts=3))
+    assert _status(connection.commits[-1]) == STATUS_FAILED
+    assert connection.commits[-1]["upload_exists"] is True
+    assert not upload.exists()
+
+def test_unreadable_video_fails_for_good_and_removes_upload(upload, pipeline, monkeypatch):
+    def unreadable(path, exercise, progress=None):
+        raise ValueError("No se detectó ninguna pose en el vídeo")
+
+    monkeypatch.setattr(video_pipeline, "analyze_video", unreadable)
+    connection = _Connection(upload)
+    run_job(connection, _job(upload))
+
+    assert _status(connection.commits[-1]) == STATUS_FAILED
+    assert not upload.exists()
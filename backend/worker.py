@@ -0,0 +1,152 @@
+"""
+GymForm Analyzer - Worker de análisis asíncrono
+
+Uso:
+    python worker.py                # procesos según ANALYSIS_WORKERS (por defecto 2)
+    python worker.py --processes 4
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Optional
+
+from src.utils.env import load_environment
+from src.utils.logging_config import setup_logging, stop_logging
+from src.utils.security import get_mysql_connection
+from src.services.job_queue import claim_job, run_job, requeue_stale_jobs
+from src.services import session_analysis, video_pipeline  # noqa: F401  (registran manejadores)
+
+load_environment()
+
+logger = logging.getLogger("worker")
+
+POLL_INTERVAL_SECONDS = float(os.getenv("ANALYSIS_POLL_INTERVAL", "1.0"))
+
+# Supervisión: cada cuánto se revisan los procesos y se reencolan trabajos abandonados
+SUPERVISE_INTERVAL_SECONDS = float(os.getenv("ANALYSIS_SUPERVISE_INTERVAL", "5"))
+REQUEUE_INTERVAL_SECONDS = float(os.getenv("ANALYSIS_REQUEUE_INTERVAL", "60"))
+
+# Máximo de trabajos simultáneos por tipo entre todos los workers
+TYPE_LIMITS = {
+    "session_analysis": int(os.getenv("ANALYSIS_MAX_CONCURRENT", "4")),
+    "video_analysis": int(os.getenv("VIDEO_MAX_CONCURRENT", "2")),
+}
+
+def _worker_prefix(pid: int) -> str:
+    return f"{socket.gethostname()}:{pid}:"
+
+def _discard(connection) -> None:
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+def worker_loop(index: int, stop_event) -> None:
+    """Bucle de un proceso worker: reclamar, ejecutar, repetir"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_id = f"{_worker_prefix(os.getpid())}{index}"
+    connection = None
+
+    while not stop_event.is_set():
+        if connection is None or not connection.is_connected():
+            connection = get_mysql_connection()
+            if connection is None:
+                time.sleep(POLL_INTERVAL_SECONDS * 5)
+                continue
+
+        try:
+            job = claim_job(connection, worker_id, TYPE_LIMITS)
+        except Exception as e:
+            logger.error("Error reclamando trabajo: %s", e, extra={"worker_id": worker_id})
+            _discard(connection)
+            connection = None
+            time.sleep(POLL_INTERVAL_SECONDS)
+            continue
+
+        if job is None:
+            stop_event.wait(POLL_INTERVAL_SECONDS)
+            continue
+
+        try:
+            run_job(connection, job, connect=get_mysql_connection)
+        except Exception as e:
+            # Conexión perdida al registrar el resultado: el trabajo queda en
+            # `running` y lo reencola la supervisión; este proceso sigue vivo
+            logger.error("Error ejecutando el trabajo %s: %s", job["id"], e,
+                         extra={"worker_id": worker_id})
+            _discard(connection)
+            connection = None
+
+    if connection is not None:
+        connection.close()
+    # Los procesos de multiprocessing salen sin atexit: vaciar la cola de logs aquí
+    stop_logging()
+
+def start_worker(index: int, stop_event) -> multiprocessing.Process:
+    process = multiprocessing.Process(target=worker_loop, args=(index, stop_event), daemon=False)
+    process.start()
+    return process
+
+def requeue_jobs(locked_by_prefix: Optional[str] = None) -> None:
+    """Reencolar trabajos abandonados (por antigüedad o de un worker muerto)"""
+    connection = get_mysql_connection()
+    if connection is None:
+        return
+    try:
+        requeued = requeue_stale_jobs(connection, locked_by_prefix)
+        if requeued:
+            logger.warning("%s trabajos abandonados devueltos a la cola", requeued)
+    except Exception as e:
+        logger.error("Error reencolando trabajos: %s", e)
+    finally:
+        _discard(connection)
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de análisis de sesiones")
+    parser.add_argument(
+        "--processes", type=int,
+        default=int(os.getenv("ANALYSIS_WORKERS", "2")),
+        help="Número de procesos worker"
+    )
+    args = parser.parse_args()
+    setup_logging()
+
+    requeue_jobs()
+
+    stop_event = multiprocessing.Event()
+    processes = [start_worker(i, stop_event) for i in range(args.processes)]
+
+    # El manejador solo marca la parada: llamar a stop_event.set() desde la
+    # señal mientras el hilo principal está en stop_event.wait() se bloquea
+    stopping = []
+
+    def shutdown(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    logger.info("Iniciando %s workers de análisis...", args.processes)
+    last_requeue = time.monotonic()
+    while not stopping:
+        time.sleep(SUPERVISE_INTERVAL_SECONDS)
+        for i, process in enumerate(processes):
+            if not process.is_alive() and not stopping:
+                logger.warning("Worker %s terminó (código %s), reiniciando", process.pid, process.exitcode)
+                requeue_jobs(_worker_prefix(process.pid))
+                processes[i] = start_worker(i, stop_event)
+        if time.monotonic() - last_requeue >= REQUEUE_INTERVAL_SECONDS:
+            requeue_jobs()
+            last_requeue = time.monotonic()
+
+    logger.info("Deteniendo workers (terminando trabajos en curso)...")
+    stop_event.set()
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
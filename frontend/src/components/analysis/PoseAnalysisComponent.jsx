@@ -9,6 +9,16 @@ import toast from 'react-hot-toast';
 import CameraCapture from '../camera/CameraCapture';
 import { usePoseDetector } from '../../utils/PoseDetector';
 
+// Índices de MediaPipe de los 12 puntos que usa la cinemática 3D del backend
+// (mismo orden que KINEMATIC_LANDMARKS en backend/src/services/kinematics.py)
+const KINEMATIC_INDICES = [11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28];
+
+const kinematicPoints = (worldLandmarks) =>
+  KINEMATIC_INDICES.map(i => {
+    const point = worldLandmarks[i];
+    return point ? [point.x, point.y, point.z] : null;
+  });
+
 const PoseAnalysisComponent = ({ exerciseType = 'general', onSessionComplete }) => {
   // Estados del análisis
   const [isAnalyzing, setIsAnalyzing] = useState(false);
@@ -28,6 +38,11 @@ const PoseAnalysisComponent = ({ exerciseType = 'general', onSessionComplete })
   const canvasRef = useRef(null);
   const analysisIntervalRef = useRef(null);
   const frameCountRef = useRef(0);
+  const startTimestampRef = useRef(null);
+  // Serie completa de ángulos con su tiempo relativo (api.js la reduce a keyframes)
+  const angleHistoryRef = useRef([]);
+  // Serie completa de world landmarks para la cinemática 3D (no provoca renders)
+  const worldLandmarksRef = useRef([]);
 
   // Hook del detector de pose
   const { detector, isLoading: detectorLoading, error: detectorError } = usePoseDetector({
@@ -82,6 +97,16 @@ const PoseAnalysisComponent = ({ exerciseType = 'general', onSessionComplete })
     if (isAnalyzing && poseData.detected) {
       frameCountRef.current++;
       
+      // Tiempo relativo al primer frame detectado, en ms
+      if (startTimestampRef.current === null) {
+        startTimestampRef.current = poseData.timestamp;
+      }
+      const t = poseData.timestamp - startTimestampRef.current;
+      angleHistoryRef.current.push({ ...poseData.angles, t });
+      if (poseData.worldLandmarks) {
+        worldLandmarksRef.current.push({ t, points: kinematicPoints(poseData.worldLandmarks) });
+      }
+
       // Actualizar datos de sesión
       setSessionData(prev => {
         const newAngles = [...prev.angles, poseData.angles];
@@ -334,6 +359,9 @@ const PoseAnalysisComponent = ({ exerciseType = 'general', onSessionComplete })
     
     setIsAnalyzing(true);
     frameCountRef.current = 0;
+    startTimestampRef.current = null;
+    angleHistoryRef.current = [];
+    worldLandmarksRef.current = [];
     toast.success('Análisis de técnica iniciado');
   };
 
@@ -342,6 +370,8 @@ const PoseAnalysisComponent = ({ exerciseType = 'general', onSessionComplete })
     
     const finalData = {
       ...sessionData,
+      angles: angleHistoryRef.current,
+      worldLandmarks: worldLandmarksRef.current,
       endTime: sessionInfo.timestamp,
       duration: sessionInfo.duration,
       exerciseType,
@@ -207,7 +207,7 @@ export const usePoseDetector = (options = {}) => {
       if (results.poseLandmarks && results.poseLandmarks.length > 0) {
         processedData.detected = true;
         processedData.landmarks = results.poseLandmarks;
-        processedData.worldLandmarks = results.poseLandmarks3D;
+        processedData.worldLandmarks = results.poseWorldLandmarks || results.poseLandmarks3D;
         processedData.confidence = calculateConfidence(results.poseLandmarks);
         processedData.angles = calculateAngles(results.poseLandmarks);
       }
@@ -6,6 +6,7 @@
 import axios from 'axios';
 import toast from 'react-hot-toast';
 import { useState, useEffect } from 'react';
+import { ANGLE_TOLERANCE, sampleAngleHistory } from '../utils/keyframes';
 
 // Configuración base de la API
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
@@ -180,9 +181,11 @@ export const authService = {
   async updateProfile(updateData) {
     try {
       const response = await apiClient.put('/api/auth/me', updateData);
+      const { access_token, user } = response.data;
       
-      // Actualizar datos de usuario en localStorage
-      localStorage.setItem('user_data', JSON.stringify(response.data));
+      // El token anterior queda revocado: guardar el nuevo y los datos de usuario
+      localStorage.setItem('auth_token', access_token);
+      localStorage.setItem('user_data', JSON.stringify(user));
       
       return { success: true, data: response.data };
     } catch (error) {
@@ -245,6 +248,35 @@ export const workoutService = {
     }
   },
 
+  async syncSessions(since = 0, includeSessions = true) {
+    try {
+      // Solo lo cambiado desde la versión `since` (sesiones nuevas y borradas)
+      const response = await apiClient.get('/api/workouts/sync', {
+        params: { since, include_sessions: includeSessions }
+      });
+      return { success: true, data: response.data };
+    } catch (error) {
+      console.error('Error sincronizando sesiones:', error);
+      return {
+        success: false,
+        error: error.response?.data?.detail || error.message
+      };
+    }
+  },
+
+  async deleteSession(sessionId) {
+    try {
+      const response = await apiClient.delete(`/api/workouts/sessions/${sessionId}`);
+      return { success: true, data: response.data };
+    } catch (error) {
+      console.error('Error eliminando sesión:', error);
+      return {
+        success: false,
+        error: error.response?.data?.detail || error.message
+      };
+    }
+  },
+
   async getSessionDetail(sessionId) {
     try {
       const response = await apiClient.get(`/api/workouts/sessions/${sessionId}`);
@@ -281,9 +313,30 @@ export const workoutService = {
       return { success: true, data: response.data };
     } catch (error) {
       console.error('Error obteniendo estadísticas avanzadas:', error);
-      return { 
-        success: false, 
-        error: error.response?.data?.detail || error.message 
+      return {
+        success: false,
+        error: error.response?.data?.detail || error.message
+      };
+    }
+  },
+
+  async getCoachMembersStats(days = 30) {
+    try {
+      // Respuesta NDJSON: una línea por miembro
+      const response = await apiClient.get('/api/coach/members/stats', {
+        params: { days },
+        responseType: 'text'
+      });
+      const members = response.data
+        .split('\n')
+        .filter(line => line.trim())
+        .map(line => JSON.parse(line));
+      return { success: true, data: members };
+    } catch (error) {
+      console.error('Error obteniendo estadísticas del grupo:', error);
+      return {
+        success: false,
+        error: error.response?.data?.detail || error.message
       };
     }
   }
@@ -434,7 +487,18 @@ export const transformSessionDataForBackend = (frontendSessionData) => {
       confidence: frontendSessionData.confidence || 0,
       detected: frontendSessionData.detected || false
     }),
-    angle_history: frontendSessionData.angles || [],
+    // Solo keyframes: el backend reconstruye por interpolación y, al venir
+    // la tolerancia, no vuelve a muestrear (el error no se acumula)
+    angle_history: sampleAngleHistory(
+      frontendSessionData.angles || [],
+      frontendSessionData.exerciseType,
+      ANGLE_TOLERANCE
+    ),
+    keyframe_tolerance: ANGLE_TOLERANCE,
+    original_samples: (frontendSessionData.angles || []).length,
+    // [{ t, points }] con los worldLandmarks de PoseDetector (opcional), a
+    // frecuencia completa: las derivadas del backend no admiten keyframes
+    world_landmarks: frontendSessionData.worldLandmarks?.length ? frontendSessionData.worldLandmarks : null,
     feedback: frontendSessionData.feedback || []
   };
 };
@@ -443,7 +507,7 @@ export const calculateAverageAngles = (anglesArray) => {
   if (!anglesArray || anglesArray.length === 0) return {};
   
   const avgAngles = {};
-  const joints = Object.keys(anglesArray[0] || {});
+  const joints = Object.keys(anglesArray[0] || {}).filter(key => key !== 't' && key !== 'timestamp');
   
   joints.forEach(joint => {
     const values = anglesArray
@@ -497,7 +561,7 @@ export const useAuth = () => {
   const updateProfile = async (updateData) => {
     const result = await authService.updateProfile(updateData);
     if (result.success) {
-      setUser(result.data);
+      setUser(result.data.user);
       toast.success('Perfil actualizado correctamente');
     }
     return result;
@@ -513,6 +577,33 @@ export const useAuth = () => {
   };
 };
 
+// =====================================
+// SINCRONIZACIÓN INCREMENTAL
+// =====================================
+
+// Estado entre montajes del dashboard (en memoria, ligado al token de la sesión)
+const syncCache = { token: null, version: null, limit: null, pageFull: false, sessions: [], stats: {} };
+
+const currentSyncCache = () => {
+  const token = localStorage.getItem('auth_token');
+  if (syncCache.token !== token) {
+    Object.assign(syncCache, { token, version: null, limit: null, pageFull: false, sessions: [], stats: {} });
+  }
+  return syncCache;
+};
+
+const mergeSessions = (sessions, changed, deleted) => {
+  const replaced = new Set([...deleted, ...changed.map(session => session.id)]);
+  return [...changed, ...sessions.filter(session => !replaced.has(session.id))]
+    .sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+};
+
+// Versión de datos actual (token para la próxima sincronización)
+const fetchDataVersion = async () => {
+  const result = await workoutService.syncSessions(0, false);
+  return result.success ? result.data.version : null;
+};
+
 export const useWorkoutSessions = () => {
   const [sessions, setSessions] = useState([]);
   const [loading, setLoading] = useState(false);
@@ -523,9 +614,36 @@ export const useWorkoutSessions = () => {
     setError(null);
     
     try {
+      const cache = currentSyncCache();
+
+      // Primera página ya cargada: pedir solo los cambios
+      if (offset === 0 && cache.version !== null && cache.limit === limit) {
+        const sync = await workoutService.syncSessions(cache.version);
+        if (sync.success && !sync.data.reset) {
+          const merged = mergeSessions(cache.sessions, sync.data.sessions, sync.data.deleted);
+          // Si un borrado deja la página incompleta y había más sesiones, se recarga
+          if (merged.length >= limit || !cache.pageFull) {
+            cache.sessions = merged.slice(0, limit);
+            cache.version = sync.data.version;
+            setSessions(cache.sessions);
+            return;
+          }
+        }
+      }
+
+      // La versión se lee antes del listado: lo que cambie después llega en la siguiente sincronización
+      const version = offset === 0 ? await fetchDataVersion() : null;
       const result = await workoutService.getUserSessions(limit, offset);
       if (result.success) {
         setSessions(result.data);
+        if (version !== null) {
+          Object.assign(cache, {
+            version,
+            limit,
+            pageFull: result.data.length === limit,
+            sessions: result.data
+          });
+        }
       } else {
         setError(result.error);
         toast.error('Error cargando sesiones');
@@ -565,12 +683,24 @@ export const useWorkoutSessions = () => {
     }
   };
 
+  const deleteSession = async (sessionId) => {
+    const result = await workoutService.deleteSession(sessionId);
+    if (result.success) {
+      toast.success('Sesión eliminada');
+      loadSessions();
+    } else {
+      toast.error('Error eliminando sesión');
+    }
+    return result.success;
+  };
+
   return {
     sessions,
     loading,
     error,
     loadSessions,
-    saveSession
+    saveSession,
+    deleteSession
   };
 };
 
@@ -584,9 +714,29 @@ export const useWorkoutStats = (days = 30) => {
     setError(null);
     
     try {
+      // Estadísticas cacheadas por rango y día: se reutilizan si los datos no cambiaron
+      const cache = currentSyncCache();
+      const key = `${days}:${new Date().toDateString()}`;
+      const cached = cache.stats[key];
+      let version = null;
+      if (cached) {
+        const sync = await workoutService.syncSessions(cached.version, false);
+        if (sync.success && sync.data.version === cached.version) {
+          setStats(cached.data);
+          return;
+        }
+        version = sync.success ? sync.data.version : null;
+      }
+      if (version === null) {
+        version = await fetchDataVersion();
+      }
+
       const result = await workoutService.getAdvancedStats(days);
       if (result.success) {
         setStats(result.data);
+        if (version !== null) {
+          cache.stats[key] = { version, data: result.data };
+        }
       } else {
         setError(result.error);
       }
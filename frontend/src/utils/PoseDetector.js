@@ -163,7 +163,7 @@ class PoseDetector {
 
   processLandmarks(results) {
     const landmarks = results.poseLandmarks;
-    const worldLandmarks = results.poseLandmarks3D;
+    const worldLandmarks = results.poseWorldLandmarks || results.poseLandmarks3D;
 
     // Calcular confianza promedio
     const avgConfidence = landmarks.reduce((sum, point) => 
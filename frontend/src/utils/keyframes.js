@@ -0,0 +1,168 @@
+/**
+ * GymForm Analyzer - Muestreo adaptativo de keyframes
+ * Mismo criterio que backend/src/services/keyframes.py: solo se envían los
+ * frames necesarios para reconstruir cada canal por interpolación lineal
+ * con un error máximo dado, conservando siempre inicio, fondo y fin de
+ * cada repetición.
+ *
+ * Los world landmarks no se reducen: la cinemática del backend deriva
+ * velocidades y aceleraciones con diferencias finitas, que con tramos
+ * interpolados salen a cero y con picos en cada keyframe.
+ */
+
+export const ANGLE_TOLERANCE = 2.0;      // grados
+
+// Copia de PRIMARY_JOINTS / DEFAULT_JOINT de backend/src/services/session_analysis.py
+// (backend/tests/test_keyframes.py comprueba que coinciden)
+const DEFAULT_JOINT = 'leftKnee';
+const PRIMARY_JOINTS = {
+  squat: 'leftKnee',
+  sentadilla: 'leftKnee',
+  pushup: 'leftElbow',
+  flexion: 'leftElbow',
+  plank: 'spine',
+};
+
+const isNumber = (value) => typeof value === 'number' && !Number.isNaN(value);
+
+// =====================================
+// SELECCIÓN
+// =====================================
+
+export const selectKeyframes = (times, channels, tolerance, keep = []) => {
+  const count = times.length;
+  if (count <= 2 || tolerance <= 0) {
+    return Array.from({ length: count }, (_, i) => i);
+  }
+
+  const forced = new Set(keep);
+  const kept = [0];
+  let anchor = 0;
+  let lower = channels.map(() => -Infinity);
+  let upper = channels.map(() => Infinity);
+
+  const presence = (i) => channels.map(channel => isNumber(channel[i])).join();
+  const reset = (i) => {
+    anchor = i;
+    lower = channels.map(() => -Infinity);
+    upper = channels.map(() => Infinity);
+  };
+  const fits = (i) => {
+    const dt = times[i] - times[anchor];
+    return channels.every((channel, c) => {
+      if (!isNumber(channel[i]) || !isNumber(channel[anchor])) return true;
+      const slope = (channel[i] - channel[anchor]) / dt;
+      return slope >= lower[c] && slope <= upper[c];
+    });
+  };
+  const narrow = (i) => {
+    const dt = times[i] - times[anchor];
+    channels.forEach((channel, c) => {
+      if (!isNumber(channel[i]) || !isNumber(channel[anchor])) return;
+      lower[c] = Math.max(lower[c], (channel[i] - tolerance - channel[anchor]) / dt);
+      upper[c] = Math.min(upper[c], (channel[i] + tolerance - channel[anchor]) / dt);
+    });
+  };
+
+  let anchorPresence = presence(0);
+  for (let i = 1; i < count; i++) {
+    if (times[i] <= times[anchor]) {
+      kept.push(i);
+      reset(i);
+      anchorPresence = presence(i);
+      continue;
+    }
+    const current = presence(i);
+    if (current !== anchorPresence || !fits(i)) {
+      if (i - 1 !== anchor) {
+        kept.push(i - 1);
+        reset(i - 1);
+      }
+      if (current !== anchorPresence) {
+        kept.push(i);
+        reset(i);
+        anchorPresence = current;
+        continue;
+      }
+    }
+    if (forced.has(i)) {
+      kept.push(i);
+      reset(i);
+      continue;
+    }
+    narrow(i);
+  }
+
+  if (kept[kept.length - 1] !== count - 1) kept.push(count - 1);
+  return kept;
+};
+
+// Inicio, fondo y fin de cada repetición (histéresis, como segment_reps)
+const repBoundaries = (values, lowRatio = 0.3, highRatio = 0.7) => {
+  // Bucle en vez de Math.min(...values): el spread desborda la pila en sesiones largas
+  let count = 0;
+  let lowest = Infinity;
+  let highest = -Infinity;
+  for (const value of values) {
+    if (!isNumber(value)) continue;
+    count++;
+    if (value < lowest) lowest = value;
+    if (value > highest) highest = value;
+  }
+  if (count < 3) return [];
+
+  const span = highest - lowest;
+  if (span < 10) return [];
+  const low = lowest + span * lowRatio;
+  const high = lowest + span * highRatio;
+
+  const indices = [];
+  let top = null;
+  let bottom = null;
+  values.forEach((value, i) => {
+    if (!isNumber(value)) return;
+    if (bottom === null) {
+      if (value >= high) top = i;
+      else if (value <= low && top !== null) bottom = i;
+    } else if (value < values[bottom]) {
+      bottom = i;
+    } else if (value >= high) {
+      indices.push(top, bottom, i);
+      top = i;
+      bottom = null;
+    }
+  });
+  return indices;
+};
+
+// =====================================
+// SERIES DE LA SESIÓN
+// =====================================
+
+const frameTime = (frame) => (isNumber(frame.t) ? frame.t : frame.timestamp);
+
+export const sampleAngleHistory = (history, exerciseType, tolerance = ANGLE_TOLERANCE) => {
+  // Solo frames con tiempo (t/timestamp): no se inventan tiempos
+  const frames = (history || []).filter(frame => isNumber(frameTime(frame)));
+  if (frames.length <= 2) return frames;
+
+  // Tiempos relativos en ms
+  const times = frames.map(frame => Math.round(frameTime(frame) - frameTime(frames[0])));
+
+  const joints = [...new Set(frames.flatMap(frame =>
+    Object.keys(frame).filter(key => key !== 't' && key !== 'timestamp' && isNumber(frame[key]))
+  ))];
+  const channels = joints.map(joint => frames.map(frame => frame[joint]));
+
+  const primary = PRIMARY_JOINTS[(exerciseType || '').toLowerCase()] || DEFAULT_JOINT;
+  const primaryIndex = joints.indexOf(primary);
+  const keep = primaryIndex >= 0 ? repBoundaries(channels[primaryIndex]) : [];
+
+  return selectKeyframes(times, channels, tolerance, keep).map(i => {
+    const frame = { t: times[i] };
+    joints.forEach(joint => {
+      if (isNumber(frames[i][joint])) frame[joint] = frames[i][joint];
+    });
+    return frame;
+  });
+};